@@ -0,0 +1,200 @@
+#! /usr/bin/env python
+
+# Sketch - A Python-based interactive drawing program
+# Copyright (C) 2010 by sK1 Team (http://sk1project.org)
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Library General Public
+# License as published by the Free Software Foundation; either
+# version 2 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.	See the GNU
+# Library General Public License for more details.
+#
+# You should have received a copy of the GNU Library General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307	USA
+
+#
+# Benchmark for the binary import filters.
+#
+# usage: binloaders.py [-n objects] [-p points] [-r repeat] [format ...]
+#
+# Synthetic CGM, WMF and CMX files with N polygons and polylines of P
+# points each are written to temporary files and loaded with
+# load_drawing. The best time of REPEAT runs is reported together with
+# the throughput and an MD5 digest of the loaded document saved as
+# .sk, so that the results of different versions of the filters can be
+# compared.
+#
+
+import sys, os, time, getopt, tempfile, struct, md5
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from skload import save_string
+
+from Sketch import load
+from Sketch.Graphics import document
+
+# load_drawing_from_file stores messages in meta.load_messages, which is
+# only initialized by the UI
+document.MetaInfo.load_messages = ''
+
+
+def polygon_coords(i, points):
+    # the coordinates of the I-th polygon as a flat list
+    x = (i % 100) * 300
+    y = (i / 100) * 300
+    coords = []
+    for j in range(points):
+        coords.append(x + (j * 37) % 250)
+        coords.append(y + (j * 53) % 250)
+    return coords
+
+
+def cgm_element(cls, id, data):
+    # binary encoding of a CGM element with the parameters DATA
+    head = (cls << 12) | (id << 5)
+    if len(data) < 31:
+        result = struct.pack('!H', head | len(data))
+    else:
+        result = struct.pack('!HH', head | 31, len(data))
+    if len(data) % 2:
+        data = data + '\0'
+    return result + data
+
+def make_cgm(count, points):
+    # 16 bit integer VDCs, the default
+    data = [cgm_element(0, 1, '\005bench'),		# BEGMF
+            cgm_element(0, 3, '\007picture'),		# BEGPIC
+            cgm_element(0, 4, '')]			# BEGPICBODY
+    for i in range(count):
+        coords = polygon_coords(i, points)
+        coords = struct.pack('!%dh' % len(coords), *coords)
+        if i % 2:
+            data.append(cgm_element(4, 7, coords))	# POLYGON
+        else:
+            data.append(cgm_element(4, 1, coords))	# LINE
+    data.append(cgm_element(0, 5, ''))			# ENDPIC
+    data.append(cgm_element(0, 2, ''))			# ENDMF
+    return ''.join(data)
+
+
+def make_wmf(count, points):
+    left, top, right, bottom = 0, 0, 30000, 30000
+    header = struct.pack('<4sHhhhhHI', '\xd7\xcd\xc6\x9a', 0,
+                         left, top, right, bottom, 1440, 0)
+    checksum = 0
+    for word in struct.unpack('<10h', header[:20]):
+        checksum = checksum ^ word
+    data = [header + struct.pack('<h', checksum),
+            struct.pack('<HHHIHIH', 1, 9, 0x300, 0, 0, 0, 0)]
+    for i in range(count):
+        coords = polygon_coords(i, points)
+        if i % 2:
+            function = 0x0324		# Polygon
+        else:
+            function = 0x0325		# Polyline
+        data.append(struct.pack('<ihh', 4 + len(coords), function, points))
+        data.append(struct.pack('<%dh' % len(coords), *coords))
+    data.append(struct.pack('<ih', 3, 0))
+    return ''.join(data)
+
+
+def riff_chunk(chunk_type, data, sub_type = ''):
+    data = sub_type + data
+    result = struct.pack('<4si', chunk_type, len(data)) + data
+    if len(data) % 2:
+        result = result + '\0'
+    return result
+
+def cmx_command(code, data):
+    if len(data) % 2:
+        # keep the page chunk free of padding
+        data = data + '\0'
+    return struct.pack('<hh', len(data) + 4, code) + data
+
+def cmx_tag(tag, data):
+    return struct.pack('<Bh', tag, len(data) + 3) + data
+
+def make_cmx(count, points):
+    # a 32 bit CMX file of version 2
+    cont = struct.pack('32s16s4s2s4s4s', 'Corel Corporation', 'Linux',
+                       '2', '4', '2', '0')
+    cont = cont + struct.pack('<Hd12x8l64x', 64, 1.0 / 10000,
+                              0, 0, 0, 0, 30000, 30000, 0, 0)
+    commands = [cmx_command(11, cmx_tag(1, struct.pack('<hhll', 1, 1, 0, 0)
+                                        + struct.pack('<h', 5) + 'layer')
+                            + '\377')]
+    for i in range(count):
+        coords = polygon_coords(i, points)
+        nodes = '\000' + '\100' * (points - 1)
+        if i % 2:
+            # close the path
+            nodes = '\010' + nodes[1:]
+        pointlist = (struct.pack('<h', points)
+                     + struct.pack('<%di' % len(coords), *coords) + nodes)
+        commands.append(cmx_command(67, cmx_tag(1, '\0') # no fill, outline
+                                    + cmx_tag(2, pointlist) + '\377'))
+    commands.append(cmx_command(12, ''))			# EndLayer
+    return riff_chunk('RIFF', riff_chunk('cont', cont)
+                      + riff_chunk('LIST', '', 'indx')
+                      + riff_chunk('page', ''.join(commands)), 'CMX1')
+
+
+formats = (('cgm', make_cgm), ('wmf', make_wmf), ('cmx', make_cmx))
+
+
+def count_objects(doc):
+    count = [0]
+    def count_object(object, count = count):
+        if object.is_Bezier:
+            count[0] = count[0] + 1
+    doc.WalkHierarchy(count_object)
+    return count[0]
+
+def benchmark(name, filename, repeat):
+    size = os.path.getsize(filename)
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        doc = load.load_drawing(filename)
+        duration = time.time() - start
+        if best is None or duration < best:
+            best = duration
+    print '%s: %d bytes, %d curves' % (name, size, count_objects(doc))
+    print '    %-12s %8.3fs' % ('load', best)
+    print '    %-12s %8.0f KB/s' % ('throughput', size / best / 1024)
+    print '    %-12s %s' % ('digest', md5.new(save_string(doc)).hexdigest())
+
+
+def main():
+    opts, args = getopt.getopt(sys.argv[1:], 'n:p:r:')
+    count = 5000
+    points = 50
+    repeat = 3
+    for opt, value in opts:
+        if opt == '-n':
+            count = int(value)
+        elif opt == '-p':
+            points = int(value)
+        elif opt == '-r':
+            repeat = int(value)
+    names = args or map(lambda f: f[0], formats)
+    for name, make in formats:
+        if name not in names:
+            continue
+        filename = tempfile.mktemp('.' + name)
+        try:
+            file = open(filename, 'wb')
+            file.write(make(count, points))
+            file.close()
+            benchmark(name, filename, repeat)
+        finally:
+            os.unlink(filename)
+
+if __name__ == '__main__':
+    main()
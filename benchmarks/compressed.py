@@ -0,0 +1,126 @@
+#! /usr/bin/env python
+
+# Sketch - A Python-based interactive drawing program
+# Copyright (C) 2010 by sK1 Team (http://sk1project.org)
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Library General Public
+# License as published by the Free Software Foundation; either
+# version 2 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.	See the GNU
+# Library General Public License for more details.
+#
+# You should have received a copy of the GNU Library General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307	USA
+
+#
+# Round trip check for gzip and bzip2 compressed drawings.
+#
+# usage: compressed.py [-n objects] [-r repeat] [format ...]
+#
+# A generated document is exported in each FORMAT (sk or ai, default:
+# both) and the file is compressed with gzip and bzip2. The plain and the
+# compressed files are loaded with load_drawing, the best time of REPEAT
+# runs is reported and the loaded documents are saved as .sk and
+# compared. The exit status is 1 if any of them differ or fail to load.
+#
+
+import sys, os, time, getopt, tempfile, gzip, bz2
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from skload import generate_document, save_string
+
+from Sketch import load, plugins
+from Sketch.Graphics import document
+
+# load_drawing_from_file stores messages in meta.load_messages, which is
+# only initialized by the UI
+document.MetaInfo.load_messages = ''
+
+
+formats = (('sk', 'SK-1'), ('ai', 'Adobe Illustrator'))
+
+def compress(filename, method):
+    # Write the compressed version of FILENAME and return its name
+    data = open(filename, 'rb').read()
+    if method == 'gzip':
+        compressed = filename + '.gz'
+        file = gzip.GzipFile(compressed, 'wb')
+    else:
+        compressed = filename + '.bz2'
+        file = bz2.BZ2File(compressed, 'w')
+    file.write(data)
+    file.close()
+    return compressed
+
+def load_file(filename, repeat):
+    # Load FILENAME REPEAT times. Return the best time and the document
+    # saved as .sk
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        doc = load.load_drawing(filename)
+        duration = time.time() - start
+        if best is None or duration < best:
+            best = duration
+    return best, save_string(doc)
+
+def check(name, filename, repeat):
+    # Load FILENAME and its compressed versions and compare them. Return
+    # true if all of them give the same document.
+    ok = 1
+    duration, expected = load_file(filename, repeat)
+    print '%-8s %7.3fs  %d bytes' % (name, duration,
+                                     os.path.getsize(filename))
+    for method in ('gzip', 'bzip2'):
+        compressed = compress(filename, method)
+        label = '%s.%s' % (name, os.path.splitext(compressed)[1][1:])
+        try:
+            try:
+                duration, data = load_file(compressed, repeat)
+            except Exception, value:
+                print '%-8s FAILED: %s' % (label, value)
+                ok = 0
+                continue
+            if data == expected:
+                result = 'ok'
+            else:
+                result = 'DIFFERENT'
+                ok = 0
+            print '%-8s %7.3fs  %d bytes  %s' \
+                  % (label, duration, os.path.getsize(compressed), result)
+        finally:
+            os.unlink(compressed)
+    return ok
+
+
+def main():
+    opts, args = getopt.getopt(sys.argv[1:], 'n:r:')
+    count = 2000
+    repeat = 3
+    for opt, value in opts:
+        if opt == '-n':
+            count = int(value)
+        elif opt == '-r':
+            repeat = int(value)
+    names = args or map(lambda f: f[0], formats)
+    doc = generate_document(count)
+    ok = 1
+    for name, format_name in formats:
+        if name not in names:
+            continue
+        filename = tempfile.mktemp('.' + name)
+        try:
+            plugins.find_export_plugin(format_name)(doc, filename)
+            ok = check(name, filename, repeat) and ok
+        finally:
+            os.unlink(filename)
+    return not ok
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+#! /usr/bin/env python
+
+# Sketch - A Python-based interactive drawing program
+# Copyright (C) 2010 by sK1 Team (http://sk1project.org)
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Library General Public
+# License as published by the Free Software Foundation; either
+# version 2 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.	See the GNU
+# Library General Public License for more details.
+#
+# You should have received a copy of the GNU Library General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307	USA
+
+#
+# Microbenchmark for the connector.
+#
+# usage: connector.py [-n receivers] [-r repeat]
+#
+# Connects N receivers to one channel of a publisher (like N clones of
+# one object or N objects sharing a style), issues a message, and
+# disconnects them again. The same is done with a list based connector
+# as used before the receivers were kept in dictionaries. Also measures
+# queueing N distinct messages with a QueueingPublisher and checks that
+# receivers are removed when their instances are deleted.
+#
+
+import sys, os, time, getopt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src', 'skencil'))
+
+import Sketch
+from Sketch.connector import Connector, QueueingPublisher
+
+
+class ListConnector:
+
+    # the receivers of a channel in a list, removed with list.remove
+
+    def __init__(self):
+        self.connections = {}
+
+    def Connect(self, object, channel, function, args):
+        channels = self.connections.setdefault(id(object), {})
+        receivers = channels.setdefault(channel, [])
+        info = (function, args)
+        try:
+            receivers.remove(info)
+        except ValueError:
+            pass
+        receivers.append(info)
+
+    def Disconnect(self, object, channel, function, args):
+        receivers = self.connections[id(object)][channel]
+        receivers.remove((function, args))
+        if not receivers:
+            del self.connections[id(object)][channel]
+
+    def Issue(self, object, channel, *args):
+        for func, fargs in self.connections[id(object)][channel]:
+            apply(func, args + fargs)
+
+
+class Receiver:
+
+    def __init__(self):
+        self.count = 0
+
+    def changed(self, *args):
+        self.count = self.count + 1
+
+
+class ListQueue:
+
+    def __init__(self):
+        self.message_queue = []
+
+    def queue_message(self, channel, *args):
+        message = (channel, args)
+        if message not in self.message_queue:
+            self.message_queue.append(message)
+
+
+def time_connector(connector, receivers, repeat):
+    publisher = Receiver()
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        for receiver in receivers:
+            connector.Connect(publisher, 'CHANGED', receiver.changed, ())
+        connector.Issue(publisher, 'CHANGED', publisher)
+        for receiver in receivers:
+            connector.Disconnect(publisher, 'CHANGED', receiver.changed, ())
+        duration = time.time() - start
+        if best is None or duration < best:
+            best = duration
+    return best
+
+
+def time_queue(queue, count, repeat):
+    best = None
+    for i in range(repeat):
+        queue.message_queue = []
+        queue.queued_messages = {}
+        start = time.time()
+        for j in range(count):
+            queue.queue_message('CHANGED', j)
+            queue.queue_message('CHANGED', j)
+        duration = time.time() - start
+        if best is None or duration < best:
+            best = duration
+    return best
+
+
+def main():
+    opts, args = getopt.getopt(sys.argv[1:], 'n:r:')
+    count = 2000
+    repeat = 3
+    for opt, value in opts:
+        if opt == '-n':
+            count = int(value)
+        elif opt == '-r':
+            repeat = int(value)
+
+    receivers = []
+    for i in range(count):
+        receivers.append(Receiver())
+
+    print 'connect, issue, disconnect %d receivers' % count
+    old = time_connector(ListConnector(), receivers, repeat)
+    new = time_connector(Connector(), receivers, repeat)
+    print '    %-12s %8.3fs' % ('lists', old)
+    print '    %-12s %8.3fs' % ('dictionaries', new)
+    print '    speedup      %8.2f' % (old / new)
+
+    print 'queue %d messages twice' % count
+    old = time_queue(ListQueue(), count, repeat)
+    new = time_queue(QueueingPublisher(), count, repeat)
+    print '    %-12s %8.3fs' % ('lists', old)
+    print '    %-12s %8.3fs' % ('dictionaries', new)
+    print '    speedup      %8.2f' % (old / new)
+
+    ok = 1
+    connector = Connector()
+    publisher = Receiver()
+    for receiver in receivers:
+        connector.Connect(publisher, 'CHANGED', receiver.changed, ())
+    del receivers, receiver
+    if connector.HasSubscribers(publisher):
+        print 'ERROR: receivers of deleted instances are still connected'
+        ok = 0
+    return not ok
+
+if __name__ == '__main__':
+    sys.exit(main())
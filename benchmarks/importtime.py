@@ -0,0 +1,269 @@
+#! /usr/bin/env python
+
+# Sketch - A Python-based interactive drawing program
+# Copyright (C) 2010 by sK1 Team (http://sk1project.org)
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Library General Public
+# License as published by the Free Software Foundation; either
+# version 2 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.	See the GNU
+# Library General Public License for more details.
+#
+# You should have received a copy of the GNU Library General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307	USA
+
+#
+# Measure the startup cost of Sketch per imported module.
+#
+# usage: importtime.py [-r repeat] [-n modules] [entry ...]
+#
+# Each entry point is run in a child process of its own with an
+# importer that records how long each module took to load, both in
+# total and without the modules it imported itself. The best of REPEAT
+# runs is reported with the N modules with the highest self time.
+#
+# The entry points are:
+#
+#	import		import Sketch
+#	init_lib	import Sketch and call init_lib (plugin configuration)
+#	load		init_lib and load a drawing with load_drawing
+#	export		load and export the drawing as SVG
+#	postscript	load and print the drawing with a PostScriptDevice
+#	ui		init_ui (not run by default)
+#
+# All but ui are non-interactive. The benchmark fails if they load
+# Tkinter, PIL, pax or modules of Sketch.UI. Note that init_lib uses the
+# caches in ~/.sketch, the first run fills them if necessary.
+#
+
+import sys, os, time, getopt, tempfile, marshal, imp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src', 'skencil'))
+
+
+# Modules that non-interactive programs should not load. Modules are
+# matched by their first and last name components, because the
+# extension modules in Sketch/Modules can be imported both as e.g. pax
+# and Sketch.pax.
+heavy_modules = ('Tkinter', '_tkinter', 'tkinter', 'paxtkinter', 'pax',
+                 'PIL', 'Image', 'gtk', 'gtkutils', 'skpixmaps')
+
+def is_heavy(name):
+    names = name.split('.')
+    return (names[0] in heavy_modules or names[-1] in heavy_modules
+            or name[:10] == 'Sketch.UI.' or name == 'Sketch.UI')
+
+
+class ImportTimer:
+
+    # An importer on sys.meta_path that loads modules like the builtin
+    # import machinery, but records the load time of each module, in
+    # total and without the modules imported while loading it. Modules
+    # it can't find are left to the builtin machinery, which fails in
+    # the same way, so that the traceback of the ImportError doesn't
+    # differ (configutil looks at it for the userhooks module).
+
+    def __init__(self):
+        self.stack = []		# [start time, time of nested loads]
+        self.times = {}		# module name -> (self time, total time)
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        sys.meta_path.remove(self)
+
+    def find_module(self, fullname, path = None):
+        try:
+            found = imp.find_module(fullname.split('.')[-1], path)
+        except ImportError:
+            return None
+        return ModuleLoader(self, found)
+
+    def load_module(self, fullname, found):
+        file, pathname, description = found
+        frame = [time.time(), 0.0]
+        self.stack.append(frame)
+        try:
+            return imp.load_module(fullname, file, pathname, description)
+        finally:
+            if file is not None:
+                file.close()
+            total = time.time() - frame[0]
+            del self.stack[-1]
+            self.times[fullname] = (total - frame[1], total)
+            if self.stack:
+                self.stack[-1][1] = self.stack[-1][1] + total
+
+class ModuleLoader:
+
+    def __init__(self, timer, found):
+        self.timer = timer
+        self.found = found
+
+    def load_module(self, fullname):
+        return self.timer.load_module(fullname, self.found)
+
+
+def load_document_file(filename, count = 500):
+    # Write a drawing with rectangles, ellipses and curves to FILENAME.
+    # It's written directly, so that the parent process doesn't have to
+    # import Sketch.
+    lines = ['##Sketch 1 2', 'document()', "layout('A4',0)",
+             "layer('Layer 1',1,1,0,0,(0,0,0))"]
+    for i in range(count):
+        x = (i % 50) * 10
+        y = (i / 50) * 10
+        lines.append('fp((%g,%g,%g))' % ((i % 7) / 7.0, (i % 11) / 11.0,
+                                          (i % 13) / 13.0))
+        lines.append('lw(%g)' % ((i % 4) * 0.5))
+        kind = i % 3
+        if kind == 0:
+            lines.append('r(8,0,0,6,%d,%d)' % (x, y))
+        elif kind == 1:
+            lines.append('e(4,0,0,3,%d,%d)' % (x + 4, y + 3))
+        else:
+            lines.append('b()')
+            lines.append('bs(%d,%d,0)' % (x, y))
+            lines.append('bc(%d,%d,%d,%d,%d,%d,0)'
+                         % (x + 1, y + 8, x + 5, y + 9, x + 8, y))
+            lines.append('bs(%d,%d,0)' % (x, y))
+            lines.append('bC()')
+    file = open(filename, 'w')
+    file.write('\n'.join(lines) + '\n')
+    file.close()
+
+
+def run_entry(entry, filename):
+    # Run the entry point ENTRY in this process
+    import Sketch
+    if entry == 'import':
+        return
+    if entry == 'ui':
+        Sketch.init_ui()
+        return
+    Sketch.init_lib()
+    if entry == 'init_lib':
+        return
+    from Sketch import load
+    from Sketch.Graphics import document
+    # load_drawing_from_file stores messages in meta.load_messages,
+    # which is only initialized by the UI
+    document.MetaInfo.load_messages = ''
+    doc = load.load_drawing(filename)
+    if entry == 'export':
+        from Sketch import plugins
+        saver = plugins.find_export_plugin(plugins.guess_export_plugin('.svg'))
+        output = tempfile.mktemp('.svg')
+        saver(doc, output)
+        os.unlink(output)
+    elif entry == 'postscript':
+        from Sketch import PostScriptDevice
+        output = tempfile.mktemp('.ps')
+        device = PostScriptDevice(output, as_eps = 1,
+                                  bounding_box = tuple(doc.BoundingRect()),
+                                  document = doc)
+        doc.Draw(device)
+        device.Close()
+        os.unlink(output)
+
+def measure(entry, filename):
+    # Run ENTRY in a child process and return the total time, the
+    # module times and the names of all loaded modules
+    read_fd, write_fd = os.pipe()
+    sys.stdout.flush()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        timer = ImportTimer()
+        try:
+            timer.install()
+            start = time.time()
+            run_entry(entry, filename)
+            duration = time.time() - start
+            timer.uninstall()
+            modules = filter(lambda name: sys.modules[name] is not None,
+                             sys.modules.keys())
+            result = (duration, timer.times, modules)
+        except Exception, value:
+            result = 'failed: %s' % value
+        file = os.fdopen(write_fd, 'wb')
+        marshal.dump(result, file)
+        file.close()
+        os._exit(0)
+    os.close(write_fd)
+    file = os.fdopen(read_fd, 'rb')
+    result = marshal.load(file)
+    file.close()
+    os.waitpid(pid, 0)
+    return result
+
+
+entries = ('import', 'init_lib', 'load', 'export', 'postscript', 'ui')
+default_entries = entries[:-1]
+
+def report(entry, result, count):
+    duration, times, modules = result
+    print '%s: %.3fs, %d modules' % (entry, duration, len(modules))
+    items = map(lambda item: (item[1][0], item[1][1], item[0]), times.items())
+    items.sort()
+    items.reverse()
+    print '    %8s %8s  %s' % ('self', 'total', 'module')
+    for own, total, name in items[:count]:
+        print '    %7.1fms %7.1fms  %s' % (own * 1000, total * 1000, name)
+    heavy = filter(is_heavy, modules)
+    heavy.sort()
+    if entry == 'ui':
+        return 1
+    if heavy:
+        print '    ERROR: loads %s' % ', '.join(heavy)
+        return 0
+    return 1
+
+
+def main():
+    opts, args = getopt.getopt(sys.argv[1:], 'n:r:')
+    count = 15
+    repeat = 3
+    for opt, value in opts:
+        if opt == '-n':
+            count = int(value)
+        elif opt == '-r':
+            repeat = int(value)
+    for entry in args:
+        if entry not in entries:
+            print 'unknown entry point', entry
+            return 1
+    names = args or default_entries
+    filename = tempfile.mktemp('.sk')
+    ok = 1
+    try:
+        load_document_file(filename)
+        for entry in entries:
+            if entry not in names:
+                continue
+            best = None
+            for i in range(repeat):
+                result = measure(entry, filename)
+                if type(result) == type(''):
+                    best = result
+                    break
+                if best is None or result[0] < best[0]:
+                    best = result
+            if type(best) == type(''):
+                print '%s: %s' % (entry, best)
+                ok = 0
+            else:
+                ok = report(entry, best, count) and ok
+    finally:
+        os.unlink(filename)
+    return not ok
+
+if __name__ == '__main__':
+    sys.exit(main())
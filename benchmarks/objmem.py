@@ -0,0 +1,141 @@
+#! /usr/bin/env python
+
+# Sketch - A Python-based interactive drawing program
+# Copyright (C) 2010 by sK1 Team (http://sk1project.org)
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Library General Public
+# License as published by the Free Software Foundation; either
+# version 2 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.	See the GNU
+# Library General Public License for more details.
+#
+# You should have received a copy of the GNU Library General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307	USA
+
+#
+# Measure the memory used per primitive graphics object.
+#
+# usage: objmem.py [-n objects] [type ...]
+#
+# For each primitive type (rectangle, ellipse, bezier, text, image)
+# N objects are created with a solid fill and inserted into a document,
+# their bounding rects are computed and the growth of the resident set
+# size is reported in bytes per object. Each type is measured in a
+# child process of its own, so that the results don't influence each
+# other.
+#
+
+import sys, os, getopt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src', 'skencil'))
+
+import Sketch
+Sketch.init_lib()
+
+from Sketch import Document, Rectangle, Ellipse, PolyBezier, SimpleText, \
+     Group, CreatePath, SolidPattern, StandardColors, Point, Trafo, \
+     Translation
+from Sketch.Graphics.image import Image, ImageData
+
+
+def resident_size():
+    # the resident set size of this process in bytes
+    file = open('/proc/self/statm')
+    try:
+        return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    finally:
+        file.close()
+
+
+def make_rectangle(i, shared):
+    return Rectangle(Trafo(8, 0, 0, 6, i % 100, i / 100))
+
+def make_ellipse(i, shared):
+    return Ellipse(Trafo(4, 0, 0, 3, i % 100, i / 100))
+
+def make_bezier(i, shared):
+    path = CreatePath()
+    path.AppendLine(Point(i % 100, i / 100))
+    path.AppendBezier(Point(1, 2), Point(3, 4), Point(5, 0))
+    path.AppendLine(Point(i % 100, i / 100))
+    path.ClosePath()
+    return PolyBezier((path,))
+
+def make_text(i, shared):
+    return SimpleText(Translation(i % 100, i / 100), 'text')
+
+def make_image(i, shared):
+    if not shared:
+        import PIL.Image
+        shared.append(ImageData(PIL.Image.new('RGB', (4, 4))))
+    return Image(shared[0], trafo = Translation(i % 100, i / 100))
+
+types = (('rectangle', make_rectangle),
+         ('ellipse', make_ellipse),
+         ('bezier', make_bezier),
+         ('text', make_text),
+         ('image', make_image))
+
+
+def measure(make, count):
+    # Return the number of bytes per object created by MAKE
+    doc = Document(create_layer = 1)
+    shared = []
+    # create one object first, so that the memory used by module level
+    # caches is not attributed to the objects
+    make(0, shared)
+    fill = SolidPattern(StandardColors.red)
+    start = resident_size()
+    objects = []
+    for i in range(count):
+        object = make(i, shared)
+        object.SetProperties(fill_pattern = fill)
+        objects.append(object)
+        if len(objects) == 100:
+            doc.Insert(Group(objects))
+            objects = []
+    if objects:
+        doc.Insert(Group(objects))
+    doc.WalkHierarchy(lambda object: object.bounding_rect)
+    return float(resident_size() - start) / count
+
+
+def main():
+    opts, args = getopt.getopt(sys.argv[1:], 'n:')
+    count = 50000
+    for opt, value in opts:
+        if opt == '-n':
+            count = int(value)
+    names = args or map(lambda t: t[0], types)
+    ok = 1
+    for name, make in types:
+        if name not in names:
+            continue
+        read_fd, write_fd = os.pipe()
+        sys.stdout.flush()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            try:
+                result = '%.0f' % measure(make, count)
+            except Exception, value:
+                result = 'failed: %s' % value
+            os.write(write_fd, result)
+            os._exit(0)
+        os.close(write_fd)
+        result = os.read(read_fd, 1000)
+        os.close(read_fd)
+        os.waitpid(pid, 0)
+        if result[:6] == 'failed':
+            ok = 0
+        print '%-12s %s bytes/object' % (name, result)
+    return not ok
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#! /usr/bin/env python
+
+# Sketch - A Python-based interactive drawing program
+# Copyright (C) 2010 by sK1 Team (http://sk1project.org)
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Library General Public
+# License as published by the Free Software Foundation; either
+# version 2 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.	See the GNU
+# Library General Public License for more details.
+#
+# You should have received a copy of the GNU Library General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307	USA
+
+#
+# Check the shared resources of the PostScript output.
+#
+# usage: psresources.py [-n copies]
+#
+# A document with N copies of the same image and of the same EPS file is
+# printed with each image encoding, once into a file and once into a
+# pipe like the print dialog does. The output of both must be the same.
+# The size of the output and the resource statistics are reported. The
+# exit status is 1 if printing fails or the outputs differ.
+#
+
+import sys, os, getopt, tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src', 'skencil'))
+
+import Sketch
+Sketch.init_lib()
+
+from Sketch import Document, Translation, PostScriptDevice
+from Sketch.Graphics import image, eps
+
+eps_file = """\
+%!PS-Adobe-3.0 EPSF-3.0
+%%BoundingBox: 0 0 100 100
+%%EndComments
+0 0 moveto 100 100 lineto stroke
+%%EOF
+"""
+
+def make_document(count, eps_filename):
+    from PIL import Image
+    im = Image.new('RGB', (64, 64))
+    im.putdata(map(lambda i: (i % 256, (i / 64) * 4, 128), range(64 * 64)))
+    data = image.ImageData(im)
+    doc = Document(create_layer = 1)
+    for i in range(count):
+        doc.Insert(image.Image(data, trafo = Translation(i * 70, 0)))
+        doc.Insert(eps.EpsImage(filename = eps_filename,
+                                trafo = Translation(i * 110, 100)))
+    return doc
+
+def print_document(doc, file, encoding):
+    device = PostScriptDevice(file, as_eps = 1,
+                              bounding_box = tuple(doc.BoundingRect()),
+                              document = doc, image_encoding = encoding)
+    doc.Draw(device)
+    device.Close()
+    return device.ResourceStatistics()
+
+def check(doc, encoding):
+    filename = tempfile.mktemp('.ps')
+    piped = tempfile.mktemp('.ps')
+    try:
+        stats = print_document(doc, filename, encoding)
+        pipe = os.popen('cat > ' + piped, 'w')
+        try:
+            print_document(doc, pipe, encoding)
+        finally:
+            pipe.close()
+        data = open(filename).read()
+        ok = data == open(piped).read()
+    finally:
+        for name in (filename, piped):
+            if os.path.exists(name):
+                os.unlink(name)
+    if ok:
+        result = 'ok'
+    else:
+        result = 'DIFFERENT'
+    print '%-8s %8d bytes  %s  %s' % (encoding, len(data), result, stats)
+    return ok
+
+
+def main():
+    opts, args = getopt.getopt(sys.argv[1:], 'n:')
+    count = 5
+    for opt, value in opts:
+        if opt == '-n':
+            count = int(value)
+    eps_filename = tempfile.mktemp('.eps')
+    ok = 1
+    try:
+        file = open(eps_filename, 'w')
+        file.write(eps_file)
+        file.close()
+        doc = make_document(count, eps_filename)
+        for encoding in ('hex', 'ascii85', 'flate'):
+            try:
+                ok = check(doc, encoding) and ok
+            except IOError, value:
+                print '%-8s FAILED: %s' % (encoding, value)
+                ok = 0
+    finally:
+        os.unlink(eps_filename)
+    return not ok
+
+if __name__ == '__main__':
+    sys.exit(main())
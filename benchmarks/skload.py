@@ -0,0 +1,174 @@
+#! /usr/bin/env python
+
+# Sketch - A Python-based interactive drawing program
+# Copyright (C) 2010 by sK1 Team (http://sk1project.org)
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Library General Public
+# License as published by the Free Software Foundation; either
+# version 2 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.	See the GNU
+# Library General Public License for more details.
+#
+# You should have received a copy of the GNU Library General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307	USA
+
+#
+# Compare the line based driver of the SK loader with the bulk driver.
+#
+# usage: skload.py [-n objects] [-r repeat] [file.sk ...]
+#
+# Without file arguments a document with the given number of objects
+# is generated and saved to a temporary file first. Each file is loaded
+# with both drivers, the best time of REPEAT runs is reported and the
+# documents created by both drivers are saved again and compared. Both
+# drivers use the same C functions to parse the lines and the bezier
+# segments, so the speedup only shows what the bulk driver saves in
+# reading and dispatching the lines.
+#
+
+import sys, os, re, time, getopt, tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src', 'skencil'))
+
+import Sketch
+Sketch.init_lib()
+
+from Sketch import Document, Rectangle, Ellipse, PolyBezier, SimpleText, \
+     Group, CreatePath, CreateRGBColor, SolidPattern, Point, Trafo, \
+     Translation, plugins
+
+
+def generate_document(count):
+    doc = Document(create_layer = 1)
+    objects = []
+    for i in range(count):
+        x = (i % 100) * 10.0
+        y = (i / 100) * 10.0
+        kind = i % 5
+        if kind == 0:
+            object = Rectangle(Trafo(8, 0, 0, 6, x, y))
+        elif kind == 1:
+            object = Ellipse(Trafo(4, 0, 0, 3, x + 4, y + 3))
+        elif kind == 4 and i % 50 == 4:
+            object = SimpleText(Translation(x, y), 'text %d' % i)
+        else:
+            paths = []
+            for j in range(kind):
+                path = CreatePath()
+                path.AppendLine(Point(x, y + j))
+                for k in range(20):
+                    path.AppendBezier(Point(x + k * 0.3, y + 1 + j),
+                                      Point(x + k * 0.3 + 0.1, y + 2 + j),
+                                      Point(x + k * 0.3 + 0.2, y + j))
+                    path.AppendLine(Point(x + k * 0.3 + 0.25, y + j + 0.5))
+                if j % 2:
+                    path.AppendLine(path.Node(0))
+                    path.ClosePath()
+                paths.append(path)
+            object = PolyBezier(tuple(paths))
+        object.SetProperties(fill_pattern =
+                             SolidPattern(CreateRGBColor((i % 7) / 7.0,
+                                                         (i % 11) / 11.0,
+                                                         (i % 13) / 13.0)),
+                             line_width = (i % 4) * 0.5)
+        objects.append(object)
+        if len(objects) == 10:
+            doc.Insert(Group(objects))
+            objects = []
+    if objects:
+        doc.Insert(Group(objects))
+    return doc
+
+
+def save_string(doc):
+    # the saver needs a real file for inline image data
+    filename = tempfile.mktemp('.sk')
+    try:
+        plugins.find_export_plugin('SK-1')(doc, filename)
+        data = open(filename).read()
+    finally:
+        os.unlink(filename)
+    # image ids are derived from object addresses. Number them
+    # consecutively so that the output can be compared.
+    ids = {}
+    for id in re.findall(r'(?m)^bm\((\d+)', data):
+        ids[id] = str(len(ids))
+    return re.sub(r'(?m)^(bm\(|im\(.*,)(\d+)',
+                  lambda match: match.group(1) + ids.get(match.group(2),
+                                                         match.group(2)),
+                  data)
+
+
+def get_sk_loader():
+    for info in plugins.import_plugins:
+        if info.format_name == 'SK-1':
+            return info
+    raise RuntimeError('SK-1 import filter not found')
+
+
+def load(filename, bulk):
+    info = get_sk_loader()
+    file = open(filename, 'r')
+    line = file.readline()
+    match = info.rx_magic.match(line)
+    loader = info.load_module().SKLoader(file, filename, match)
+    loader.bulk_load = bulk
+    start = time.time()
+    doc = loader.Load()
+    duration = time.time() - start
+    file.close()
+    return doc, duration
+
+
+def benchmark(filename, repeat):
+    print '%s (%d bytes)' % (filename, os.path.getsize(filename))
+    # the drivers take turns, so that changes in the load of the machine
+    # affect both of them alike
+    results = {0: (None, None), 1: (None, None)}
+    for i in range(repeat):
+        for bulk in (0, 1):
+            doc, duration = load(filename, bulk)
+            best = results[bulk][1]
+            if best is None or duration < best:
+                best = duration
+            results[bulk] = (doc, best)
+    for bulk, name in ((0, 'line based'), (1, 'bulk')):
+        print '    %-12s %8.3fs' % (name, results[bulk][1])
+    print '    speedup      %8.2f' % (results[0][1] / results[1][1])
+    if save_string(results[0][0]) != save_string(results[1][0]):
+        print '    ERROR: documents differ'
+        return 0
+    return 1
+
+
+def main():
+    opts, args = getopt.getopt(sys.argv[1:], 'n:r:')
+    count = 20000
+    repeat = 3
+    for opt, value in opts:
+        if opt == '-n':
+            count = int(value)
+        elif opt == '-r':
+            repeat = int(value)
+    temp = None
+    if not args:
+        temp = tempfile.mktemp('.sk')
+        plugins.find_export_plugin('SK-1')(generate_document(count), temp)
+        args = [temp]
+    ok = 1
+    try:
+        for filename in args:
+            ok = benchmark(filename, repeat) and ok
+    finally:
+        if temp is not None:
+            os.unlink(temp)
+    return not ok
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -185,7 +185,8 @@ if __name__ == "__main__":
                         ('MINOR_VERSION', '6')],
             sources=[filter_src + 'streamfilter.c', filter_src + 'filterobj.c', filter_src + 'linefilter.c',
                     filter_src + 'subfilefilter.c', filter_src + 'base64filter.c', filter_src + 'nullfilter.c',
-                    filter_src + 'stringfilter.c', filter_src + 'binfile.c', filter_src + 'hexfilter.c'])
+                    filter_src + 'stringfilter.c', filter_src + 'binfile.c', filter_src + 'hexfilter.c',
+                    filter_src + 'ascii85filter.c'])
 
     intl_src = src_path + 'extensions/Pax/'
 
@@ -337,7 +338,7 @@ Copyright (C) 2010 by Igor E. Novikov. sK1 Team (http://sk1project.org)
                         'Resources/Pixmaps/New12/*.*'] + messages_dirs
             },
 
-            scripts=['src/script/skencil'],
+            scripts=['src/script/skencil', 'src/script/skencil-export'],
 
             data_files=[
                     ('/usr/share/applications', ['src/skencil.desktop', ]),
@@ -104,8 +104,6 @@ from math import pi, hypot
 from types import IntType, StringType, ListType
 import string
 
-from PIL import Image
-
 import streamfilter
 
 from Sketch import Document, Layer, CreatePath, ContSmooth, \
@@ -1016,6 +1014,7 @@ class AILoader(GenericLoader):
             mode = 'RGB'
         elif mode == 4:
             mode == 'CMYK'
+        from PIL import Image
         image = Image.fromstring(mode, (width, height), data, 'raw', mode)
         self.image(image, apply(Trafo, tuple(trafo)))
 
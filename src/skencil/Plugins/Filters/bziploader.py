@@ -26,10 +26,8 @@
 
 (''"Bzipped Files")
 
-import os
-
-from Sketch import SketchLoadError, load
-from Sketch.Lib.util import sh_quote
+from Sketch import load
+from Sketch.Lib.compressed import open_for_loading, strip_extension
 
 class BZIP2Loader:
 
@@ -44,12 +42,27 @@ class BZIP2Loader:
         self.doc_class = doc_class
 
     def Load(self):
-        basename, ext = os.path.splitext(self.filename)
-        if ext != '.bz2':
-            basename = self.filename
-        stream = os.popen('bzip2 -d -c ' + sh_quote(self.filename))
-        doc = load.load_drawing_from_file(stream, basename,
-                                          doc_class = self.doc_class)
+        # The data is decompressed in-process. load_drawing_from_file
+        # detects the format of the decompressed data again. Only
+        # drawings in the native format are read while they're
+        # decompressed, the other import filters may need a real file.
+        if self.filename:
+            basename = strip_extension(self.filename)
+            file = open(self.filename, 'rb')
+        else:
+            basename = ''
+            file = self.file
+            file.seek(0)
+        try:
+            stream = open_for_loading(file, 'bzip2', load.is_native_format)
+            try:
+                doc = load.load_drawing_from_file(stream, basename,
+                                                  doc_class = self.doc_class)
+            finally:
+                stream.close()
+        finally:
+            if self.filename:
+                file.close()
         if doc:
             doc.meta.compressed = "bzip2"
             doc.meta.compressed_file = self.filename
@@ -47,6 +47,7 @@ from Sketch import _, Trafo, Scale, Translation, Point, Polar, CreatePath, \
 
 from Sketch.warn import INTERNAL, warn_tb
 from Sketch.load import GenericLoader, SketchLoadError
+from Sketch.Lib.binreader import BinaryReader
 import Sketch.Graphics.font
 from Sketch.Graphics import text
 
@@ -357,7 +358,7 @@ class CGMLoader(GenericLoader):
 
     def __init__(self, file, filename, match):
         GenericLoader.__init__(self, file, filename, match)
-        self.file = file
+        self.file = BinaryReader(file, '!')
         self.verbosity = 15
         self.IntF = (self.i8, self.i16, self.i24, self.i32)
         self.CardF = (self.u8, self.u16, self.u24, self.u32)
@@ -382,8 +383,7 @@ class CGMLoader(GenericLoader):
             sys.stdout.write(text)
 
     def unpack(self, format):
-        size = struct.calcsize(format)
-        return struct.unpack(format, self.file.read(size))
+        return self.file.unpack(format)
 
     def u8(self):
         return self.unpack("!B")[0]
@@ -416,7 +416,7 @@ class CGMLoader(GenericLoader):
         return t[0] + t[1] / 65536.0
 
     def fip64(self):
-        t = self.unpack("!hH")
+        t = self.unpack("!iI")
         return t[0] + t[1] / (65536.0 * 65536.0)
 
     def flp32(self):
@@ -443,6 +443,21 @@ class CGMLoader(GenericLoader):
     def Pnt(self):
         return (self.VDC() , self.VDC())
 
+    # struct codes of the VDC types and precisions that can be unpacked
+    # directly. 24 bit integers and fixed point reals are read one by
+    # one.
+    vdc_codes = (('b', 'h', None, 'i'), (None, None, 'f', 'd'))
+
+    def Points(self, count):
+        # Read COUNT points and return them transformed with self.trafo
+        code = self.vdc_codes[reff.vdc.type][reff.vdc.prec]
+        if code is not None:
+            return self.file.points(code, count, self.trafo)
+        points = []
+        for i in range(count):
+            points.append(self.trafo(self.Pnt()))
+        return points
+
     def getstr(self):
         lng = self.u8()
         return self.unpack("!" + `lng` + "s")[0]
@@ -752,9 +767,12 @@ class CGMLoader(GenericLoader):
         reff.clip.rect = (self.Pnt(), self.Pnt())
 
     def Path(self, size):
+        count = size / (2 * reff.vdc.size)
+        code = self.vdc_codes[reff.vdc.type][reff.vdc.prec]
+        if code is not None:
+            return self.file.path(code, count, self.trafo)
         path = CreatePath()
-        for i in range(size / (2 * reff.vdc.size)):
-            path.AppendLine(self.trafo(self.Pnt()))
+        map(path.AppendLine, self.Points(count))
         return path
 
     def setlinestyle(self):
@@ -775,14 +793,14 @@ class CGMLoader(GenericLoader):
 
 #   0x4040:
     def DISJTLINE(self, size):
-        path = ()
-        for i in range(size / (4 * reff.vdc.size)):
+        path = []
+        points = self.Points(2 * (size / (4 * reff.vdc.size)))
+        for i in range(0, len(points), 2):
             subpath = CreatePath()
-            P = self.Pnt()
-            subpath.AppendLine(self.trafo(P))
-            P = self.Pnt()
-            subpath.AppendLine(self.trafo(P))
-            path = path + (subpath,)
+            subpath.AppendLine(points[i])
+            subpath.AppendLine(points[i + 1])
+            path.append(subpath)
+        path = tuple(path)
         self.setlinestyle()
         self.bezier(path)
 
@@ -831,23 +849,35 @@ class CGMLoader(GenericLoader):
 
 #   0x4100:
     def POLYGONSET(self, size):
-        path = ()
+        path = []
         subpath = CreatePath()
-        for i in range(size / (2 * reff.vdc.size + 2)):
-            P = self.Pnt()
-            F = self.Enum()
-            subpath.AppendLine(self.trafo(P))
-            if F in (2,3):
+        count = size / (2 * reff.vdc.size + 2)
+        code = self.vdc_codes[reff.vdc.type][reff.vdc.prec]
+        if code is not None:
+            # the points and their edge out flags in one go
+            data = self.file.array(code + code + 'h', count)
+            points = map(self.trafo, data[0::3], data[1::3])
+            flags = data[2::3]
+        else:
+            points = []
+            flags = []
+            for i in range(count):
+                points.append(self.trafo(self.Pnt()))
+                flags.append(self.Enum())
+        for i in range(count):
+            subpath.AppendLine(points[i])
+            if flags[i] in (2,3):
                 if subpath.Node(-1) != subpath.Node(0):
                     subpath.AppendLine(subpath.Node(0))
                 subpath.load_close()
-                path = path + (subpath,)
+                path.append(subpath)
                 subpath = CreatePath()
         if subpath.len != 0:
             if subpath.Node(-1) != subpath.Node(0):
                 subpath.AppendLine(subpath.Node(0))
             subpath.load_close()
-            path = path + (subpath,)
+            path.append(subpath)
+        path = tuple(path)
         self.setfillstyle()
         self.bezier(path)
 
@@ -1072,19 +1102,17 @@ class CGMLoader(GenericLoader):
                 getattr(self, CGM_ID[Id])(size)
             else:
                 if Id:
-                    self.file.read(pdsz)
+                    self.file.skip(pdsz)
                     name = CGM_ID.get(Id, '')
                     Class = Id >> 12
                     Elem = (Id & 0x0fff) >> 5
                     self._print(2, '*** unimplemented: %4x; class = %d, element = %2d  %s' 
                                 , Id , Class , Elem, name)
             pos = pos + hdsz + pdsz
-            if tell() < pos:
-                self.file.read(pos - tell())
-            elif tell() > pos:
+            if tell() > pos:
                 self._print(2, 'read too many bytes')
-                self.file.seek(pos - tell(), 1)
-            if pos != tell():
+            self.file.seek(pos)
+            if pos > self.file.size:
                 raise SketchLoadError("Lost position in File")
 
 
@@ -88,6 +88,7 @@ from Sketch import CreatePath, ContSmooth, ContAngle, ContSymmetrical, \
 from Sketch.warn import INTERNAL, warn_tb
 from Sketch.load import GenericLoader, SketchLoadError, EmptyCompositeError
 from Sketch.Lib import units
+from Sketch.Lib.binreader import BinaryReader, transform_coords
 
 
 #
@@ -290,16 +291,10 @@ class CMXFile:
         return chunks
 
     def read_16(self):
-        read = self.file.read
-        lo, hi = read(2)
-        value = ord(lo) + 256 * ord(hi)
-        if value > 0x7FFF:
-            value = value - 0x010000
-        return value
+        return self.file.unpack('<h')[0]
 
     def read_32(self):
-        data = self.file.read(4)
-        return int(unpack('<i', data)[0])
+        return self.file.unpack('<i')[0]
 
     def read_angle(self):
         angle = self.read_32()
@@ -1213,11 +1208,7 @@ class CMXInterpreter16(CMXInterpreter):
         self.get_rendering_attrs()
         count = self.get_int16()
         self._print('	  %d points\n', count)
-        points = [];
-        coords = get_struct(count * 'ii')
-        append = points.append
-        for i in range(0, 2 * count, 2):
-            append(trafo(coords[i], coords[i + 1]))
+        points = transform_coords(trafo, get_struct(count * 'ii'))
         nodes = map(ord, self.get_bytes(count))
         if len(nodes) != len(points):
             self._print('lengths of nodes and points differ\n')
@@ -1692,11 +1683,7 @@ class CMXInterpreter32(CMXInterpreter):
         get_struct = self.source.read_struct; trafo = self.trafo
         count = self.get_int16()
         self._print('pointlist: %d points\n', count)
-        points = [];
-        coords = get_struct(count * 'ii')
-        append = points.append
-        for i in range(0, 2 * count, 2):
-            append(trafo(coords[i], coords[i + 1]))
+        points = transform_coords(trafo, get_struct(count * 'ii'))
         nodes = map(ord, self.get_bytes(count))
         if len(nodes) != len(points):
             self._print('lengths of nodes and points differ\n')
@@ -1835,7 +1822,7 @@ class CMXLoader(GenericLoader):
 
     def Load(self):
         try:
-            cmx = CMXFile(self, self.file)
+            cmx = CMXFile(self, BinaryReader(self.file, '<'))
             cmx.Load()
             self.document()
             prefix = ''
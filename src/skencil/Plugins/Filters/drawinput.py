@@ -71,8 +71,6 @@ from Sketch.Graphics import pagelayout
 
 from Sketch import SolidPattern, EmptyPattern
 
-from PIL import Image
-
 from Lib import drawfile
 
 scale = float(drawfile.units_per_point)
@@ -489,6 +487,7 @@ class DrawfileLoader(GenericLoader):
                                    x, y )
 
                 # Decode the JPEG image
+                from PIL import Image
                 image = Image.open(StringIO.StringIO(object.image))
 
 #                # Read dimensions of images in pixels
@@ -555,6 +554,7 @@ class DrawfileLoader(GenericLoader):
                     transform = Trafo( scale_x, 0.0, 0.0, scale_y, x, y )
 
                 # Create an Image object
+                from PIL import Image
                 image = Image.fromstring(object.sprite['mode'],
                                          (object.sprite['width'],
                                           object.sprite['height']),
@@ -26,10 +26,8 @@
 
 (''"Gzipped Files")
 
-import os
-
-from Sketch import SketchLoadError, load
-from Sketch.Lib.util import sh_quote
+from Sketch import load
+from Sketch.Lib.compressed import open_for_loading, strip_extension
 
 class GZIPLoader:
 
@@ -44,19 +42,32 @@ class GZIPLoader:
         self.doc_class = doc_class
 
     def Load(self):
+        # The data is decompressed in-process. load_drawing_from_file
+        # detects the format of the decompressed data again. Only
+        # drawings in the native format are read while they're
+        # decompressed, the other import filters may need a real file.
         if self.filename:
-            basename, ext = os.path.splitext(self.filename)
-            if ext != '.gz':
-                basename = self.filename
-            stream = os.popen('gzip -d -c ' + sh_quote(self.filename))
-            doc = load.load_drawing_from_file(stream, basename,
-                                              doc_class = self.doc_class)
-            if doc:
-                doc.meta.compressed = "gzip"
-                doc.meta.compressed_file = self.filename
-                self.messages = doc.meta.load_messages
-            return doc
-        raise SketchLoadError('gziploader must be instantiated with filename')
+            basename = strip_extension(self.filename)
+            file = open(self.filename, 'rb')
+        else:
+            basename = ''
+            file = self.file
+            file.seek(0)
+        try:
+            stream = open_for_loading(file, 'gzip', load.is_native_format)
+            try:
+                doc = load.load_drawing_from_file(stream, basename,
+                                                  doc_class = self.doc_class)
+            finally:
+                stream.close()
+        finally:
+            if self.filename:
+                file.close()
+        if doc:
+            doc.meta.compressed = "gzip"
+            doc.meta.compressed_file = self.filename
+            self.messages = doc.meta.load_messages
+        return doc
 
     def Messages(self):
         return self.messages
@@ -24,7 +24,6 @@
 ###End
 
 from math import atan2, pi
-import PIL
 from Sketch import Bezier, EmptyPattern, Rotation, Translation, _sketch
 from Sketch.Graphics.curveop import arrow_trafos
 import reportlab.pdfgen.canvas
@@ -199,6 +198,7 @@ class PDFGenSaver:
         rot = Rotation(angle, center)
         left, bottom, right, top = rot(rect)
         trafo = rot(Translation(center))
+        import PIL.Image
         image = PIL.Image.new('RGB', (1, 200))
         border = int(round(100 * pattern.Border()))
         _sketch.fill_axial_gradient(image.im, pattern.Gradient().Colors(),
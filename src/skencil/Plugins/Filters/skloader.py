@@ -28,7 +28,7 @@ format_name = 'SK-1'
 
 from types import StringType, TupleType
 import os, sys
-from string import atoi
+from string import atoi, split, join, find, count
 
 from Sketch.warn import warn, INTERNAL, pdebug, warn_tb
 
@@ -299,6 +299,14 @@ class SKLoader(GenericLoader):
     def guidelayer(self, *args, **kw):
         self.begin_layer_class(GuideLayer, args, kw)
 
+    functions.append('bn')
+    def bn(self):
+        self.object.paths = self.object.paths + (CreatePath(),)
+
+    functions.append('bC')
+    def bC(self):
+        self.object.paths[-1].load_close()
+
     def bezier_load(self, line):
         bezier = self.object
         while 1:
@@ -444,20 +452,89 @@ class SKLoader(GenericLoader):
     #	The loader driver
     #
 
+    # If true, Load reads the file in large chunks and parses many lines
+    # per call of skread.parse_sk_lines. Otherwise the file is read and
+    # parsed line by line.
+    bulk_load = 1
+    bulk_chunk_size = 256 * 1024
+
     def Load(self):
         file = self.file
         if type(file) == StringType:
-            file = open(file, 'r')
+            file = self.file = open(file, 'r')
+        if __debug__:
+            import time
+            start_time = time.clock()
+
+        if self.bulk_load:
+            self.load_chunks(file)
+        else:
+            self.load_lines(file)
+
+        self.end_all()
+        if self.page_layout:
+            self.object.load_SetLayout(self.page_layout)
+        for style in self.style_dict.values():
+            self.object.load_AddStyle(style)
+        self.object.load_Completed()
+
+        self.object.meta.native_format = 1
+
+        if __debug__:
+            pdebug('timing', 'time:', time.clock() - start_time)
+        return self.object
+
+    def invoke(self, function, args, kwargs):
+        try:
+            apply(function, args, kwargs)
+        except TypeError:
+            tb = sys.exc_info()[2]
+            try:
+                if tb.tb_next is None:
+                    # the exception was raised by apply and not within
+                    # the function. Try to invoke the function with
+                    # fewer arguments
+                    if call_function(function, args, kwargs):
+                        message = _("Omitted some arguments "
+                                    "for function %s")
+                    else:
+                        message = _("Cannot call function %s")
+                    self.add_message(message % function.__name__)
+                else:
+                    raise
+            finally:
+                del tb
+
+    def handle_load_error(self, num, line):
+        # Called from the except clause of the drivers. Convert the
+        # current exception to a SketchLoadError.
+        type, value = sys.exc_info()[:2]
+        if issubclass(type, SketchLoadError) or issubclass(type, SyntaxError):
+            # a loader specific error occurred
+            warn_tb(INTERNAL, 'error in line %d', num)
+            if load._dont_handle_exceptions:
+                raise
+            else:
+                raise SketchLoadError('%d:%s' % (num, value))
+        else:
+            # An exception was not converted to a SketchLoadError.
+            # This should be considered a bug.
+            warn_tb(INTERNAL, 'error in line %d:\n%s', num, `line`)
+            if load._dont_handle_exceptions:
+                raise
+            else:
+                raise SketchLoadError(_("error %s:%s in line %d:\n%s")
+                                      % (type, value, num, `line`))
+
+    def load_lines(self, file):
         dict = self.get_func_dict()
         from Sketch import skread
         parse = skread.parse_sk_line2
         readline = file.readline
         bezier_load = self.bezier_load
+        invoke = self.invoke
         num = 1
         line = '#'
-        if __debug__:
-            import time
-            start_time = time.clock()
         try:
             line = readline()
             while line:
@@ -465,68 +542,160 @@ class SKLoader(GenericLoader):
                 if line[0] == 'b' and line[1] in 'sc':
                     line = bezier_load(line)
                     continue
-                #parse(line, dict)
                 funcname, args, kwargs = parse(line)
                 if funcname is not None:
                     function = dict.get(funcname)
                     if function is not None:
-                        try:
-                            apply(function, args, kwargs)
-                        except TypeError:
-                            tb = sys.exc_info()[2]
-                            try:
-                                if tb.tb_next is None:
-                                    # the exception was raised by apply
-                                    # and not within the function. Try to
-                                    # invoke the function with fewer
-                                    # arguments
-                                    if call_function(function, args, kwargs):
-                                        message = _("Omitted some arguments "
-                                                    "for function %s")
-                                    else:
-                                        message = _("Cannot call function %s")
-                                    self.add_message(message
-                                                     % function.__name__)
-
-                                else:
-                                    raise
-                            finally:
-                                del tb
+                        invoke(function, args, kwargs)
                     else:
                         self.add_message(_("Unknown function %s") % funcname)
 
                 line = readline()
-
-        except (SketchLoadError, SyntaxError), value:
-            # a loader specific error occurred
-            warn_tb(INTERNAL, 'error in line %d', num)
-            if load._dont_handle_exceptions:
-                raise
-            else:
-                raise SketchLoadError('%d:%s' % (num, value))
         except:
-            # An exception was not converted to a SketchLoadError.
-            # This should be considered a bug.
-            warn_tb(INTERNAL, 'error in line %d:\n%s', num, `line`)
-            if load._dont_handle_exceptions:
-                raise
-            else:
-                raise SketchLoadError(_("error %s:%s in line %d:\n%s")
-                                      % (sys.exc_info()[:2] +(num, `line`)))
-
-        self.end_all()
-        if self.page_layout:
-            self.object.load_SetLayout(self.page_layout)
-        for style in self.style_dict.values():
-            self.object.load_AddStyle(style)
-        self.object.load_Completed()
-
-        self.object.meta.native_format = 1
-
-        if __debug__:
-            pdebug('timing', 'time:', time.clock() - start_time)
-        return self.object
+            self.handle_load_error(num, line)
 
+    def bezier_run(self, run):
+        # Append the segments in RUN, a string with consecutive bs and
+        # bc lines as returned by parse_sk_lines, to the current path.
+        while run:
+            path = length = None
+            try:
+                path = self.object.paths[-1]
+                length = path.len
+                path.append_from_string(run)
+                return
+            except:
+                # Every line appends one segment, so the number of new
+                # segments tells us which line failed. Skip it and go
+                # on with the rest.
+                lines = split(run, '\n')
+                if length is not None:
+                    failed = path.len - length
+                else:
+                    failed = 0
+                warn(INTERNAL, _("Error reading line %s"), `lines[failed]`)
+                run = join(lines[failed + 1:], '\n')
+
+    def split_inline_data(self, buffer, read):
+        # Return a tuple (data, rest) where DATA is the inline data at
+        # the start of BUFFER up to and including the terminating '-'
+        # and REST is what follows it. Read more from the file if
+        # necessary.
+        pos = find(buffer, '-')
+        if pos >= 0:
+            return buffer[:pos + 1], buffer[pos + 1:]
+        pieces = [buffer]
+        while 1:
+            data = read(self.bulk_chunk_size)
+            if not data:
+                return join(pieces, ''), ''
+            pos = find(data, '-')
+            if pos >= 0:
+                pieces.append(data[:pos + 1])
+                return join(pieces, ''), data[pos + 1:]
+            pieces.append(data)
+
+    def load_chunks(self, file):
+        dict = self.get_func_dict()
+        from Sketch import skread
+        from streamfilter import StringDecode
+        parse_lines = skread.parse_sk_lines
+        read = file.read
+        chunk_size = self.bulk_chunk_size
+        bezier_run = self.bezier_run
+        invoke = self.invoke
+        # functions that read inline data from the file
+        stop = {'bm': 1}
+        num = 1
+        line = '#'
+        buffer = ''
+        chunk = None
+        index = 0
+        eof = 0
+        try:
+            while not eof:
+                data = read(chunk_size)
+                if data:
+                    buffer = buffer + data
+                else:
+                    eof = 1
+                    if buffer[-1:] != '\n':
+                        buffer = buffer + '\n'
+                while 1:
+                    chunk = buffer
+                    records, consumed, lines = parse_lines(chunk, stop)
+                    buffer = chunk[consumed:]
+                    stopped = 0
+                    for index in range(len(records)):
+                        record = records[index]
+                        if type(record) == StringType:
+                            bezier_run(record)
+                            continue
+                        funcname, args, kwargs = record
+                        function = dict.get(funcname)
+                        if function is None:
+                            self.add_message(_("Unknown function %s")
+                                             % funcname)
+                        elif stop.has_key(funcname):
+                            stopped = 1
+                            if len(args) > 1 or kwargs:
+                                # not inline
+                                invoke(function, args, kwargs)
+                                continue
+                            data, buffer = self.split_inline_data(buffer,
+                                                                  read)
+                            lines = lines + count(data, '\n')
+                            self.file = StringDecode(data, None)
+                            try:
+                                invoke(function, args, kwargs)
+                            finally:
+                                self.file = file
+                        else:
+                            invoke(function, args, kwargs)
+                    chunk = None
+                    num = num + lines
+                    if stopped:
+                        continue
+                    pos = find(buffer, '\n')
+                    if pos >= 0:
+                        # parse_sk_lines stopped at a line it could not
+                        # parse. Let parse_sk_line2 raise the SyntaxError
+                        num = num + 1
+                        line = buffer[:pos + 1]
+                        skread.parse_sk_line2(line)
+                        raise SyntaxError('parse error')
+                    break
+        except:
+            if chunk is not None:
+                num, line = locate_record(chunk, index, num)
+            self.handle_load_error(num, line)
+
+def locate_record(chunk, index, num):
+    # Return the number and the text of the line in CHUNK from which
+    # parse_sk_lines created the record with index INDEX. NUM is the
+    # number of the line preceding the chunk. This is only needed for
+    # error messages, so it doesn't have to be fast.
+    from Sketch import skread
+    lines = split(chunk, '\n')
+    record = -1
+    in_bezier = 0
+    for i in range(len(lines)):
+        line = lines[i]
+        if line[:1] == 'b' and line[1:2] in ('s', 'c') \
+           and line[2:3] in ('(', ' '):
+            if not in_bezier:
+                record = record + 1
+                in_bezier = 1
+        else:
+            in_bezier = 0
+            try:
+                if skread.parse_sk_line2(line)[0] is not None:
+                    record = record + 1
+            except SyntaxError:
+                record = record + 1
+        if record == index:
+            return num + i + 1, line
+    return num + len(lines), ''
 
 def call_function(function, args, kwargs):
     if hasattr(function, 'im_func'):
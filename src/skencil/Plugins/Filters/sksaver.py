@@ -239,6 +239,10 @@ format_name = 'SK-1'
 #
 
 import os
+from string import join
+from types import FileType
+from binascii import b2a_base64
+from cStringIO import StringIO
 
 from Sketch.Lib.util import relpath, Empty
 from Sketch import IdentityMatrix, EmptyPattern, SolidPattern, Style, \
@@ -281,12 +285,77 @@ class SketchSaveError(SketchError):
 def color_repr(color):
     return '(%g,%g,%g)' % tuple(color)
 
+
+class BufferedWriter:
+
+    # Collect the strings written by the saver in a list and write them
+    # to the real file in large chunks. write is the append method of
+    # the list, so that the saver's many small writes are as cheap as
+    # possible. This matters most for file objects implemented in
+    # Python like StringIO or GzipFile.
+    #
+    # The saver calls maybe_flush at object boundaries. It must not be
+    # called while the saver is collecting the output of write_style.
+
+    max_chunks = 2000
+
+    def __init__(self, file):
+        self.file = file
+        self.chunks = []
+        self.write = self.chunks.append
+
+    def maybe_flush(self):
+        if len(self.chunks) >= self.max_chunks:
+            self.flush()
+
+    def flush(self):
+        if self.chunks:
+            self.file.write(join(self.chunks, ''))
+            del self.chunks[:]
+
+
+def pattern_key(pattern):
+    # Return a hashable key for pattern if write_style writes it
+    # directly, None otherwise.
+    if pattern is EmptyPattern:
+        return 'e'
+    if pattern.__class__ is SolidPattern:
+        return ('s', pattern.Color())
+    return None
+
+style_properties = ('fill_transform', 'line_width', 'line_cap',
+                    'line_join', 'line_dashes', 'line_arrow1',
+                    'line_arrow2', 'font', 'font_size')
+
+def style_key(style):
+    # Return a key for the values of all properties of STYLE written by
+    # write_style or None if the style can't be cached, e.g. because it
+    # has a gradient that has to be written with its own records. Two
+    # styles with the same key are written identically.
+    dict = style.__dict__
+    key = []
+    append = key.append
+    for name in ('fill_pattern', 'line_pattern'):
+        if dict.has_key(name):
+            pattern = pattern_key(dict[name])
+            if pattern is None:
+                return None
+            append(pattern)
+        else:
+            append(None)
+    for name in style_properties:
+        if dict.has_key(name):
+            append((dict[name],))
+        else:
+            append(None)
+    return tuple(key)
+
 default_options = {'full_blend' : 0}
 
 class SKSaver:
 
     def __init__(self, file, filename, kw):
-        self.file = file
+        self.file = BufferedWriter(file)
         self.filename = filename
         if self.filename:
             self.directory = os.path.split(filename)[0]
@@ -298,12 +367,15 @@ class SKSaver:
         options.update(kw)
         self.options = apply(Empty, (), options)
         self.saved_ids = {}
+        # map style keys to the saved text of the style
+        self.style_cache = {}
+        self.style_no_defaults_cache = {}
 
     def __del__(self):
         self.Close()
 
     def Close(self):
-        pass
+        self.file.flush()
         #if not self.file.closed:
         #    self.file.close()
 
@@ -394,7 +466,32 @@ class SKSaver:
         self.file.write('pit(%d,(%g,%g,%g,%g,%g,%g))\n'
                         % ((id(image),) + trafo.coeff()))
 
+    def cached_style(self, cache, write_style, style):
+        # Write STYLE with the method WRITE_STYLE and remember the
+        # output in CACHE so that styles with the same properties can
+        # be written without formatting them again.
+        key = style_key(style)
+        if key is None:
+            write_style(style)
+            return
+        try:
+            text = cache.get(key)
+        except TypeError:
+            # a property value is not hashable
+            write_style(style)
+            return
+        if text is None:
+            chunks = self.file.chunks
+            start = len(chunks)
+            write_style(style)
+            text = cache[key] = join(chunks[start:], '')
+            del chunks[start:]
+        self.file.write(text)
+
     def write_style(self, style):
+        self.cached_style(self.style_cache, self.write_style_uncached, style)
+
+    def write_style_uncached(self, style):
         write = self.file.write
         if hasattr(style, 'fill_pattern'):
             pattern = style.fill_pattern
@@ -444,17 +541,22 @@ class SKSaver:
         self.file.write('dstyle(%s)\n' % `style.Name()`)
 
     def write_style_no_defaults(self, style):
+        self.cached_style(self.style_no_defaults_cache,
+                          self.write_style_no_defaults_uncached, style)
+
+    def write_style_no_defaults_uncached(self, style):
         style = style.Copy()
         for key, value in base_style.__dict__.items():
             if hasattr(style, key) and getattr(style, key) == value:
                 delattr(style, key)
-        self.write_style(style)
+        self.write_style_uncached(style)
 
     def Properties(self, properties):
+        self.file.maybe_flush()
         styles = properties.stack[:]
         styles.reverse()
         if styles[0].is_dynamic:
-            self.file.write('style(%s)\n' % `style[0].Name()`)
+            self.file.write('style(%s)\n' % `styles[0].Name()`)
         else:
             self.write_style_no_defaults(styles[0])
         for style in styles[1:]:
@@ -484,20 +586,10 @@ class SKSaver:
         for path in paths:
             if path is not paths[0]:
                 write('bn()\n')
-            try:
-                path.write_to_file(self.file)
-            except TypeError:
-                # self.file is no ordinary file (not tested!)
-                list = path.get_save()
-                for item in list:
-                    if len(item) == 3:
-                        write('bs(%g,%g,%d)\n' % item)
-                    elif len(item) == 7:
-                        write('bc(%g,%g,%g,%g,%g,%g,%d)\n' % item)
-                    else:
-                        raise SketchSaveError('got ivalid item: ' + `item`)
+            write(path.get_save_string())
             if path.closed:
                 write("bC()\n")
+        self.file.maybe_flush()
 
     def SimpleText(self, text, trafo, halign, valign):
         write = self.file.write
@@ -515,11 +607,8 @@ class SKSaver:
         if not self.saved_ids.has_key(id(image)):
             imagefile = image.Filename()
             if not imagefile:
-                from streamfilter import Base64Encode
                 write('bm(%d)\n' % id(image))
-                file = Base64Encode(self.file)
-                image.image.save(file, 'PPM')
-                file.close()
+                self.write_image_data(image)
                 write('-\n')
             else:
                 if self.directory and relative_filename:
@@ -527,6 +616,23 @@ class SKSaver:
                 write('bm(%d,%s)\n' % (id(image), `imagefile`))
             self.saved_ids[id(image)] = image
 
+    def write_image_data(self, image):
+        self.file.flush()
+        if type(self.file.file) == FileType:
+            from streamfilter import Base64Encode
+            file = Base64Encode(self.file.file)
+            image.image.save(file, 'PPM')
+            file.close()
+        else:
+            # Base64Encode needs a real file. Encode the data in memory
+            # with the same line length.
+            data = StringIO()
+            image.image.save(data, 'PPM')
+            data = data.getvalue()
+            write = self.file.write
+            for i in range(0, len(data), 57):
+                write(b2a_base64(data[i:i + 57]))
+
     def Image(self, image, trafo, relative_filename = 1):
         self.write_image(image, relative_filename)
 
@@ -612,4 +718,5 @@ class SKSaver:
 def save(document, file, filename, options = {}):
     saver = SKSaver(file, filename, options)
     document.SaveToFile(saver)
+    saver.Close()
 
@@ -56,6 +56,7 @@ from Sketch import _, Trafo, Scale, Translation, Point, Polar, CreatePath, \
 
 from Sketch.warn import INTERNAL, warn_tb
 from Sketch.load import GenericLoader, SketchLoadError
+from Sketch.Lib.binreader import BinaryReader
 
 
 struct_wmf_header = ('<'
@@ -172,7 +173,7 @@ class WMFLoader(GenericLoader):
 
     def __init__(self, file, filename, match):
         GenericLoader.__init__(self, file, filename, match)
-        self.file = file
+        self.file = BinaryReader(file, '<')
         self.curstyle = Style()
         self.verbosity = 0
         self.gdiobjects = []
@@ -195,8 +196,7 @@ class WMFLoader(GenericLoader):
             sys.stdout.write(text)
 
     def get_struct(self, format):
-        size = calcsize(format)
-        return unpack(format, self.file.read(size))
+        return self.file.unpack(format)
 
     def get_int16(self):
         return self.get_struct('<h')[0]
@@ -363,19 +363,11 @@ class WMFLoader(GenericLoader):
     SetStretchBltMode = noop
 
     def read_points(self, num):
-        coords = self.get_struct('<' + num * 'hh')
-        points = [];
-        append = points.append
-        trafo = self.trafo
-        for i in range(0, 2 * num, 2):
-            append(trafo(coords[i], coords[i + 1]))
-        return points
+        return self.file.points('h', num, self.trafo)
 
     def Polyline(self):
-        points = self.read_points(self.get_int16())
-        if points:
-            path = CreatePath()
-            map(path.AppendLine, points)
+        path = self.file.path('h', self.get_int16(), self.trafo)
+        if path.len:
             self.prop_stack.AddStyle(self.curstyle.Duplicate())
             self.prop_stack.SetProperty(fill_pattern = EmptyPattern)
             self.bezier((path,))
@@ -384,10 +376,8 @@ class WMFLoader(GenericLoader):
         #    self._print('->', points[i])
 
     def Polygon(self):
-        points = self.read_points(self.get_int16())
-        if points:
-            path = CreatePath()
-            map(path.AppendLine, points)
+        path = self.file.path('h', self.get_int16(), self.trafo)
+        if path.len:
             if path.Node(-1) != path.Node(0):
                 #print 'correct polygon'
                 path.AppendLine(path.Node(0))
@@ -405,10 +395,8 @@ class WMFLoader(GenericLoader):
             nr_of_points.append(self.get_int16())
         path = ()
         for i in nr_of_points:
-            points = self.read_points(i)
-            if points:
-                subpath = CreatePath()
-                map(subpath.AppendLine, points)
+            subpath = self.file.path('h', i, self.trafo)
+            if subpath.len:
                 if subpath.Node(-1) != subpath.Node(0):
                     subpath.AppendLine(subpath.Node(0))
                 subpath.load_close()
@@ -500,15 +488,13 @@ class WMFLoader(GenericLoader):
                 getattr(self, wmf_functions[function])()
             else:
                 if function:
-                    self.file.read(2 * (size - 3))
+                    self.file.skip(2 * (size - 3))
                     self._print('*** unimplemented:',
                                 wmf_functions.get(function, ''))
             pos = pos + 2 * size
-            if tell() < pos:
-                self.file.read(pos - tell())
-            elif tell() > pos:
+            if tell() > pos:
                 self._print('read too many bytes')
-                self.file.seek(pos - tell(), 1)
+            self.file.seek(pos)
 
     def Load(self):
         self.document()
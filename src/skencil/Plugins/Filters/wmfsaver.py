@@ -357,12 +357,10 @@ class WMFSaver:
         trafos = object.CharacterTransformations()
         text = object.Text()
         base_trafo = Scale(properties.font_size)
-        for i in range(len(trafos)):
-            outline = properties.font.GetOutline(text[i])
-            trafo = trafos[i](base_trafo)
-            for path in outline:
-                path.Transform(trafo)
-                paths.append(path)
+        trafos = map(lambda trafo, base = base_trafo: trafo(base), trafos)
+        for outline in properties.font.GetOutlines(text[:len(trafos)],
+                                                   trafos):
+            paths.extend(outline)
         self.PolyBezier(paths, properties)
 
     def SaveObjects(self, Objects):
@@ -17,7 +17,9 @@
 # License along with this library; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
-from Sketch import CreatePath, Point, _
+from array import array
+
+from Sketch import _
 from Sketch.UI.sketchdlg import SKModal
 
 from Tkinter import *
@@ -55,6 +57,26 @@ class AverageDialog(SKModal):
     def ok(self, *args):
         self.close_dlg(self.var_which.get())
 
+# The coordinates of a path are handled as one array of doubles, six per
+# segment (see the coords method of curve objects): the two control
+# points and the node.
+
+def selected_nodes(path):
+    # the indices of the selected nodes. The last node of a closed path
+    # is the same as the first one and therefore not included.
+    length = path.len
+    if path.closed:
+        length = length - 1
+    return filter(path.SegmentSelected, range(length))
+
+def move_node(data, i, dx, dy):
+    # move node I and its control points by DX, DY. The control points
+    # of line segments are ignored by SetCoords.
+    for j in (6 * i + 2, 6 * i + 4, 6 * i + 6):
+        if j < len(data):
+            data[j] = data[j] + dx
+            data[j + 1] = data[j + 1] + dy
+
 def average_points(context):
     # find a bezier polygon selected
     selection = []
@@ -71,9 +93,7 @@ def average_points(context):
     object_paths = object.Paths()
     npoints = 0
     for path in object_paths:
-        for i in range(path.len):
-            if path.SegmentSelected(i):
-                npoints = npoints + 1
+        npoints = npoints + len(selected_nodes(path))
     if npoints == 0:
         context.application.MessageBox(title="Average Points", 
                                        message="Select two or more points.")
@@ -85,46 +105,34 @@ def average_points(context):
     # compute average coordinates of the selected points
     ax = 0
     ay = 0
-    modified_paths = []
+    coords = []
     for path in object_paths:
-        modified_paths.append([])
-        for i in range(path.len):
-            type, controls, point, cont = path.Segment(i)
-            modified_paths[-1].append([type, list(controls), point, cont])
-            if path.SegmentSelected(i):
-                ax = ax + point.x
-                ay = ay + point.y
+        data = array('d', path.coords())
+        for i in selected_nodes(path):
+            ax = ax + data[6 * i + 4]
+            ay = ay + data[6 * i + 5]
+        coords.append(data)
     ax = float(ax) / npoints
     ay = float(ay) / npoints
-    # translate the selected points
-    for i in range(len(object_paths)):
-        path = object_paths[i]
-        new_path = modified_paths[i]
-        for j in range(path.len):
-            if path.SegmentSelected(j):
-                point = new_path[j][2]
-                if which == AVERAGE_X:
-                    new_point = Point(ax, point.y)
-                elif which == AVERAGE_Y:
-                    new_point = Point(point.x, ay)
-                else:
-                    new_point = Point(ax, ay)
-                new_path[j][2] = new_point
-                offset = point - new_point
-                if len(new_path[j][1]) == 2:
-                    new_path[j  ][1][1] = new_path[j  ][1][1] - offset
-                if j < path.len - 1 and len(new_path[j+1][1]) == 2:
-                    new_path[j+1][1][0] = new_path[j+1][1][0] - offset
-    # create new paths
+    # translate the selected points and create new paths
     new_paths = []
     for i in range(len(object_paths)):
         path = object_paths[i]
-        new_path = CreatePath()
-        for type, controls, point, cont in modified_paths[i]:
-            new_path.AppendSegment(type, tuple(controls), point, cont)
-        if path.closed:
-            new_path.AppendLine(new_path.Node(0))
-            new_path.ClosePath()
+        data = coords[i]
+        for j in selected_nodes(path):
+            x = data[6 * j + 4]
+            y = data[6 * j + 5]
+            if which == AVERAGE_X:
+                dx, dy = ax - x, 0
+            elif which == AVERAGE_Y:
+                dx, dy = 0, ay - y
+            else:
+                dx, dy = ax - x, ay - y
+            move_node(data, j, dx, dy)
+            if j == 0 and path.closed:
+                move_node(data, path.len - 1, dx, dy)
+        new_path = path.Duplicate()
+        new_path.SetCoords(data)
         new_paths.append(new_path)
     # set the new paths
     undo = object.SetPaths(new_paths)
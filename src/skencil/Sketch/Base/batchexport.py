@@ -0,0 +1,388 @@
+# Sketch - A Python-based interactive drawing program
+# Copyright (C) 2010 by sK1 Team (http://sk1project.org)
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Library General Public
+# License as published by the Free Software Foundation; either
+# version 2 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.	See the GNU
+# Library General Public License for more details.
+#
+# You should have received a copy of the GNU Library General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307	USA
+
+#
+# batch export
+#
+# Provides the main() function of skencil-export, which converts
+# drawings to another format without the user interface.
+#
+# The drawings are loaded with load_drawing and saved with the export
+# plugin of the requested format. The output is written to a temporary
+# file in the output directory which is renamed to the output file only
+# if the export succeeded, so that a failed export never leaves a
+# truncated file behind. Each file is converted in a child
+# process of its own, several of them in parallel. A drawing that can't
+# be loaded or saved, or even crashes the interpreter, only affects its
+# own child: the failure is recorded and the other files are exported
+# anyway. At the end a summary is printed.
+#
+
+import sys, os, getopt, string, time, signal, traceback
+
+import Sketch
+from Sketch import _, plugins
+from Sketch.load import load_drawing
+from Sketch.Lib import util
+
+usage = ''"""\
+Usage:	skencil-export [options] file ...
+
+Export the drawings given on the command line in another format.
+
+  -f --format=FORMAT	The output format, either a format name (see
+			--list-formats) or a file extension. Default: SVG
+  -o --output-dir=DIR	Put the output files into DIR instead of the
+			directory of the input file
+  -j --jobs=N		Export N files in parallel. Default: the number
+			of processors
+  -t --timeout=SECONDS	Give up on a file after SECONDS seconds
+  -q --quiet		Only report failures and the summary
+  -l --list-formats	List the export formats and exit
+  -h --help		Print this help message
+"""
+
+def process_args(args):
+    # Read the options from the command line. Return an instance object
+    # with the instance variables:
+    #	format		format name or extension of the output files
+    #	output_dir	the directory for the output files or None
+    #	jobs		number of parallel processes or None
+    #	timeout		time limit per file in seconds or 0
+    #	quiet		whether to omit the lines for successful files
+    #	list_formats	whether to list the export formats
+    #	args		the input files
+    opts, args = getopt.getopt(args, 'f:o:j:t:qlh',
+                               ['format=', 'output-dir=', 'jobs=',
+                                'timeout=', 'quiet', 'list-formats', 'help'])
+
+    options = util.Empty(args = args,
+                         format = 'SVG',
+                         output_dir = None,
+                         jobs = None,
+                         timeout = 0,
+                         quiet = 0,
+                         list_formats = 0)
+
+    for optchar, value in opts:
+        if optchar == '-f' or optchar == '--format':
+            options.format = value
+        elif optchar == '-o' or optchar == '--output-dir':
+            options.output_dir = value
+        elif optchar == '-j' or optchar == '--jobs':
+            options.jobs = max(1, string.atoi(value))
+        elif optchar == '-t' or optchar == '--timeout':
+            options.timeout = string.atoi(value)
+        elif optchar == '-q' or optchar == '--quiet':
+            options.quiet = 1
+        elif optchar == '-l' or optchar == '--list-formats':
+            options.list_formats = 1
+        elif optchar == '-h' or optchar == '--help':
+            print _(usage)
+            sys.exit(0)
+
+    return options
+
+
+def find_saver(format):
+    # Return the ExportInfo object for FORMAT which is either a format
+    # name or a file extension with or without the leading dot. Return
+    # None if there's no such format.
+    saver = plugins.find_export_plugin(format)
+    if saver is None:
+        if format[:1] != '.':
+            format = '.' + format
+        saver = plugins.find_export_plugin(
+            plugins.guess_export_plugin(string.lower(format)))
+    return saver
+
+
+def list_formats():
+    for info in plugins.export_plugins:
+        print '%-20s %s' % (info.format_name,
+                            string.join(info.extensions, ' '))
+
+
+def number_of_processors():
+    try:
+        return max(1, os.sysconf('SC_NPROCESSORS_ONLN'))
+    except (AttributeError, ValueError, OSError):
+        return 1
+
+
+def output_filename(filename, extension, output_dir):
+    dir, name = os.path.split(filename)
+    if output_dir is not None:
+        dir = output_dir
+    return os.path.join(dir, os.path.splitext(name)[0] + extension)
+
+
+def temporary_filename(output, count):
+    # Return the name of the temporary file for OUTPUT. It's in the same
+    # directory, so that it can be renamed to OUTPUT, and unique among
+    # the files exported by this process.
+    dir, name = os.path.split(output)
+    return os.path.join(dir, '.%s.%d-%d.tmp' % (name, os.getpid(), count))
+
+
+def same_file(filename, output):
+    # Return true if writing to OUTPUT would overwrite FILENAME
+    try:
+        return os.path.samefile(filename, output)
+    except os.error:
+        # output doesn't exist (yet)
+        return os.path.realpath(filename) == os.path.realpath(output)
+
+
+def remove_file(filename):
+    try:
+        os.unlink(filename)
+    except os.error:
+        pass
+
+
+#
+#	Exporting one file
+#
+
+def export_file(filename, output, temp, saver):
+    # Export the drawing FILENAME to OUTPUT with SAVER. The drawing is
+    # written to the file TEMP first, which is renamed to OUTPUT if the
+    # export succeeds and removed if it fails. The filter still gets
+    # OUTPUT as the filename.
+    doc = load_drawing(filename)
+    try:
+        file = open(temp, 'w')
+        try:
+            saver(doc, output, file = file)
+        finally:
+            file.close()
+        os.rename(temp, output)
+    except:
+        remove_file(temp)
+        raise
+    doc.Destroy()
+
+
+def run_child(filename, output, temp, saver, timeout, fd):
+    # Export FILENAME in the child process. Failures are reported by
+    # writing a message to FD and exiting with status 1. Never returns.
+    status = 1
+    try:
+        try:
+            if timeout:
+                signal.alarm(timeout)
+            export_file(filename, output, temp, saver)
+            status = 0
+        except:
+            type, value = sys.exc_info()[:2]
+            if isinstance(value, Sketch.SketchError):
+                # load and save errors come with a message for the user
+                message = str(value)
+            else:
+                message = string.join(traceback.format_exception_only(type,
+                                                                      value),
+                                      '')
+            os.write(fd, string.strip(message)[-4000:])
+    finally:
+        os._exit(status)
+
+
+class Result:
+
+    def __init__(self, filename, output, duration, message = None):
+        self.filename = filename
+        self.output = output
+        self.duration = duration
+        self.message = message
+
+    def Failed(self):
+        return self.message is not None
+
+
+def child_result(filename, output, temp, start, status, message):
+    duration = time.time() - start
+    if os.WIFSIGNALED(status) or os.WEXITSTATUS(status) != 0:
+        # a child that was killed (e.g. by the timeout) had no chance to
+        # remove its temporary file
+        remove_file(temp)
+    if os.WIFSIGNALED(status):
+        sig = os.WTERMSIG(status)
+        if sig == signal.SIGALRM:
+            message = _("timed out")
+        else:
+            message = _("killed by signal %d") % sig
+    elif os.WEXITSTATUS(status) == 0:
+        message = None
+    elif not message:
+        message = _("exit status %d") % os.WEXITSTATUS(status)
+    return Result(filename, output, duration, message)
+
+
+#
+#	The process pool
+#
+
+def export_files(files, saver, jobs, timeout, report):
+    # Export FILES, a list of (FILENAME, OUTPUT) pairs, with SAVER,
+    # running up to JOBS child processes at once. REPORT is called with
+    # the Result of each file as soon as it is complete. Return the list
+    # of all results in the order of FILES.
+    pending = list(files)
+    running = {}	# pid -> (index, filename, output, temp, start time, fd)
+    results = [None] * len(files)
+    index = 0
+    while pending or running:
+        while pending and len(running) < jobs:
+            filename, output = pending.pop(0)
+            temp = temporary_filename(output, index)
+            read_fd, write_fd = os.pipe()
+            # don't let the child write our buffered output again
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                run_child(filename, output, temp, saver, timeout, write_fd)
+            os.close(write_fd)
+            running[pid] = (index, filename, output, temp, time.time(),
+                            read_fd)
+            index = index + 1
+        pid, status = os.wait()
+        if not running.has_key(pid):
+            continue
+        index_done, filename, output, temp, start, read_fd = running[pid]
+        del running[pid]
+        # the messages are short enough to fit into the pipe buffer, so
+        # the child can't block on the pipe and it's safe to read them
+        # after it exited
+        message = os.read(read_fd, 8192)
+        os.close(read_fd)
+        result = child_result(filename, output, temp, start, status,
+                              message)
+        results[index_done] = result
+        report(result)
+    return results
+
+
+#
+#	Reports
+#
+
+class Reporter:
+
+    def __init__(self, quiet = 0, file = None):
+        if file is None:
+            file = sys.stdout
+        self.quiet = quiet
+        self.file = file
+
+    def __call__(self, result):
+        if result.Failed():
+            # keep the report at one line per file
+            message = string.join(string.split(result.message, '\n'), ' ')
+            self.file.write(_("FAILED %7.2fs  %s: %s\n")
+                            % (result.duration, result.filename, message))
+        elif not self.quiet:
+            self.file.write(_("ok     %7.2fs  %s -> %s\n")
+                            % (result.duration, result.filename,
+                               result.output))
+        self.file.flush()
+
+    def Summary(self, results, wall_time):
+        failed = filter(lambda r: r.Failed(), results)
+        total = reduce(lambda t, r: t + r.duration, results, 0.0)
+        write = self.file.write
+        write('\n')
+        write(_("%d files, %d exported, %d failed\n")
+              % (len(results), len(results) - len(failed), len(failed)))
+        write(_("total %.2fs, elapsed %.2fs") % (total, wall_time))
+        if results:
+            slowest = results[0]
+            for result in results:
+                if result.duration > slowest.duration:
+                    slowest = result
+            write(_(", average %.2fs, slowest %.2fs (%s)")
+                  % (total / len(results), slowest.duration,
+                     slowest.filename))
+        write('\n')
+        if failed:
+            write(_("failed files:\n"))
+            for result in failed:
+                write('    %s\n' % result.filename)
+
+
+def main():
+    try:
+        options = process_args(sys.argv[1:])
+    except (getopt.error, ValueError):
+        sys.stderr.write(_(usage))
+        sys.exit(2)
+
+    Sketch.init_lib()
+
+    if options.list_formats:
+        list_formats()
+        return 0
+
+    if not options.args:
+        sys.stderr.write(_(usage))
+        return 2
+
+    saver = find_saver(options.format)
+    if saver is None:
+        sys.stderr.write(_("Unknown export format %s\n") % `options.format`)
+        return 2
+    # load the plugin before forking, so that the children share it
+    try:
+        module = saver.load_module()
+    except (Sketch.SketchError, ImportError):
+        module = None
+    if module is None:
+        sys.stderr.write(_("Cannot load filter %(name)s\n")
+                         % {'name':saver.module_name})
+        return 2
+
+    if saver.extensions:
+        extension = saver.extensions[0]
+    else:
+        extension = ''
+    reporter = Reporter(options.quiet)
+    files = []
+    skipped = []
+    for filename in options.args:
+        output = output_filename(filename, extension, options.output_dir)
+        if same_file(filename, output):
+            # never overwrite the drawing we're exporting
+            result = Result(filename, output, 0.0,
+                            _("the output file %s is the input file")
+                            % output)
+            reporter(result)
+            skipped.append(result)
+        else:
+            files.append((filename, output))
+
+    jobs = options.jobs or number_of_processors()
+    start = time.time()
+    results = export_files(files, saver, jobs, options.timeout, reporter)
+    results = skipped + results
+    reporter.Summary(results, time.time() - start)
+
+    for result in results:
+        if result.Failed():
+            return 1
+    return 0
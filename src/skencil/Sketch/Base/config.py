@@ -120,6 +120,24 @@ class ProgramDefaults(connector.Publisher):
     #	how many undo steps sketch remembers. None means unlimited.
     undo_limit = None
 
+    #	how much memory in bytes the undo information of a document may
+    #	use. When the limit is exceeded, the oldest undo steps are
+    #	discarded. The size of the undo information is only estimated.
+    #	None means unlimited.
+    undo_memory_limit = None
+
+    #	Whether to move the undo information of older steps into a
+    #	temporary file. Only the undo_hot_records most recent steps are
+    #	kept in memory completely. Objects referenced by the undo
+    #	information, like deleted objects, remain in memory.
+    undo_spill_to_disk = 0
+    undo_hot_records = 20
+
+    #	Edits of the same kind done within this many seconds of each
+    #	other, like moving an object repeatedly with the arrow keys, are
+    #	undone in one step where possible. 0 disables this.
+    undo_coalesce_interval = 1.0
+
     #
     #	Gridding
     #
@@ -183,10 +201,46 @@ class ProgramDefaults(connector.Publisher):
     # XXX see comments in graphics.py
     greek_threshold = 5
 
+    #
+    #	Level of Detail
+    #
+    #	On the screen, objects smaller than lod_threshold pixels are
+    #	drawn as a single pixel and the polygons that approximate
+    #	bezier curves omit points closer than lod_tolerance pixels to
+    #	their predecessor. The tolerance is a distance and may be
+    #	fractional. The points of the polygons are whole pixels, so a
+    #	tolerance of 1 or less only removes duplicate points; 1.5 also
+    #	removes points that touch their predecessor, even diagonally.
+    #	Printing and export always use full detail. 0 disables the
+    #	respective simplification.
+    lod_threshold = 1.0
+    lod_tolerance = 1.5
+
     #   If the metrics file for a font can't be found or if a requested
     #   font is not known at all, the (metrics of) fallback_font is used
     fallback_font = 'Times-Roman'
 
+    #   If true, the parsed font database (sfd) and metrics (afm) files
+    #   are kept in font_metrics_cache_file in the user's config
+    #   directory, so that they don't have to be parsed again on the
+    #   next start.
+    use_font_metrics_cache = 1
+
+    #   The number of glyph outlines kept in memory for converting text
+    #   to curves. If use_glyph_outline_cache is true, the outlines are
+    #   also saved in glyph_outline_cache_file in the user's config
+    #   directory when Sketch exits.
+    glyph_cache_size = 4000
+    use_glyph_outline_cache = 1
+
+    #   If true, the contents of the directories in the plugin_path
+    #   and the configuration of the plugins are kept in
+    #   plugin_cache_file in the user's config directory, so that the
+    #   plugin files don't have to be read on startup. Entries are
+    #   read again when a file or directory changes. Run skencil
+    #   --rebuild-plugin-cache to rebuild the cache from scratch.
+    use_plugin_cache = 1
+
     #
     #	Maximum Snap Distance
     #
@@ -295,6 +349,19 @@ class ProgramDefaults(connector.Publisher):
     #	renders for preview. (using gs). Leave this at 72 for now.
     eps_preview_resolution = 72
 
+    #	The number of gs processes that may render previews at the same
+    #	time while a document is loaded. The previews are rendered in
+    #	the background and the EPS objects are drawn as rectangles until
+    #	their preview is available. If this is 0, the previews are
+    #	rendered one after the other while loading.
+    eps_preview_processes = 2
+
+    #	The number of rendered previews kept in the directory
+    #	eps_preview_cache_dir in the user's config directory, so that
+    #	gs doesn't have to be run again for unchanged EPS files. 0
+    #	disables the cache.
+    eps_preview_cache_size = 500
+
     #
     #	Warning Messages
     #
@@ -366,6 +433,15 @@ class ProgramDefaults(connector.Publisher):
     #	default directory for printing to file
     print_directory = ''
 
+    #	How to encode raster images in PostScript output:
+    #	'hex'		hex strings, works with every PostScript
+    #			interpreter (Level 1)
+    #	'ascii85'	ASCII85, about 20% smaller than hex (Level 2)
+    #	'flate'		Flate compressed and ASCII85 encoded (Level 3).
+    #			Images used several times in a drawing are
+    #			included only once.
+    ps_image_encoding = 'hex'
+
     #
     #	Menus
     #
@@ -411,6 +487,36 @@ class ProgramDefaults(connector.Publisher):
     #	Mask Group
     topmost_is_mask = 1
 
+    #
+    #	Layers and Groups
+    #
+    #	Layers and groups with at least this many objects keep a
+    #	spatial index of their children, so that redraws and hit
+    #	tests only look at the objects near the affected area. None
+    #	disables the index.
+    spatial_index_threshold = 500
+
+    #
+    #	Tile Cache
+    #
+    #	The canvas keeps the rendered drawing in offscreen pixmaps of
+    #	tile_size x tile_size pixels. Exposed parts of the window are
+    #	copied from these tiles and only tiles that were changed are
+    #	drawn again. tile_cache_size is the maximum number of tiles.
+    #	0 disables the cache.
+    tile_size = 256
+    tile_cache_size = 96
+
+    #
+    #	Progressive Rendering
+    #
+    #	If rendering the drawing takes longer than render_time_slice
+    #	milliseconds, the canvas continues with the rest when the
+    #	application is idle, so that it stays responsive while huge
+    #	drawings are drawn. A change of the visible area cancels the
+    #	rendering. 0 means to always draw everything at once.
+    render_time_slice = 100
+
     #
     #   Text
     #
@@ -418,6 +524,11 @@ class ProgramDefaults(connector.Publisher):
     #   The name of the font used for new text-objects
     default_font = 'Times-Roman'
 
+    #   The maximum number of X fonts kept loaded for drawing text on
+    #   the screen. Rotated text and text at large zoom factors may
+    #   need a font for every string.
+    font_cache_size = 200
+
     #
     #	Import Filters
     #
@@ -452,6 +563,15 @@ preferences = ProgramDefaults()
 # where these settings are saved in ~/.sketch/:
 user_settings_file = 'preferences.py'
 
+# the cache for parsed font files in ~/.sketch/
+font_metrics_cache_file = 'fontmetrics.cache'
+# and for the glyph outlines
+glyph_outline_cache_file = 'glyphoutlines.cache'
+# the cache for the plugin configuration
+plugin_cache_file = 'plugins.cache'
+# and the directory for rendered EPS previews
+eps_preview_cache_dir = 'epspreviews'
+
 
 
 #
@@ -18,7 +18,24 @@
 #
 #	The Connector
 #
+# The connector maintains for each publisher and channel the list of
+# receivers, i.e. (FUNCTION, ARGS) pairs. When a message is issued on
+# a channel, each receiver is called with the message arguments
+# followed by its own ARGS.
+#
+# The receivers of a channel are kept in a dictionary, so that
+# connecting and disconnecting is O(1) even for channels with many
+# receivers (e.g. a style used by thousands of objects, or an object
+# with many clones). Receivers are called in the order in which they
+# were connected.
+#
+# Receivers that are bound methods only hold a weak reference to the
+# instance. When the instance is deleted, its receivers are removed
+# automatically, so that subscribing doesn't keep objects alive.
+# Other callables are referenced normally.
+#
 
+import weakref
 from types import MethodType
 
 from skexceptions import SketchInternalError
@@ -28,29 +45,111 @@ from warn import warn_tb, INTERNAL
 class ConnectorError(SketchInternalError):
     pass
 
+
+def function_key(function):
+    # Return the part of the dictionary key of a receiver that
+    # identifies FUNCTION. Bound methods are identified by the instance
+    # and the function, like in the comparison of method objects.
+    if type(function) == MethodType and function.im_self is not None:
+        return (id(function.im_self), function.im_func)
+    try:
+        hash(function)
+    except TypeError:
+        return id(function)
+    return function
+
+
+class Receivers:
+
+    # The receivers of one channel. ENTRIES maps the key of a receiver
+    # to a tuple (SERIAL, FUNCTION, ARGS) where FUNCTION is either the
+    # callable itself or a pair (WEAKREF, IM_FUNC) for a bound method.
+    # SERIAL defines the order of the receivers. The ordered list is
+    # built lazily when the channel is issued after a change.
+
+    def __init__(self):
+        self.entries = {}
+        self.serial = 0
+        self.ordered = ()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def find(self, fkey, args):
+        # Return the key of the receiver (FUNCTION, ARGS) where FKEY is
+        # the function_key of FUNCTION. If the receiver is not connected
+        # the return value is the key it would get.
+        try:
+            hash(args)
+        except TypeError:
+            # compare unhashable arguments by value, as a list of
+            # receivers would do.
+            for key, (serial, function, fargs) in self.entries.items():
+                if key[0] == fkey and fargs == args:
+                    return key
+            return (fkey, id(args))
+        return (fkey, args)
+
+    def add(self, key, function, args):
+        self.serial = self.serial + 1
+        self.entries[key] = (self.serial, function, args)
+        self.ordered = None
+
+    def remove(self, key):
+        del self.entries[key]
+        self.ordered = None
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def receivers(self):
+        # Return the tuple of (FUNCTION, ARGS) pairs in connection order
+        if self.ordered is None:
+            entries = self.entries.values()
+            entries.sort()
+            self.ordered = tuple(map(lambda e: e[1:], entries))
+        return self.ordered
+
+
+def _remove_dead_receiver(ref, connector_ref, idx, channel, key):
+    # called when the instance of a weakly referenced bound method
+    # is deleted
+    connector = connector_ref()
+    if connector is not None:
+        connector.remove_dead_receiver(idx, channel, key, ref)
+
+
 class Connector:
 
     def __init__(self):
-        self.connections = {}
+        self.connections = {}	# id(publisher) -> {channel: Receivers}
+        self.weak_self = weakref.ref(self)
 
     def Connect(self, object, channel, function, args):
         idx = id(object)
-        if self.connections.has_key(idx):
-            channels = self.connections[idx]
-        else:
+        channels = self.connections.get(idx)
+        if channels is None:
             channels = self.connections[idx] = {}
-
-        if channels.has_key(channel):
-            receivers = channels[channel]
-        else:
-            receivers = channels[channel] = []
-
-        info = (function, args)
-        try:
-            receivers.remove(info)
-        except ValueError:
-            pass
-        receivers.append(info)
+        receivers = channels.get(channel)
+        if receivers is None:
+            receivers = channels[channel] = Receivers()
+
+        fkey = function_key(function)
+        key = receivers.find(fkey, args)
+        if receivers.get(key) is not None:
+            # move the receiver to the end
+            receivers.remove(key)
+        if type(fkey) == type(()):
+            try:
+                ref = weakref.ref(function.im_self,
+                                  lambda ref, c = self.weak_self, i = idx,
+                                         ch = channel, k = key:
+                                  _remove_dead_receiver(ref, c, i, ch, k))
+                function = (ref, function.im_func)
+            except TypeError:
+                # the instance doesn't support weak references
+                pass
+        receivers.add(key, function, args)
 
     def Disconnect(self, object, channel, function, args):
         try:
@@ -58,20 +157,37 @@ class Connector:
         except KeyError:
             raise ConnectorError, \
                   'no receivers for channel %s of %s' % (channel, object)
-        try:
-            receivers.remove((function, args))
-        except ValueError:
+        key = receivers.find(function_key(function), args)
+        if receivers.get(key) is None:
             raise ConnectorError,\
                   'receiver %s%s is not connected to channel %s of %s' \
                   % (function, args, channel, object)
+        self.remove_receiver(id(object), channel, key)
 
+    def remove_receiver(self, idx, channel, key):
+        channels = self.connections[idx]
+        receivers = channels[channel]
+        receivers.remove(key)
         if not receivers:
-            # the list of receivers is empty now, remove the channel
-            channels = self.connections[id(object)]
+            # the channel has no receivers now, remove the channel
             del channels[channel]
             if not channels:
                 # the object has no more channels
-                del self.connections[id(object)]
+                del self.connections[idx]
+
+    def remove_dead_receiver(self, idx, channel, key, ref):
+        # Remove the receiver KEY if its instance is referenced by REF.
+        # The receiver may have been disconnected already.
+        channels = self.connections.get(idx)
+        if channels is None:
+            return
+        receivers = channels.get(channel)
+        if receivers is None:
+            return
+        entry = receivers.get(key)
+        if entry is not None and type(entry[1]) == type(()) \
+           and entry[1][0] is ref:
+            self.remove_receiver(idx, channel, key)
 
     def Issue(self, object, channel, *args):
         #print object, channel, args
@@ -79,7 +195,12 @@ class Connector:
             receivers = self.connections[id(object)][channel]
         except KeyError:
             return
-        for func, fargs in receivers:
+        for func, fargs in receivers.receivers():
+            if type(func) == type(()):
+                instance = func[0]()
+                if instance is None:
+                    continue
+                func = MethodType(func[1], instance, instance.__class__)
             try:
                 apply(func, args + fargs)
             except:
@@ -100,10 +221,13 @@ class Connector:
     def print_connections(self):
         # for debugging
         for id, channels in self.connections.items():
-            for name, subscribers in channels.items():
+            for name, receivers in channels.items():
                 print id, name
-                for func, args in subscribers:
-                    if type(func) == MethodType:
+                for func, args in receivers.receivers():
+                    if type(func) == type(()):
+                        print '\tmethod %s of %s (weak)' \
+                              % (func[1].func_name, func[0]())
+                    elif type(func) == MethodType:
                         print '\tmethod %s of %s' % (func.im_func.func_name,
                                                      func.im_self)
                     else:
@@ -157,8 +281,15 @@ class QueueingPublisher(Publisher):
         # order of channel invocation is important two or more queues
         # should be used.
         message = (channel, args)
-        if message not in self.message_queue:
-            self.message_queue.append(message)
+        try:
+            if self.queued_messages.has_key(message):
+                return
+            self.queued_messages[message] = 1
+        except TypeError:
+            # unhashable arguments
+            if message in self.message_queue:
+                return
+        self.message_queue.append(message)
 
     def flush_message_queue(self):
         # Issue all queued messages and make the queue empty
@@ -168,10 +299,11 @@ class QueueingPublisher(Publisher):
         # that we don't get infinite loops here...
         while self.message_queue:
             queue = self.message_queue
-            self.message_queue = []
+            self.clear_message_queue()
             for channel, args in queue:
                 apply(Issue, (self, channel) + args)
 
     def clear_message_queue(self):
         self.message_queue = []
+        self.queued_messages = {}	# the messages in the queue
 
@@ -315,6 +315,14 @@ class SimplifiedLoader(GenericLoader):
 
 
 do_profile = 0
+def is_native_format(line):
+    # Return true if LINE is the first line of a drawing in the native
+    # format
+    for info in plugins.import_plugins:
+        if info.format_name == plugins.NativeFormat:
+            return info.rx_magic.match(line) is not None
+    return 0
+
 def load_drawing_from_file(file, filename = '', doc_class = None):
     # Note: the doc_class argument is only here for plugin interface
     # compatibility with 0.7 (especiall e.g. gziploader)
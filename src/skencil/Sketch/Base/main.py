@@ -47,6 +47,9 @@ skencil accepts these options:
   -d --display=DISPLAY	Use DISPLAY a X Display
   -g --geometry=WxH+X+Y	The geometry of the main window in standard X fashion
   --run-script=script   Execute the file script after startup
+  --rebuild-plugin-cache
+			Read the configuration of all plugins again,
+			save it in the plugin cache and exit
   --version		Print the version number to stdout
 
 for compatibility with other X software skencil also accepts geometry
@@ -70,6 +73,7 @@ def process_args(args):
     # instance variables:
     #	display		name of the X-display or None
     #	geometry	geometry of the main window or None
+    #	rebuild_plugin_cache	whether to just rebuild the plugin cache
     #	args		rest of the arguments after the last option
     #
     # To behave more like other X-programs, sketch should accept the options
@@ -89,14 +93,15 @@ def process_args(args):
 
     opts, args = getopt.getopt(args, 'd:g:hi',
                                ['display=', 'geometry=', 'help', 'run-script=',
-                                'version'])
+                                'rebuild-plugin-cache', 'version'])
     # the option -i is a hack to allow sketch to be used as a `python
     # interpreter' in the python shell in python-mode.el
 
     options = util.Empty(args = args,
                          display = None,
                          geometry = None,
-                         run_script = None)
+                         run_script = None,
+                         rebuild_plugin_cache = 0)
 
     for optchar, value in opts:
         if optchar == '-d' or optchar == '--display':
@@ -105,6 +110,8 @@ def process_args(args):
             options.geometry = value
         elif optchar == '--run-script':
             options.run_script = value
+        elif optchar == '--rebuild-plugin-cache':
+            options.rebuild_plugin_cache = 1
         elif optchar == '-h' or optchar == '--help':
             print Sketch._(usage)
             sys.exit(0)
@@ -134,6 +141,12 @@ def main():
         sys.stderr.write(Sketch._(usage))
         sys.exit(1)
 
+    if options.rebuild_plugin_cache:
+        from Sketch import plugins
+        plugins.rebuild_plugin_cache = 1
+        Sketch.init_lib()
+        sys.exit(0)
+
     if options.args:
         filename = options.args[0]
     else:
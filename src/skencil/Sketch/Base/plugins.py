@@ -17,7 +17,7 @@
 
 import sys, os
 
-import re, imp
+import re, imp, marshal, locale
 from string import join, split
 
 from skexceptions import SketchError
@@ -26,6 +26,7 @@ import config
 
 from Sketch import _, dgettext, gettext, bindtextdomain, message_dir, \
      Subscribe, config, const
+from Sketch.Lib.diskcache import DiskCache
 
 
 # All plugins are loaded as modules in the _plugin_package_name package
@@ -193,7 +194,11 @@ class ExportInfo(ConfigInfo):
         name = self.gettext(name)
         self.tk_file_type = name, ext
 
-    def __call__(self, document, filename, file = None, options = None):
+    def __call__(self, document, filename, file = None, options = None,
+                 compressed = '', compressed_file = ''):
+        # If COMPRESSED is 'gzip' or 'bzip2' the output is compressed
+        # into the file COMPRESSED_FILE. FILENAME is still passed to the
+        # filter as the name of the uncompressed file.
         if options is None:
             options = {}
         try:
@@ -203,14 +208,20 @@ class ExportInfo(ConfigInfo):
             raise SketchError(_("Cannot load filter %(name)s")
                               % {'name':self.module_name})
         if file is None:
-            file = open(filename, 'w')
+            if compressed:
+                from Sketch.Lib.compressed import open_compressed
+                file = open_compressed(compressed_file, compressed, 'w')
+            else:
+                file = open(filename, 'w')
             close = 1
         else:
             close = 0
-        if module is not None:
-            module.save(document, file, filename, options)
-        if close:
-            file.close()
+        try:
+            if module is not None:
+                module.save(document, file, filename, options)
+        finally:
+            if close:
+                file.close()
         if self.format_name == NativeFormat:
             document.ClearEdited()
         self.UnloadPlugin()
@@ -322,42 +333,149 @@ def extract_cfg(file):
 
 
 
-def _search_dir(dir, recurse, package = 'Sketch.Plugins'):
+#
+#	The plugin cache
+#
+# Listing the directories in the plugin_path and reading the config
+# block of every plugin file takes a noticeable time on startup,
+# especially if the plugins are on a network file system. Therefore
+# the contents of the directories and the config parameters of the
+# plugins are kept in a DiskCache in the user's config directory. An
+# entry is valid as long as the modification time and size of its
+# directory or plugin file are unchanged, so a warm start only has to
+# stat them.
+#
+
+# Increment this when the values stored for directories or config
+# blocks change.
+plugin_cache_version = 1
+
+_plugin_cache = None
+
+def message_locale():
+    # Return the name of the locale used for messages. The config blocks
+    # may contain translated strings (e.g. in tk_file_type), so the
+    # cache is only valid for the locale it was written with.
     try:
-        files = os.listdir(dir)
+        return locale.setlocale(locale.LC_MESSAGES)
+    except (AttributeError, locale.Error):
+        # no LC_MESSAGES on this platform
+        return ''
+
+def plugin_cache():
+    # Return the plugin cache or None if it's disabled
+    global _plugin_cache
+    if not config.preferences.use_plugin_cache:
+        return None
+    if _plugin_cache is None:
+        filename = os.path.join(config.user_config_dir,
+                                config.plugin_cache_file)
+        _plugin_cache = DiskCache(filename, (plugin_cache_version,
+                                             message_locale()))
+    return _plugin_cache
+
+# If true, load_plugin_configuration ignores the cached information and
+# reads all plugin files again (skencil --rebuild-plugin-cache)
+rebuild_plugin_cache = 0
+
+def cacheable(value):
+    # Return true if VALUE can be stored in the cache
+    try:
+        marshal.dumps(value)
+    except ValueError:
+        return 0
+    return 1
+
+# the kinds of directory entries that matter for the plugins
+DIR_ENTRY_PLUGIN = 0
+DIR_ENTRY_DIR = 1
+DIR_ENTRY_LIB = 2
+
+def list_plugin_dir(dir, cache):
+    # Return a list of (name, kind) pairs for the plugin files and
+    # directories in DIR. Raise os.error if it can't be listed.
+    if cache is not None:
+        entries = cache.Get(dir)
+        if entries is not None:
+            return entries
+    entries = []
+    for file in os.listdir(dir):
+        filename = os.path.join(dir, file)
+        if os.path.isdir(filename):
+            if file == "Lib":
+                entries.append((file, DIR_ENTRY_LIB))
+            else:
+                entries.append((file, DIR_ENTRY_DIR))
+        elif filename[-3:] == '.py':
+            entries.append((file, DIR_ENTRY_PLUGIN))
+    if cache is not None:
+        cache.Set(dir, entries)
+    return entries
+
+def read_plugin_config(filename, cache):
+    # Return the name of the plugin type and the parameters defined in
+    # the config block of the plugin FILENAME. The type is None if the
+    # block doesn't define one.
+    if cache is not None:
+        cfg = cache.Get(filename)
+        if cfg is not None:
+            return cfg
+    vars = {'_':_}	# hack
+    exec extract_cfg(filename) in config_types, vars
+    del vars['_']
+    plugin_type = None
+    infoclass = vars.get('type')
+    if infoclass is not None:
+        del vars['type']
+        for name, value in config_types.items():
+            if value is infoclass:
+                plugin_type = name
+    cfg = (plugin_type, vars)
+    if cache is not None and plugin_type is not None and cacheable(cfg):
+        cache.Set(filename, cfg)
+    return cfg
+
+
+def _search_dir(dir, recurse, package = 'Sketch.Plugins', cache = None,
+                seen = None):
+    # SEEN, if given, is a dictionary into which the names of the
+    # directories and files looked at are put.
+    try:
+        entries = list_plugin_dir(dir, cache)
     except os.error, value:
         warn(USER, _("Cannot list directory %(filename)s\n%(message)s"),
              filename = dir, message = value[1])
         return
-    for file in files:
+    if seen is not None:
+        seen[dir] = 1
+    for file, kind in entries:
         filename = os.path.join(dir, file)
-        if os.path.isdir(filename):
-            if file == "Lib":
-                # A Lib directory on the plugin path. It's assumed to
-                # hold library files for some plugin. Append it to the
-                # current package's .Lib package's __path__ so that it's
-                # modules can be imported by prefixing their names with
-                # Lib.
-                lib_pkg = create_packages(package + '.Lib')
-                lib_pkg.__path__.append(filename)
-            elif recurse:
+        if kind == DIR_ENTRY_LIB:
+            # A Lib directory on the plugin path. It's assumed to
+            # hold library files for some plugin. Append it to the
+            # current package's .Lib package's __path__ so that it's
+            # modules can be imported by prefixing their names with
+            # Lib.
+            lib_pkg = create_packages(package + '.Lib')
+            lib_pkg.__path__.append(filename)
+        elif kind == DIR_ENTRY_DIR:
+            if recurse:
                 # an ordinary directory and we should recurse into it to
                 # find more modules, so do that.
-                _search_dir(filename, recurse - 1, package + '.' + file)
-        elif filename[-3:] == '.py':
+                _search_dir(filename, recurse - 1, package + '.' + file,
+                            cache, seen)
+        else:
+            if seen is not None:
+                seen[filename] = 1
             try:
-                module_name = os.path.splitext(os.path.basename(filename))[0]
-                vars = {'_':_}	# hack
-                cfg = extract_cfg(filename)
-                exec cfg in config_types, vars
-                infoclass = vars.get('type')
-                if infoclass is None:
+                module_name = os.path.splitext(file)[0]
+                plugin_type, vars = read_plugin_config(filename, cache)
+                if plugin_type is None:
                     warn(USER, _("No plugin-type information in %(filename)s"),
                          filename = filename)
                 else:
-                    del vars['type']
-                    del vars['_']
-                    info = apply(infoclass, (module_name, dir), vars)
+                    info = apply(config_types[plugin_type], (module_name, dir),
+                                 vars)
                     info.package = package
             except:
                 warn_tb(INTERNAL, 'In config file %s', filename)
@@ -370,6 +488,10 @@ def load_plugin_configuration(): #path):
         import time
         start = time.clock()
     path = config.plugin_path
+    cache = plugin_cache()
+    if cache is not None and rebuild_plugin_cache:
+        cache.Clear()
+    seen = {}
     for dir in path:
         # XXX unix specific
         if len(dir) >= 2 and dir[-1] == '/':
@@ -379,7 +501,11 @@ def load_plugin_configuration(): #path):
                 recurse = 1
         else:
             recurse = 0
-        _search_dir(dir, recurse)
+        _search_dir(dir, recurse, cache = cache, seen = seen)
+    if cache is not None:
+        # drop the entries of removed plugins and directories
+        cache.Prune(seen)
+        cache.Save()
     if __debug__:
         pdebug('timing', 'time to scan cfg files: %g', time.clock()-start)
     # rearrange import plugins to ensure that native format is first
@@ -24,13 +24,19 @@
 #
 
 
-from types import StringType, TupleType
+import sys, time, tempfile, cPickle
+from cStringIO import StringIO
+from collections import deque
+from types import StringType, UnicodeType, TupleType, ListType, DictType, \
+     IntType, LongType, FloatType, NoneType, InstanceType, MethodType
 from config import preferences
 from sys import maxint
 
 from warn import warn, INTERNAL, warn_tb
 
-from Sketch import _
+from Sketch import _, CreatePath
+
+CurveType = type(CreatePath())
 
 def Undo(info):
     # execute a single undoinfo
@@ -96,6 +102,86 @@ def _NullUndo(*ignore):
     return NullUndo
 NullUndo = (_NullUndo,)
 
+#
+#	Coalescing undo information
+#
+# The undo infos of consecutive edits of the same kind, e.g. moving the
+# same objects several times with the arrow keys, can often be merged
+# into one undo info that restores the state before the first edit.
+# Whether and how two undo infos can be merged is determined by their
+# callable: CoalesceUndo calls the coalescer registered for it with
+# RegisterUndoCoalescer. For methods the coalescer is registered for
+# the function and both undo infos must refer to the same object.
+#
+
+_coalescers = {}
+
+def RegisterUndoCoalescer(function, coalescer):
+    # Register COALESCER for undo infos whose callable is FUNCTION.
+    # COALESCER is called with the older and the newer undo info, which
+    # have the same callable, and has to return an undo info that has
+    # the same effect as undoing the newer and then the older one, or
+    # None if that's not possible.
+    _coalescers[function] = coalescer
+
+def CoalesceUndo(older, newer):
+    # Return an undo info that has the same effect as executing the undo
+    # info NEWER and then OLDER, or None if they can't be merged.
+    if newer is NullUndo:
+        return older
+    if older is NullUndo:
+        return newer
+    func = older[0]
+    other = newer[0]
+    if func is not other:
+        if getattr(func, 'im_self', None) is not getattr(other, 'im_self',
+                                                           None):
+            return None
+        func = getattr(func, 'im_func', None)
+        if func is None or func is not getattr(other, 'im_func', None):
+            return None
+    coalescer = _coalescers.get(getattr(func, 'im_func', func))
+    if coalescer is None:
+        return None
+    return coalescer(older, newer)
+
+def keep_older_undo(older, newer):
+    # Coalescer for undo infos that set some state to the value given by
+    # their last argument, e.g. (obj.SetProperty, name, value). If all
+    # other arguments are equal, the older undo info alone has the same
+    # effect as both. Also suitable for notifications without arguments.
+    if older[1:-1] == newer[1:-1]:
+        return older
+    return None
+
+def add_undo_offsets(older, newer):
+    # Coalescer for undo infos that move something by the offset given
+    # as their only argument, e.g. (obj.Translate, offset)
+    return (older[0], older[1] + newer[1])
+
+def _coalesce_undo_list(older, newer):
+    older = older[1]
+    newer = newer[1]
+    if len(older) != len(newer):
+        return None
+    merged = map(CoalesceUndo, older, newer)
+    if None in merged:
+        return None
+    return (UndoList, merged)
+
+def _coalesce_undo_after(older, newer):
+    undo = CoalesceUndo(older[1], newer[1])
+    if undo is not None:
+        after = CoalesceUndo(older[2], newer[2])
+        if after is not None:
+            return (UndoAfter, undo, after)
+    return None
+
+RegisterUndoCoalescer(UndoList, _coalesce_undo_list)
+RegisterUndoCoalescer(UndoAfter, _coalesce_undo_after)
+RegisterUndoCoalescer(_NullUndo, keep_older_undo)
+
+
 class UndoTypeError(Exception):
     pass
 
@@ -122,6 +208,151 @@ def check_info_silently(info):
     except UndoTypeError:
         return 0
 
+#
+#	Memory usage of undo information
+#
+
+def in_document(obj):
+    # Return true if OBJ is a graphics object in a layer.
+    while obj is not None:
+        if getattr(obj.__class__, 'is_Layer', 0):
+            return 1
+        obj = obj.__dict__.get('parent')
+    return 0
+
+def undo_size(info):
+    # Return an estimate of the number of bytes of memory used by the
+    # undo info INFO.
+    #
+    # Tuples, lists, dictionaries, strings, numbers and curves are
+    # counted completely. Graphics objects that are still part of the
+    # document are not counted at all. Of other instances, e.g. deleted
+    # objects, only the instance itself and the values of its instance
+    # variables that are not instances are counted: references from
+    # one object to another, e.g. to the properties or a font, usually
+    # point to objects that are shared with the document or other
+    # objects, while the lists of children of a deleted group belong to
+    # the undo info. Bound methods are assumed to refer to objects in
+    # the document.
+    size = 0
+    seen = {}
+    todo = [info]
+    getsizeof = sys.getsizeof
+    while todo:
+        obj = todo.pop()
+        if seen.has_key(id(obj)):
+            continue
+        seen[id(obj)] = 1
+        t = type(obj)
+        if t == TupleType or t == ListType:
+            size = size + getsizeof(obj)
+            todo.extend(obj)
+        elif t == DictType:
+            size = size + getsizeof(obj)
+            todo.extend(obj.keys())
+            todo.extend(obj.values())
+        elif t == InstanceType:
+            if in_document(obj):
+                continue
+            size = size + getsizeof(obj) + getsizeof(obj.__dict__)
+            for value in obj.__dict__.values():
+                if type(value) != InstanceType:
+                    todo.append(value)
+        elif t == MethodType:
+            size = size + getsizeof(obj)
+        elif t == CurveType:
+            size = size + obj.memory_size()
+        else:
+            size = size + getsizeof(obj)
+    return size
+
+
+#
+#	Storing undo information in a temporary file
+#
+
+# the types of objects written to the file by value. All other objects
+# are only referenced and remain in memory, which preserves their
+# identity. This is important for objects like the ones in the document
+# or curves which are modified by undo infos.
+_value_types = {}
+for _t in (StringType, UnicodeType, TupleType, ListType, DictType,
+           IntType, LongType, FloatType, NoneType):
+    _value_types[_t] = 1
+del _t
+
+class SpilledUndo:
+
+    # Placeholder for an undo info that was moved to an UndoFile
+
+    def __init__(self, text, position, length, references):
+        self.text = text
+        self.position = position
+        self.length = length
+        self.references = references
+
+
+class UndoFile:
+
+    # A temporary file for undo infos that are not needed soon. The
+    # undo infos are pickled, except for the objects they refer to,
+    # which are kept in the references list of the SpilledUndo.
+
+    def __init__(self):
+        self.file = None
+        self.used = 0		# bytes of the file still in use
+
+    def Store(self, info):
+        # Write the undo info INFO to the file and return a SpilledUndo
+        # instance for it.
+        references = []
+        def persistent_id(obj, references = references):
+            if _value_types.has_key(type(obj)):
+                return None
+            references.append(obj)
+            return len(references) - 1
+        data = StringIO()
+        pickler = cPickle.Pickler(data, 2)
+        pickler.persistent_id = persistent_id
+        pickler.dump(info)
+        data = data.getvalue()
+
+        if self.file is None:
+            self.file = tempfile.TemporaryFile()
+        self.file.seek(0, 2)
+        position = self.file.tell()
+        self.file.write(data)
+        self.used = self.used + len(data)
+        if type(info[0]) == StringType:
+            text = info[0]
+        else:
+            text = None
+        return SpilledUndo(text, position, len(data), references)
+
+    def Load(self, spilled):
+        # Read the undo info for SPILLED, a SpilledUndo instance, and
+        # release its space in the file.
+        self.file.seek(spilled.position)
+        unpickler = cPickle.Unpickler(StringIO(self.file.read(spilled.length)))
+        unpickler.persistent_load = spilled.references.__getitem__
+        info = unpickler.load()
+        self.Discard(spilled)
+        return info
+
+    def Discard(self, spilled):
+        # Release the space occupied by SPILLED. The file is truncated
+        # when no undo info in it is used anymore.
+        self.used = self.used - spilled.length
+        if not self.used:
+            self.file.seek(0)
+            self.file.truncate()
+
+    def Close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
 class UndoRedo:
 
     # A Class that manages lists of of undo and redo information
@@ -132,13 +363,36 @@ class UndoRedo:
     # by Redo, and is decreased by undoing something. The undo count can
     # be used to determine whether the document was changed since the
     # last save or not.
+    #
+    # The undo infos are kept in a deque, the most recent one first,
+    # together with an estimate of their size. The number of undo infos
+    # is limited by preferences.undo_limit and their total size by
+    # preferences.undo_memory_limit. If preferences.undo_spill_to_disk
+    # is true, all but the preferences.undo_hot_records most recent undo
+    # infos are moved into a temporary file and read again when they're
+    # needed.
+    #
+    # An undo info with the same text as the most recent one that is
+    # added less than preferences.undo_coalesce_interval seconds after
+    # it is merged with it if possible (see CoalesceUndo), so that e.g.
+    # moving an object with the arrow keys can be undone in one step.
 
     undo_count = 0
+    undo_file = None
 
     def __init__(self):
-        self.undoinfo = []
+        self.undoinfo = deque()		# (size, info) pairs
         self.redoinfo = []
+        self.undo_memory = 0
+        self.last_undo_time = None
         self.SetUndoLimit(preferences.undo_limit)
+        self.SetMemoryLimit(preferences.undo_memory_limit)
+        if preferences.undo_spill_to_disk:
+            self.hot_records = max(1, preferences.undo_hot_records)
+            if self.undo_file is None:
+                self.undo_file = UndoFile()
+        else:
+            self.hot_records = None
         if not self.undo_count:
             self.undo_count = 0
 
@@ -150,6 +404,50 @@ class UndoRedo:
             self.max_undo = undo_limit
         else:
             self.max_undo = 1
+        self.discard_old_undo()
+
+    def SetMemoryLimit(self, limit):
+        # Limit the estimated memory used by the undo infos to LIMIT
+        # bytes. None means unlimited. The most recent undo info is
+        # always kept.
+        if limit is None:
+            limit = maxint
+        self.max_undo_memory = limit
+        self.discard_old_undo()
+
+    def info_size(self, info):
+        # Return the estimated size of the undo info INFO. The sizes are
+        # only needed for the memory limit and the bookkeeping of the
+        # undo file. Estimating them means walking through all of INFO,
+        # so without either of them every info is counted as 0 bytes.
+        if self.max_undo_memory == maxint and self.hot_records is None:
+            return 0
+        return undo_size(info)
+
+    def discard_old_undo(self):
+        undoinfo = getattr(self, 'undoinfo', None)
+        if not undoinfo:
+            return
+        while len(undoinfo) > self.max_undo \
+              or (self.undo_memory > self.max_undo_memory
+                  and len(undoinfo) > 1):
+            size, info = undoinfo.pop()
+            self.undo_memory = self.undo_memory - size
+            if info.__class__ is SpilledUndo:
+                self.undo_file.Discard(info)
+
+    def spill_undo(self):
+        # Move the undo info that just became older than the hot records
+        # into the undo file.
+        undoinfo = self.undoinfo
+        if len(undoinfo) > self.hot_records:
+            size, info = undoinfo[self.hot_records]
+            if info.__class__ is not SpilledUndo:
+                info = self.undo_file.Store(info)
+                self.undo_memory = self.undo_memory - size
+                size = undo_size(info.references)
+                self.undo_memory = self.undo_memory + size
+                undoinfo[self.hot_records] = (size, info)
 
     def CanUndo(self):
         # Return true, iff an undo operation can be performed.
@@ -163,14 +461,19 @@ class UndoRedo:
         # If undo info is available, perform a single undo and add the
         # redo info to the redo list. Also, decrement the undo count.
         if len(self.undoinfo) > 0:
-            self.add_redo(Undo(self.undoinfo[0]))
-            del self.undoinfo[0]
+            size, info = self.undoinfo.popleft()
+            self.undo_memory = self.undo_memory - size
+            self.last_undo_time = None
+            if info.__class__ is SpilledUndo:
+                info = self.undo_file.Load(info)
+            self.add_redo(Undo(info))
             self.undo_count = self.undo_count - 1
 
     def AddUndo(self, info, clear_redo = 1):
         # Add the undo info INFO to the undo list. If the undo list is
-        # longer than self.max_undo, discard the excessive undo info.
-        # Also increment the undo count and discard all redo info.
+        # longer than self.max_undo or uses more memory than
+        # self.max_undo_memory, discard the oldest undo info. Also
+        # increment the undo count and discard all redo info.
         #
         # The flag CLEAR_REDO is used for internal purposes and inhibits
         # clearing the redo info if it is false. This flag is only used
@@ -178,13 +481,42 @@ class UndoRedo:
         # this parameter.
         check_info(info)
         if info:
-            self.undoinfo.insert(0, info)
+            if clear_redo and self.coalesce_undo(info):
+                self.redoinfo = []
+                return
+            self.last_undo_time = clear_redo and time.time() or None
+            size = self.info_size(info)
+            self.undoinfo.appendleft((size, info))
+            self.undo_memory = self.undo_memory + size
             self.undo_count = self.undo_count + 1
-            if len(self.undoinfo) > self.max_undo:
-                del self.undoinfo[self.max_undo:]
+            if self.hot_records is not None:
+                self.spill_undo()
+            self.discard_old_undo()
             if clear_redo:
                 self.redoinfo = []
 
+    def coalesce_undo(self, info):
+        # Try to merge INFO with the most recent undo info. Return true
+        # if successful.
+        last = self.last_undo_time
+        now = time.time()
+        interval = preferences.undo_coalesce_interval
+        if not interval or last is None or now - last > interval:
+            return 0
+        size, top = self.undoinfo[0]
+        if top.__class__ is SpilledUndo or type(top[0]) != StringType \
+           or top[0] != info[0]:
+            return 0
+        merged = CoalesceUndo(top[1:], info[1:])
+        if merged is None:
+            return 0
+        merged = (top[0],) + merged
+        new_size = self.info_size(merged)
+        self.undoinfo[0] = (new_size, merged)
+        self.undo_memory = self.undo_memory - size + new_size
+        self.last_undo_time = now
+        return 1
+
     def Redo(self):
         # If redo info is available, perform a single redo and add the
         # undo info to the undo list. The undo count is taken care of by
@@ -202,7 +534,11 @@ class UndoRedo:
         # Return a string to describe the operation that would be undone
         # next, in a format suitable for a menu entry.
         if self.undoinfo:
-            undolabel = self.undoinfo[0][0]
+            info = self.undoinfo[0][1]
+            if info.__class__ is SpilledUndo:
+                undolabel = info.text
+            else:
+                undolabel = info[0]
             if type(undolabel) == StringType:
                 return _("Undo %s") % undolabel
         return _("Undo")
@@ -218,10 +554,26 @@ class UndoRedo:
 
     def Reset(self):
         # Forget all undo/redo information
+        if self.undo_file is not None:
+            self.undo_file.Close()
         self.__init__()
 
     def ResetUndoCount(self):
         self.undo_count = 0
+        # the document is saved in the current state, so the next edit
+        # must be undoable separately
+        self.last_undo_time = None
 
     def UndoCount(self):
         return self.undo_count
+
+    def Statistics(self):
+        # Return a dictionary with the number of undo and redo infos,
+        # the estimated memory used by the undo infos and the number of
+        # undo infos in the undo file
+        spilled = 0
+        for size, info in self.undoinfo:
+            if info.__class__ is SpilledUndo:
+                spilled = spilled + 1
+        return {'undo': len(self.undoinfo), 'redo': len(self.redoinfo),
+                'memory': self.undo_memory, 'spilled': spilled}
@@ -25,7 +25,8 @@ from traceback import print_stack
 from Sketch.warn import warn, INTERNAL
 from Sketch.const import CHANGED, SelectSet, Button1Mask, ConstraintMask, \
      SCRIPT_GET, SCRIPT_OBJECT, SCRIPT_UNDO
-from Sketch import NullUndo, CreateMultiUndo, Undo, UndoAfter
+from Sketch import NullUndo, CreateMultiUndo, Undo, UndoAfter, \
+     RegisterUndoCoalescer, keep_older_undo
 
 from Sketch import Point, NullPoint, UnionRects, Identity, Translation, Trafo
 
@@ -279,6 +280,14 @@ class Protocols:
     has_font		= 0	# True, iff object can have a font
     has_properties	= 0
 
+    has_bulk_transform = 0	# true if the selection may transform the
+                                # object with selection.bulk_transform
+                                # instead of calling its Transform method.
+                                # For compound objects this means that
+                                # Transform only transforms the children.
+                                # Derived classes that override
+                                # Transform or Translate must reset it.
+
     is_Bezier		= 0
     is_Rectangle	= 0
     is_Ellipse		= 0
@@ -332,6 +341,47 @@ class Protocols:
 #
 
 
+#
+# Lazy attributes
+#
+# Some attributes of graphics objects, most importantly the bounding
+# rects, are only computed when they are needed. A class lists them in
+# the dictionary _lazy_attrs which maps the name of the attribute to
+# the name of the method that computes it, and the function
+# define_lazy_attrs puts a LazyAttribute into the class for each of
+# them. Classes that add lazy attributes have to call define_lazy_attrs
+# after the class definition.
+#
+# The computed values are stored in the instance dictionary, so that
+# subsequent accesses are plain attribute lookups. del_lazy_attrs
+# removes them from the instance dictionary again, which makes the
+# LazyAttribute visible again.
+#
+
+class LazyAttribute(object):
+
+    def __init__(self, name, method):
+        self.name = name
+        self.method = method
+
+    def __get__(self, object, cls):
+        if object is None:
+            return self
+        getattr(object, self.method)()
+        # now it should work... use object.__dict__ directly to avoid
+        # recursion if the method is buggy
+        try:
+            return object.__dict__[self.name]
+        except KeyError:
+            warn(INTERNAL, '%s did not compute %s for %s.',
+                 self.method, self.name, object)
+            raise AttributeError, self.name
+
+def define_lazy_attrs(cls):
+    for attr, method in cls._lazy_attrs.items():
+        setattr(cls, attr, LazyAttribute(attr, method))
+
+
 class Bounded:
 
     _lazy_attrs = {'coord_rect' : 'update_rects',
@@ -341,11 +391,10 @@ class Bounded:
         pass
 
     def del_lazy_attrs(self):
+        dict = self.__dict__
         for key in self._lazy_attrs.keys():
-            try:
-                delattr(self, key)
-            except:
-                pass
+            if dict.has_key(key):
+                del dict[key]
 
     def update_rects(self):
         # compute the various bounding rects and other attributes that
@@ -354,33 +403,14 @@ class Bounded:
         # self.coord_rect and other attributes where appropriate.
         pass
 
-    def __getattr__(self, attr):
-        # if a lazy attribute is accessed, compute it.
-        method = self._lazy_attrs.get(attr)
-        if method:
-            getattr(self, method)()
-            # now it should work... use self.__dict__ directly to avoid
-            # recursion if the method is buggy
-            try:
-                return self.__dict__[attr]
-            except KeyError, msg:
-                warn(INTERNAL, '%s did not compute %s for %s.',
-                     method, attr, self)
-        if attr[:2] == attr[-2:] == '__':
-            #if attr in ('__nonzero__', '__len__'):
-            #	 print_stack()
-            pass
-        else:
-            warn(INTERNAL, "%s instance doesn't have an attribute %s",
-                 self.__class__, attr)
-        raise AttributeError, attr
-
     def LayoutPoint(self):
         return Point(self.coord_rect.left, self.coord_rect.bottom)
 
     def GetSnapPoints(self):
         return []
 
+define_lazy_attrs(Bounded)
+
 #
 # Class HierarchyNode
 #
@@ -503,6 +533,13 @@ class GraphicsObject(Bounded, HierarchyNode, Selectable, Protocols):
         # whenever it changes (normally via the issue_changed method)
         pass
 
+    def ChildrenChanged(self, children):
+        # Called instead of ChildChanged when several children have
+        # changed at once. Compound objects can bring themselves up to
+        # date once for all of them.
+        for child in children:
+            self.ChildChanged(child)
+
     def __cmp__(self, other):
         return cmp(id(self), id(other))
 
@@ -510,6 +547,7 @@ class GraphicsObject(Bounded, HierarchyNode, Selectable, Protocols):
         self.del_lazy_attrs()
         self.issue_changed()
         return (self._changed,)
+    RegisterUndoCoalescer(_changed, keep_older_undo)
 
     def SetLowerLeftCorner(self, corner):
         # move self so that self's lower left corner is at CORNER. This
@@ -808,6 +846,7 @@ class RectangularObject:
         self.trafo = trafo
         self._changed()
         return undo
+    RegisterUndoCoalescer(set_transformation, keep_older_undo)
 
     def Transform(self, trafo):
         trafo = trafo(self.trafo)
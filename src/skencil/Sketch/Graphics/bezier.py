@@ -25,11 +25,9 @@ from Sketch.const import SelectSet, SelectAdd, SelectSubtract, SelectDrag, \
 from Sketch.warn import pdebug, warn, INTERNAL
 from Sketch import Point, Polar, Rect, EmptyRect, UnionRects, PointsToRect
 from Sketch import _, _sketch, CreatePath, config, RegisterCommands, \
-     CreateMultiUndo, NullUndo, Undo
+     CreateMultiUndo, NullUndo, Undo, RegisterUndoCoalescer, add_undo_offsets
 
-from Sketch.UI.command import AddCmd
-import Sketch.UI.skpixmaps
-pixmaps = Sketch.UI.skpixmaps.PixmapTk
+from Sketch.command import AddCmd
 
 from Sketch._sketch import ContAngle, ContSmooth, ContSymmetrical, \
      SelNone, SelNodes, SelSegmentFirst, SelSegmentLast, Bezier, Line
@@ -59,6 +57,7 @@ class PolyBezier(Primitive):
     has_edit_mode = 1
     is_curve	  = 1
     is_clip	  = 1
+    has_bulk_transform = 1
 
     script_access = Primitive.script_access.copy()
 
@@ -124,6 +123,7 @@ class PolyBezier(Primitive):
             path.Translate(offset)
         self._changed()
         return self.Translate, -offset
+    RegisterUndoCoalescer(Translate, add_undo_offsets)
 
     def DrawShape(self, device, rect = None, clip = 0):
         Primitive.DrawShape(self, device)
@@ -870,7 +870,7 @@ class PolyBezierEditor(Editor):
                     paths.append(path)
         return self.set_paths(paths)
     AddCmd(commands, OpenNodes, _("Cut Curve"), key_stroke = 'c',
-           bitmap = pixmaps.BezierOpenNodes)
+           bitmap = 'BezierOpenNodes')
 
     def CloseNodes(self):
         # find out if close is possible
@@ -956,7 +956,7 @@ class PolyBezierEditor(Editor):
             return
         return undo
     AddCmd(commands, CloseNodes, _("Close Nodes"),
-           bitmap = pixmaps.BezierCloseNodes)
+           bitmap = 'BezierCloseNodes')
 
     def SetContinuity(self, cont):
         new_paths = []
@@ -967,11 +967,11 @@ class PolyBezierEditor(Editor):
                 new_paths.append(path)
         return self.set_paths(new_paths)
     AddCmd(commands, 'ContAngle', _("Angle"), SetContinuity,
-           args = ContAngle, bitmap = pixmaps.BezierAngle, key_stroke = 'a')
+           args = ContAngle, bitmap = 'BezierAngle', key_stroke = 'a')
     AddCmd(commands, 'ContSmooth', _("Smooth"), SetContinuity,
-           args = ContSmooth, bitmap = pixmaps.BezierSmooth, key_stroke = 's')
+           args = ContSmooth, bitmap = 'BezierSmooth', key_stroke = 's')
     AddCmd(commands, 'ContSymmetrical', _("Symmetrical"), SetContinuity,
-           args = ContSymmetrical, bitmap = pixmaps.BezierSymm, key_stroke='y')
+           args = ContSymmetrical, bitmap = 'BezierSymm', key_stroke='y')
 
     def SegmentsToLines(self):
         if self.selection_type == SelCurvePoint:
@@ -988,7 +988,7 @@ class PolyBezierEditor(Editor):
                     new_paths.append(path)
         return self.set_paths(new_paths)
     AddCmd(commands, SegmentsToLines, _("Curve->Line"), key_stroke = 'l',
-           bitmap = pixmaps.BezierCurveLine)
+           bitmap = 'BezierCurveLine')
 
     def SegmentsToCurve(self):
         if self.selection_type == SelCurvePoint:
@@ -1005,7 +1005,7 @@ class PolyBezierEditor(Editor):
                     new_paths.append(path)
         return self.set_paths(new_paths)
     AddCmd(commands, SegmentsToCurve, _("Line->Curve"), key_stroke = 'b',
-           bitmap = pixmaps.BezierLineCurve)
+           bitmap = 'BezierLineCurve')
 
     def DeleteNodes(self):
         new_paths = []
@@ -1028,7 +1028,7 @@ class PolyBezierEditor(Editor):
             self.document.DeselectObject(self.object)
             return self.parent.Remove(self.object)
     AddCmd(commands, DeleteNodes, _("Delete Nodes"),
-           bitmap = pixmaps.BezierDeleteNode, key_stroke = ('-', 'Delete'))
+           bitmap = 'BezierDeleteNode', key_stroke = ('-', 'Delete'))
 
     def InsertNodes(self):
         if self.selection_type == SelCurvePoint:
@@ -1047,7 +1047,7 @@ class PolyBezierEditor(Editor):
                     new_paths.append(path)
         return self.set_paths(new_paths)
     AddCmd(commands, InsertNodes, _("Insert Nodes"), key_stroke = '+',
-           bitmap = pixmaps.BezierInsertNode)
+           bitmap = 'BezierInsertNode')
 
     def ChangeRect(self):
         prop = self.properties
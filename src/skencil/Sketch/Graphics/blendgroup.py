@@ -24,7 +24,7 @@
 from types import IntType, ListType
 import operator
 
-from Sketch.UI import command
+from Sketch import command
 
 from Sketch.const import SelectAdd
 from Sketch import SketchInternalError, _
@@ -328,6 +328,11 @@ class BlendGroup(Compound):
                     self.document.AddAfterHandler(recompute, (idx + 1,), depth)
         else:
             Compound.ChildChanged(self, child)
+
+    def ChildrenChanged(self, children):
+        # the interpolations have to be recomputed child by child
+        for child in children:
+            self.ChildChanged(child)
         self.del_lazy_attrs()
 
     def recompute(self, idx):
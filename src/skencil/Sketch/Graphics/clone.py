@@ -68,8 +68,8 @@ class Clone(Bounded, HierarchyNode):
         _unregister_clone(self._original)
 
     def __getattr__(self, attr):
-        if self._lazy_attrs.has_key(attr):
-            return Bounded.__getattr__(self, attr)
+        # the lazy attributes are found in the class, so this is only
+        # called for attributes of the original
         #print 'Clone.__getattr__: from original:', attr
         #if attr in ('__nonzero__', 'document'):
         #    print_stack()
@@ -118,7 +118,7 @@ class Clone(Bounded, HierarchyNode):
         device.PushTrafo()
         try:
             device.Translate(self._offset)
-            self._original.DrawShape(device, rect)
+            device.DrawShared(self._original, rect)
         finally:
             device.PopTrafo()
 
@@ -25,8 +25,9 @@
 from types import ListType, TupleType, IntType, InstanceType
 import operator
 
-from Sketch import _, SketchError, UnionRects, EmptyRect, _sketch
-from Sketch import NullUndo, CreateListUndo, Undo
+from Sketch import _, SketchError, UnionRects, EmptyRect, _sketch, config
+from Sketch import NullUndo, CreateListUndo, Undo, RegisterUndoCoalescer, \
+     keep_older_undo
 
 from base import GraphicsObject, Bounded, CHANGED
 from blend import Blend, MismatchError
@@ -34,8 +35,34 @@ from properties import EmptyProperties
 
 from selinfo import prepend_idx, select_range, build_info, list_to_tree2, \
      list_to_tree_sliced
+from spatialindex import CreateRectIndex
 
 
+# Counters for the bounding rect computations of compound objects.
+#
+#	full		number of calls to update_rects, each of which
+#			unions the rects of all children
+#	incremental	number of child changes and insertions handled by
+#			growing the rects in place
+#
+# See also EditDocument.rect_statistics which holds the counts for the
+# last transaction.
+rect_statistics = {'full' : 0, 'incremental' : 0}
+
+def RectStatistics():
+    return rect_statistics.copy()
+
+def may_grow(rect, old, new):
+    # Return true if the union of some rects that includes OLD is RECT
+    # and replacing OLD by NEW can only enlarge RECT, that is, if OLD
+    # does not touch the boundary of RECT or if NEW contains OLD.
+    if old is EmptyRect:
+        return 1
+    if old.left > rect.left and old.bottom > rect.bottom \
+       and old.right < rect.right and old.top < rect.top:
+        return 1
+    return new is not EmptyRect and new.contains_rect(old)
+
 
 class Compound(GraphicsObject):
 
@@ -46,6 +73,21 @@ class Compound(GraphicsObject):
 
     allow_traversal = 0
 
+    # If true, changes of the children update self's rects
+    # incrementally. Must be false in derived classes whose rects are
+    # not the union of the rects of all children.
+    incremental_rects = 1
+
+    # While self's rects are valid, child_rects maps the ids of the
+    # children to tuples (COORD_RECT, BOUNDING_RECT) with the rects the
+    # children had when they were last taken into account.
+    child_rects = None
+
+    # If true, DrawShapeSteps descends into self instead of drawing self
+    # with DrawShape in one step. Must be false in derived classes that
+    # override DrawShape.
+    draw_steps = 1
+
     def __init__(self, objects = None, duplicate = None):
         GraphicsObject.__init__(self, duplicate = duplicate)
         if duplicate is not None:
@@ -95,11 +137,51 @@ class Compound(GraphicsObject):
         return info
 
     def ChildChanged(self, child):
-        self.del_lazy_attrs()
+        if not self.update_child_rects((child,)):
+            self.del_lazy_attrs()
         if self.changing_children:
             return
         self.issue_changed()
 
+    def ChildrenChanged(self, children):
+        if not self.update_child_rects(children):
+            self.del_lazy_attrs()
+        if self.changing_children:
+            return
+        self.issue_changed()
+
+    def update_child_rects(self, children, added = 0):
+        # Try to bring self's rects up to date after CHILDREN have
+        # changed or, if ADDED is true, were added without looking at
+        # the other children. This is possible as long as the rects only
+        # grow. Return true if successful. If false is returned, the
+        # caller has to call del_lazy_attrs.
+        child_rects = self.child_rects
+        if child_rects is None or not self.incremental_rects:
+            return 0
+        coord_rect = self.coord_rect
+        bounding_rect = self.bounding_rect
+        new_rects = []
+        for child in children:
+            coord = child.coord_rect
+            bound = child.bounding_rect
+            old = child_rects.get(id(child))
+            if old is None:
+                if not added:
+                    return 0
+            elif not may_grow(coord_rect, old[0], coord) \
+                 or not may_grow(bounding_rect, old[1], bound):
+                return 0
+            new_rects.append((id(child), (coord, bound)))
+        for key, (coord, bound) in new_rects:
+            child_rects[key] = (coord, bound)
+            coord_rect = UnionRects(coord_rect, coord)
+            bounding_rect = UnionRects(bounding_rect, bound)
+        self.coord_rect = coord_rect
+        self.bounding_rect = bounding_rect
+        rect_statistics['incremental'] = rect_statistics['incremental'] + 1
+        return 1
+
     def SetDocument(self, doc):
         for obj in self.objects:
             obj.SetDocument(doc)
@@ -167,13 +249,15 @@ class Compound(GraphicsObject):
 
     def del_lazy_attrs(self):
         Bounded.del_lazy_attrs(self)
+        self.child_rects = None
         return (self.del_lazy_attrs,)
 
     def update_rects(self):
         # XXX: should we raise an exception here if self.objects is empty?
-        boxes = map(lambda o: o.coord_rect, self.objects)
-        if boxes:
-            self.coord_rect = reduce(UnionRects, boxes, boxes[0])
+        rect_statistics['full'] = rect_statistics['full'] + 1
+        coord_boxes = map(lambda o: o.coord_rect, self.objects)
+        if coord_boxes:
+            self.coord_rect = reduce(UnionRects, coord_boxes, coord_boxes[0])
         else:
             self.coord_rect = EmptyRect
 
@@ -183,6 +267,10 @@ class Compound(GraphicsObject):
         else:
             self.bounding_rect = EmptyRect
 
+        if self.incremental_rects:
+            self.child_rects = dict(map(None, map(id, self.objects),
+                                        map(None, coord_boxes, boxes)))
+
     def SelectSubobject(self, p, rect, device, path = None, *rest):
         return self
 
@@ -233,6 +321,11 @@ class Compound(GraphicsObject):
             self._changed()
         return (self.begin_change_children,)
 
+    # undo infos for changes of children are enclosed in these two, so
+    # when two such undo infos are merged, one pair suffices.
+    RegisterUndoCoalescer(begin_change_children, keep_older_undo)
+    RegisterUndoCoalescer(end_change_children, keep_older_undo)
+
     def ForAllUndo(self, func):
         if self.objects:
             undo = [self.begin_change_children()]
@@ -264,10 +357,24 @@ class Compound(GraphicsObject):
         undo = self.ForAllUndo(func)
         return undo
 
+    def overlapping_indices(self, rect):
+        # Return the indices of the children whose bounding rects may
+        # overlap RECT in stacking order (bottom to top). The caller
+        # still has to test the bounding rects. Compound objects that
+        # maintain a spatial index override this method.
+        return range(len(self.objects))
+
+    def overlapping_objects(self, rect):
+        # Like overlapping_indices but return the children themselves.
+        # The list returned may be self.objects, so don't modify it.
+        return self.objects
+
     def Hit(self, p, rect, device):
         test = rect.overlaps
         objects = self.objects
-        for obj_idx in range(len(objects) - 1, -1, -1):
+        indices = self.overlapping_indices(rect)
+        for i in range(len(indices) - 1, -1, -1):
+            obj_idx = indices[i]
             obj = objects[obj_idx]
             if test(obj.bounding_rect):
                 if obj.Hit(p, rect, device):
@@ -286,15 +393,38 @@ class Compound(GraphicsObject):
     def DrawShape(self, device, rect = None):
         if rect:
             test = rect.overlaps
-            for o in self.objects:
+            for o in self.overlapping_objects(rect):
                 if test(o.bounding_rect):
                     o.DrawShape(device, rect)
         else:
             for obj in self.objects:
                 obj.DrawShape(device)
 
+    def DrawShapeSteps(self, device, rect = None):
+        # Generator version of DrawShape used for progressive rendering
+        # (see SketchView). It yields after each child drawn, so the
+        # caller may interrupt the drawing between children.
+        if rect:
+            test = rect.overlaps
+            objects = self.overlapping_objects(rect)
+        else:
+            test = None
+            objects = self.objects
+        for o in objects:
+            if test is not None and not test(o.bounding_rect):
+                continue
+            if o.is_Compound and o.draw_steps:
+                for step in o.DrawShapeSteps(device, rect):
+                    yield step
+            else:
+                if rect:
+                    o.DrawShape(device, rect)
+                else:
+                    o.DrawShape(device)
+                yield None
+
     def PickObject(self, point, rect, device):
-        objects = self.objects[:]
+        objects = self.overlapping_objects(rect)[:]
         objects.reverse()
         test = rect.overlaps
         for obj in objects:
@@ -347,6 +477,90 @@ class EditableCompound(Compound):
 
     allow_traversal = 1
 
+    # The spatial index of the children (a spatialindex.RectIndex) and
+    # a tuple (OBJECTS, ORDER) where ORDER maps the ids of the objects
+    # in the list OBJECTS to their indices. Both are created lazily when
+    # the number of children reaches preferences.spatial_index_threshold
+    # and are kept up to date by the methods that modify self.objects
+    # and by ChildChanged.
+    spatial_index = None
+    object_order = None
+
+    def get_spatial_index(self):
+        threshold = config.preferences.spatial_index_threshold
+        if threshold is None or len(self.objects) < threshold:
+            self.spatial_index = self.object_order = None
+            return None
+        if self.spatial_index is None:
+            self.spatial_index = CreateRectIndex(self.objects)
+        return self.spatial_index
+
+    def reset_spatial_index(self):
+        self.spatial_index = self.object_order = None
+
+    def index_objects(self, objects):
+        # Called whenever OBJECTS were added to self.objects
+        self.object_order = None
+        if self.spatial_index is not None:
+            for obj in objects:
+                self.spatial_index.Insert(obj)
+
+    def unindex_objects(self, objects):
+        # Called whenever OBJECTS were removed from self.objects
+        self.object_order = None
+        if self.spatial_index is not None:
+            for obj in objects:
+                self.spatial_index.Remove(obj)
+
+    def overlapping_indices(self, rect):
+        index = self.get_spatial_index()
+        if index is not None:
+            found = index.Query(rect)
+            if found is not None:
+                order = self.object_order
+                if order is None or order[0] is not self.objects:
+                    objects = self.objects
+                    order = (objects,
+                             dict(zip(map(id, objects), range(len(objects)))))
+                    self.object_order = order
+                order = order[1]
+                indices = []
+                for key in found.keys():
+                    idx = order.get(key)
+                    if idx is not None:
+                        indices.append(idx)
+                indices.sort()
+                return indices
+        return range(len(self.objects))
+
+    def overlapping_objects(self, rect):
+        if self.get_spatial_index() is None:
+            return self.objects
+        return map(self.objects.__getitem__, self.overlapping_indices(rect))
+
+    def ChildChanged(self, child):
+        if self.spatial_index is not None:
+            self.spatial_index.Update(child)
+        Compound.ChildChanged(self, child)
+
+    def ChildrenChanged(self, children):
+        if self.spatial_index is not None:
+            for child in children:
+                self.spatial_index.Update(child)
+        Compound.ChildrenChanged(self, children)
+
+    def set_objects(self, new_objs):
+        Compound.set_objects(self, new_objs)
+        self.reset_spatial_index()
+
+    def load_AppendObject(self, object):
+        Compound.load_AppendObject(self, object)
+        self.reset_spatial_index()
+
+    def destroy_objects(self):
+        Compound.destroy_objects(self)
+        self.reset_spatial_index()
+
     def SelectSubobject(self, p, rect, device, path = None, *rest):
         test = rect.overlaps
         if path is None:
@@ -358,7 +572,9 @@ class EditableCompound(Compound):
             path_idx = -1
             path = None
         objects = self.objects
-        for obj_idx in range(len(objects) - 1, -1, -1):
+        indices = self.overlapping_indices(rect)
+        for i in range(len(indices) - 1, -1, -1):
+            obj_idx = indices[i]
             obj = objects[obj_idx]
             if test(obj.bounding_rect) and obj.Hit(p, rect, device):
                 if obj_idx == path_idx:
@@ -413,6 +629,7 @@ class EditableCompound(Compound):
                 obj.SetDocument(self.document)
                 obj.SetParent(self)
                 obj.Connect()
+                inserted = (obj,)
                 sel_info = build_info(at, obj)
                 undo_info = (self.Remove, obj, at)
             else:
@@ -422,9 +639,14 @@ class EditableCompound(Compound):
                     o.SetDocument(self.document)
                     o.SetParent(self)
                     o.Connect()
+                inserted = obj
                 sel_info = select_range(at, obj)
                 undo_info = (self.RemoveSlice, at, at + len(obj))
-            self._changed()
+            self.index_objects(inserted)
+            # new children can only enlarge self's rects
+            if not self.update_child_rects(inserted, added = 1):
+                self.del_lazy_attrs()
+            self.issue_changed()
             return (sel_info, undo_info)
         except:
             if undo_info is not None:
@@ -438,6 +660,7 @@ class EditableCompound(Compound):
     def do_remove_child(self, idx):
         obj = self.objects[idx]
         del self.objects[idx]
+        self.unindex_objects((obj,))
         obj.Disconnect()
         obj.SetParent(None)
         self._changed()
@@ -458,6 +681,7 @@ class EditableCompound(Compound):
     def RemoveSlice(self, min, max):
         objs = self.objects[min:max]
         self.objects[min:max] = []
+        self.unindex_objects(objs)
         for obj in objs:
             obj.Disconnect()
             obj.SetParent(None)
@@ -491,6 +715,8 @@ class EditableCompound(Compound):
         object.SetParent(self)
         object.SetDocument(self.document)
         child.SetParent(None)
+        self.unindex_objects((child,))
+        self.index_objects((object,))
         self._changed()
         return (self.ReplaceChild, object, child)
 
@@ -510,6 +736,7 @@ class EditableCompound(Compound):
         inverse = [0] * length
         map(operator.setitem, [inverse] * length, permutation, identity)
         self.objects = result
+        self.object_order = None
         self._changed()
         return (self.permute_objects, inverse)
 
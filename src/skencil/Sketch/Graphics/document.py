@@ -43,12 +43,14 @@ from Sketch.connector import Issue, RemovePublisher, Connect, Disconnect, \
      QueueingPublisher, Connector
 from Sketch.undodict import UndoDict
 
-from Sketch import Rect, Point, UnionRects, InfinityRect, Trafo
-from Sketch import UndoRedo, Undo, CreateListUndo, NullUndo, UndoAfter
+from Sketch import Rect, Point, UnionRects, InfinityRect, Trafo, RectType
+from Sketch import UndoRedo, Undo, CreateListUndo, NullUndo, UndoAfter, \
+     CoalesceUndo, RegisterUndoCoalescer, keep_older_undo
 
 import color, selinfo, pagelayout
 
 from base import Protocols
+from compound import RectStatistics
 from layer import Layer, GuideLayer, GridLayer
 from group import Group
 from bezier import CombineBeziers
@@ -192,6 +194,13 @@ class SketchDocument(Protocols):
         for layer in self.layers:
             layer.Draw(device, rect)
 
+    def DrawSteps(self, device, rect = None):
+        # Generator version of Draw for progressive rendering. It
+        # yields between the objects drawn.
+        for layer in self.layers:
+            for step in layer.DrawSteps(device, rect):
+                yield step
+
     def Grid(self):
         return self.snap_grid
 
@@ -320,6 +329,7 @@ class EditDocument(SketchDocument, QueueingPublisher):
         # hold this information in the future
         self.queue_message(EDITED, '')
         return (self.queue_edited,)
+    RegisterUndoCoalescer(queue_edited, keep_older_undo)
 
     def Subscribe(self, channel, func, *args):
         Connect(self, channel, func, args)
@@ -376,9 +386,19 @@ class EditDocument(SketchDocument, QueueingPublisher):
         self.clear_rects.append(rect)
         return (self.AddClearRect, rect)
 
+    def _coalesce_clear_rect(older, newer):
+        rect1 = older[1]
+        rect2 = newer[1]
+        if type(rect1) == RectType and type(rect2) == RectType:
+            return (older[0], UnionRects(rect1, rect2))
+        return None
+    RegisterUndoCoalescer(AddClearRect, _coalesce_clear_rect)
+    del _coalesce_clear_rect
+
     def view_redraw_all(self):
         self.clear_all = 1
         return (self.view_redraw_all,)
+    RegisterUndoCoalescer(view_redraw_all, keep_older_undo)
 
     def issue_redraw(self):
         try:
@@ -402,6 +422,8 @@ class EditDocument(SketchDocument, QueueingPublisher):
         self.transaction_clear = None
         self.transaction_aborted = 0
         self.transaction_cleanup = []
+        self.transaction_rect_statistics = None
+        self.transaction_coalesce = 0
 
     def cleanup_transaction(self):
         for handler, args in self.transaction_cleanup:
@@ -432,6 +454,7 @@ class EditDocument(SketchDocument, QueueingPublisher):
             self.transaction_sel_ignore = no_selection
             self.transaction_name = name
             self.transaction_undo = []
+            self.transaction_rect_statistics = RectStatistics()
             if clear_selection_rect:
                 if self.selection:
                     self.transaction_clear = self.selection.bounding_rect
@@ -490,11 +513,26 @@ class EditDocument(SketchDocument, QueueingPublisher):
                 self.flush_message_queue()
                 self.issue_redraw()
                 self.cleanup_transaction()
+                self.update_rect_statistics()
                 self.reset_transaction()
                 self.reset_clear()
             elif self.transaction < 0:
                 raise SketchInternalError('transaction < 0')
 
+    # The number of bounding rect computations of compound objects in
+    # the last transaction. See compound.rect_statistics.
+    rect_statistics = None
+
+    def update_rect_statistics(self):
+        start = self.transaction_rect_statistics
+        if start is not None:
+            stats = RectStatistics()
+            for key in stats.keys():
+                stats[key] = stats[key] - start.get(key, 0)
+            self.rect_statistics = stats
+            pdebug('timing', 'rect updates in %s: %s',
+                   self.transaction_name, stats)
+
     def abort_transaction(self):
         self.transaction_aborted = 1
         warn_tb(INTERNAL, "in transaction `%s'" % self.transaction_name)
@@ -507,6 +545,19 @@ class EditDocument(SketchDocument, QueueingPublisher):
     def EndTransaction(self):
         self.end_transaction(queue_edited = 1)
 
+    # A batch is a transaction in which consecutive undo infos are merged
+    # where possible (see CoalesceUndo), e.g. when a script moves the
+    # same object many times. Takes the same arguments as
+    # BeginTransaction.
+    def BeginUndoBatch(self, *args, **kw):
+        apply(self.begin_transaction, args, kw)
+        self.transaction_coalesce = self.transaction_coalesce + 1
+
+    def EndUndoBatch(self):
+        if self.transaction_coalesce:
+            self.transaction_coalesce = self.transaction_coalesce - 1
+        self.end_transaction(queue_edited = 1)
+
     def Insert(self, object, undo_text = _("Create Object")):
         if isinstance(object, guide.GuideLine):
             self.add_guide_line(object)
@@ -1165,6 +1216,11 @@ class EditDocument(SketchDocument, QueueingPublisher):
                         if __debug__:
                             pdebug(None, 'add_undo: info contains text')
                         info = info[1:]
+                if self.transaction_coalesce and self.transaction_undo:
+                    merged = CoalesceUndo(self.transaction_undo[-1], info)
+                    if merged is not None:
+                        self.transaction_undo[-1] = merged
+                        continue
                 self.transaction_undo.append(info)
 
     # public version of add_undo. to be called between calls to
@@ -1183,6 +1239,13 @@ class EditDocument(SketchDocument, QueueingPublisher):
         self.queue_selection()
         return (self.__undo_set_sel, redo_class, redo_info, selclass, selinfo)
 
+    def _coalesce_set_sel(older, newer):
+        # restore the selection from before the older edit, redo the
+        # one after the newer edit
+        return older[:3] + newer[3:]
+    RegisterUndoCoalescer(__undo_set_sel, _coalesce_set_sel)
+    del _coalesce_set_sel
+
     def __real_add_undo(self, text, undo, selinfo = None, selclass = None):
         if undo is not NullUndo:
             if selinfo is not None:
@@ -1266,6 +1329,21 @@ class EditDocument(SketchDocument, QueueingPublisher):
             finally:
                 self.end_transaction()
 
+    def call_selection_method(self, undo_text, method, *args):
+        # Like apply_to_selected, but call the selection's method METHOD
+        # with ARGS which returns the undo info.
+        if self.selection:
+            self.begin_transaction(undo_text)
+            try:
+                try:
+                    self.add_undo(apply(getattr(self.selection, method),
+                                        args))
+                    self.queue_selection()
+                except:
+                    self.abort_transaction()
+            finally:
+                self.end_transaction()
+
     def AddStyle(self, style):
         if type(style) == StringType:
             style = self.GetDynamicStyle(style)
@@ -1530,10 +1608,10 @@ class EditDocument(SketchDocument, QueueingPublisher):
     #
 
     def TransformSelected(self, trafo, undo_text = _("Transform")):
-        self.apply_to_selected(undo_text, lambda o, t = trafo: o.Transform(t))
+        self.call_selection_method(undo_text, 'TransformObjects', trafo)
 
     def TranslateSelected(self, offset, undo_text = _("Translate")):
-        self.apply_to_selected(undo_text, lambda o, v = offset: o.Translate(v))
+        self.call_selection_method(undo_text, 'TranslateObjects', offset)
 
     def RemoveTransformation(self):
         self.apply_to_selected(_("Remove Transformation"),
@@ -25,9 +25,7 @@ from Sketch import _, Point, Polar, Trafo, SingularMatrix, Rect, UnionRects, \
 
 import graphics
 
-from Sketch.UI.command import AddCmd
-import Sketch.UI.skpixmaps
-pixmaps = Sketch.UI.skpixmaps.PixmapTk
+from Sketch.command import AddCmd
 
 import handle
 from base import Primitive, RectangularPrimitive, RectangularCreator, Creator,\
@@ -66,18 +64,26 @@ class Ellipse(RectangularPrimitive):
     is_curve = 1
     is_clip = 1
     has_edit_mode = 1
+    has_bulk_transform = 1
 
     commands = RectangularPrimitive.commands[:]
 
+    # The angles and the arc type are only stored in the instance if
+    # they differ from these defaults (a complete ellipse) to keep the
+    # instance dictionary small.
+    start_angle = end_angle = 0.0
+    arc_type = ArcPieSlice
+
     def __init__(self, trafo = None, start_angle = 0.0, end_angle = 0.0,
                  arc_type = ArcPieSlice, properties = None, duplicate = None):
         if duplicate is not None:
-            self.start_angle = duplicate.start_angle
-            self.end_angle = duplicate.end_angle
-            self.arc_type = duplicate.arc_type
-        else:
+            start_angle = duplicate.start_angle
+            end_angle = duplicate.end_angle
+            arc_type = duplicate.arc_type
+        if start_angle or end_angle:
             self.start_angle = start_angle
             self.end_angle = end_angle
+        if arc_type != ArcPieSlice:
             self.arc_type = arc_type
         RectangularPrimitive.__init__(self, trafo, properties = properties,
                                       duplicate = duplicate)
@@ -116,6 +122,8 @@ class Ellipse(RectangularPrimitive):
            args = ArcPieSlice)
 
     def normalize(self):
+        if not (self.start_angle or self.end_angle):
+            return
         pi2 = 2 * pi
         self.start_angle = fmod(self.start_angle, pi2)
         if self.start_angle < 0:
@@ -19,13 +19,14 @@
 #	A GraphicsObject for Encapsulated Postscript Pictures
 #
 
-import os, math
-
-import PIL.Image
+import os, math, tempfile
 
 from Sketch.Lib import dscparser, util
 IsEpsFileStart = dscparser.IsEpsFileStart
 from Sketch import _, Point, config
+from Sketch.const import CHANGED
+from Sketch.warn import pdebug, warn, USER
+from Sketch import connector
 
 from base import GraphicsObject
 from external import ExternalData, get_cached, ExternalGraphics
@@ -37,23 +38,24 @@ gs_command = ('gs -sDEVICE=ppmraw -r%(resolution)d -dNOPAUSE -dSAFER -q'
               ' /oldshowpage /showpage load def /showpage \'{}\' def '
               ' -f %(filename)s -c oldshowpage quit')
 
-def render_preview(filename, startx, starty, width, height, resolution = None):
-    import tempfile
-    temp = tempfile.mktemp()
-
+def preview_command(filename, startx, starty, width, height, resolution,
+                    temp):
+    # Return the shell command that renders the preview of FILENAME to
+    # the file TEMP
+    # quote the filename so that it can have spaces and to avoid a
+    # security hole
+    filename = util.sh_quote(filename)
+    factor = resolution / 72.0
+    width = int(math.ceil(width * factor))
+    height = int(math.ceil(height * factor))
+    offx = -startx
+    offy = -starty
+    return gs_command % locals()
+
+def load_preview(temp):
+    # Load the preview rendered to TEMP and remove the file
+    import PIL.Image
     try:
-        # quote the filename so that it can have spaces and to avoid a
-        # security hole
-        filename = util.sh_quote(filename)
-        if resolution is None:
-            resolution = config.preferences.eps_preview_resolution
-        factor = resolution / 72.0
-        width = int(math.ceil(width * factor))
-        height = int(math.ceil(height * factor))
-        offx = -startx
-        offy = -starty
-        os.system(gs_command % locals())
-
         image = PIL.Image.open(temp)
         image.load()
         return image
@@ -63,10 +65,189 @@ def render_preview(filename, startx, starty, width, height, resolution = None):
         except:
             pass
 
+def render_preview(filename, startx, starty, width, height, resolution = None):
+    if resolution is None:
+        resolution = config.preferences.eps_preview_resolution
+    temp = tempfile.mktemp()
+    os.system(preview_command(filename, startx, starty, width, height,
+                              resolution, temp))
+    return load_preview(temp)
+
+
+#
+#	The preview cache
+#
+# Rendered previews are stored as PPM files in a directory in the
+# user's config directory. The name of a file is derived from the
+# contents of the EPS file, its bounding box and the resolution, so
+# that a preview is found again even if the EPS file was moved or
+# touched, and a modified file gets a new preview. The least recently
+# used previews are removed when there are more than
+# preferences.eps_preview_cache_size of them.
+#
+
+def preview_cache_dir():
+    # Return the directory of the cache or None if it's disabled
+    if config.preferences.eps_preview_cache_size <= 0:
+        return None
+    return os.path.join(config.user_config_dir, config.eps_preview_cache_dir)
+
+def preview_cache_key(filename, bbox, resolution):
+    import hashlib
+    hash = hashlib.sha1()
+    hash.update('%r %r\n' % (tuple(bbox), resolution))
+    file = open(filename, 'rb')
+    try:
+        while 1:
+            data = file.read(65536)
+            if not data:
+                break
+            hash.update(data)
+    finally:
+        file.close()
+    return hash.hexdigest()
+
+def cached_preview(key):
+    # Return the cached preview for KEY or None
+    import PIL.Image
+    dir = preview_cache_dir()
+    if dir is None or key is None:
+        return None
+    filename = os.path.join(dir, key + '.ppm')
+    try:
+        image = PIL.Image.open(filename)
+        image.load()
+        # mark it as recently used
+        os.utime(filename, None)
+    except (IOError, os.error):
+        return None
+    return image
+
+def store_preview(key, image):
+    dir = preview_cache_dir()
+    if dir is None or key is None:
+        return
+    filename = os.path.join(dir, key + '.ppm')
+    temp = '%s.%d' % (filename, os.getpid())
+    try:
+        util.create_directory(dir)
+        image.save(temp, 'PPM')
+        os.rename(temp, filename)
+    except (IOError, os.error), value:
+        pdebug('cache', 'cannot write %s: %s', filename, value)
+        try:
+            os.unlink(temp)
+        except os.error:
+            pass
+        return
+    prune_preview_cache(dir, config.preferences.eps_preview_cache_size)
+
+def prune_preview_cache(dir, size):
+    try:
+        files = []
+        for name in os.listdir(dir):
+            if name[-4:] == '.ppm':
+                filename = os.path.join(dir, name)
+                files.append((os.stat(filename).st_mtime, filename))
+        if len(files) > size:
+            files.sort()
+            for mtime, filename in files[:len(files) - size]:
+                os.unlink(filename)
+    except os.error, value:
+        pdebug('cache', 'cannot prune %s: %s', dir, value)
+
+
+#
+#	Rendering previews in the background
+#
+# If a scheduler has been set with SetPreviewScheduler (the UI does
+# that with the after method of the Tk root window), previews are
+# rendered by up to preferences.eps_preview_processes ghostscript
+# processes running in the background, so that loading a document with
+# many EPS files doesn't have to wait for them. The processes are
+# polled with the scheduler. When the preview of an EpsData object is
+# available, CHANGED is issued for it once. Until then, the EPS file is
+# drawn as a rectangle.
+#
+# Without a scheduler, e.g. when exporting drawings from the command
+# line, previews are rendered while loading as before.
+#
+
+class PreviewRenderer:
+
+    poll_interval = 100	# milliseconds
+
+    def __init__(self):
+        self.schedule = None
+        self.polling = 0
+        self.queue = []		# EpsData objects waiting for a process
+        self.running = {}	# pid -> (EpsData, temp file)
+
+    def SetScheduler(self, schedule):
+        # SCHEDULE(MILLISECONDS, FUNCTION) has to call FUNCTION after
+        # the given time.
+        self.schedule = schedule
+
+    def IsAsync(self):
+        return (self.schedule is not None
+                and config.preferences.eps_preview_processes > 0)
+
+    def Request(self, data):
+        self.queue.append(data)
+        self.start_processes()
+        if not self.polling:
+            self.polling = 1
+            self.schedule(self.poll_interval, self.Poll)
+
+    def Pending(self):
+        return len(self.queue) + len(self.running)
+
+    def start_processes(self):
+        while self.queue \
+              and len(self.running) < config.preferences.eps_preview_processes:
+            data = self.queue.pop(0)
+            temp = tempfile.mktemp()
+            command = apply(preview_command,
+                            (data.filename,) + data.start + data.size
+                            + (data.resolution, temp))
+            try:
+                pid = os.spawnv(os.P_NOWAIT, '/bin/sh',
+                                ['sh', '-c', command])
+            except os.error, value:
+                warn(USER, _("Cannot render the preview of %s: %s"),
+                     data.filename, value)
+                data.preview_rendered(None)
+                continue
+            self.running[pid] = (data, temp)
+
+    def Poll(self):
+        for pid, (data, temp) in self.running.items():
+            try:
+                finished = os.waitpid(pid, os.WNOHANG)[0]
+            except os.error:
+                # somebody else has waited for it already
+                finished = pid
+            if finished:
+                del self.running[pid]
+                try:
+                    image = load_preview(temp)
+                except IOError:
+                    image = None
+                data.preview_rendered(image)
+        self.start_processes()
+        if self.running:
+            self.schedule(self.poll_interval, self.Poll)
+        else:
+            self.polling = 0
+
+preview_renderer = PreviewRenderer()
+SetPreviewScheduler = preview_renderer.SetScheduler
 
 
 class EpsData(ExternalData):
 
+    rendering = 0
+
     def __init__(self, filename):
         self.info = info = dscparser.parse_eps_file(filename)
         self.filename = filename
@@ -76,17 +257,50 @@ class EpsData(ExternalData):
             self.height = Point(0, ury - lly)
             self.start = (llx, lly)
             self.size = (urx - llx, ury - lly)
+            self.resolution = config.preferences.eps_preview_resolution
             self.image = None
-            try:
-                self.image = render_preview(filename, llx, lly,
-                                            urx - llx, ury - lly)
-            except IOError:
-                pass
+            self.cache_key = None
+            if preview_cache_dir() is not None:
+                try:
+                    self.cache_key = preview_cache_key(filename,
+                                                       info.BoundingBox,
+                                                       self.resolution)
+                except IOError:
+                    pass
+            self.image = cached_preview(self.cache_key)
+            if self.image is None:
+                if preview_renderer.IsAsync():
+                    self.rendering = 1
+                    preview_renderer.Request(self)
+                else:
+                    try:
+                        self.image = render_preview(filename, llx, lly,
+                                                    urx - llx, ury - lly,
+                                                    self.resolution)
+                        store_preview(self.cache_key, self.image)
+                    except IOError:
+                        pass
         else:
             raise TypeError, '%s has no BoundingBox' % filename
 
         ExternalData.__init__(self, filename)
 
+    def IsRendering(self):
+        # Return true if the preview is being rendered in the background
+        return self.rendering
+
+    def preview_rendered(self, image):
+        # Called by the PreviewRenderer when the background process for
+        # self has finished. IMAGE is None if it failed.
+        self.rendering = 0
+        if image is not None:
+            self.image = image
+            store_preview(self.cache_key, image)
+            connector.Issue(self, CHANGED, self)
+        # CHANGED is issued only once, so the subscribers aren't needed
+        # anymore
+        connector.RemovePublisher(self)
+
     def Start(self):
         return self.start
 
@@ -136,6 +350,15 @@ class EpsImage(ExternalGraphics):
             data = None
         ExternalGraphics.__init__(self, data, trafo,
                                   duplicate = duplicate)
+        if self.data.IsRendering():
+            # redraw when the preview is available. The connector only
+            # keeps a weak reference to self.
+            connector.Connect(self.data, CHANGED, self.preview_rendered, ())
+
+    def preview_rendered(self, *args):
+        if self.document is not None:
+            self.document.AddClearRect(self.bounding_rect)
+            self.document.issue_redraw()
 
     def DrawShape(self, device, rect = None):
         device.DrawEps(self.data, self.trafo)
@@ -19,18 +19,21 @@
 #	Font management...
 #
 
-import os, re, operator
+import os, re, operator, atexit
 from string import split, strip, atoi, atof, lower, translate, maketrans
 
 
 import streamfilter
 
 from Sketch import _, config, const, Point, TrafoType, Scale, SketchError, \
-     SketchInternalError, Subscribe, CreatePath, CreateFontMetric, SKCache
+     SketchInternalError, Subscribe, CreatePath, CreateFontMetric, SKCache, \
+     _sketch
 from Sketch.Lib import encoding
 
 from Sketch.warn import warn, INTERNAL, USER, pdebug
 from Sketch.Lib.util import find_in_path, find_files_in_path
+from Sketch.Lib.diskcache import DiskCache
+from Sketch.Lib.lrucache import LRUCache
 
 minus_tilde = maketrans('-', '~')
 
@@ -88,7 +91,12 @@ def read_char_metrics(afm):
         font_encoding[code] = name
     return charmetrics, font_encoding
 
-def read_afm_file(filename):
+def parse_afm_file(filename):
+    # Parse the AFM file FILENAME and return the arguments for
+    # CreateFontMetric followed by the encoding. The encoding is None
+    # for the standard encoding which is replaced by iso-latin-1. The
+    # result contains only types supported by marshal so that it can
+    # be stored in the metrics cache.
     afm = streamfilter.LineDecode(open(filename, 'r'))
 
     attribs = {'ItalicAngle': 0.0}
@@ -124,6 +132,7 @@ def read_afm_file(filename):
 
     if attribs.get('EncodingScheme', StandardEncoding) == StandardEncoding:
         enc = encoding.iso_latin_1
+        font_encoding = None
     else:
         enc = font_encoding
 
@@ -158,10 +167,51 @@ def read_afm_file(filename):
     if not attribs.has_key('Descender'):
         attribs['Descender'] = attribs['FontBBox'][1]
 
-    return (CreateFontMetric(attribs['Ascender'], attribs['Descender'],
-                             attribs['FontBBox'], attribs['ItalicAngle'],
-                             rescharmetrics),
-            enc)
+    return (attribs['Ascender'], attribs['Descender'], attribs['FontBBox'],
+            attribs['ItalicAngle'], rescharmetrics, font_encoding)
+
+def read_afm_file(filename):
+    cache = metrics_cache()
+    info = None
+    if cache is not None:
+        info = cache.Get(filename)
+    if info is None:
+        info = parse_afm_file(filename)
+        if cache is not None:
+            cache.Set(filename, info)
+    enc = info[-1]
+    if enc is None:
+        enc = encoding.iso_latin_1
+    return apply(CreateFontMetric, info[:-1]), enc
+
+
+#
+#	The metrics cache
+#
+# Parsing the sfd files in the font_path on startup and the afm files
+# of the fonts when they are first used takes some time with large font
+# collections. The results are therefore kept in a DiskCache in the
+# user's config directory. The cache is saved after the font directories
+# have been read and when Sketch exits, not after every afm file.
+#
+
+# Increment this when the values stored by parse_afm_file or
+# parse_sfd_file change.
+metrics_cache_version = 1
+
+_metrics_cache = None
+
+def metrics_cache():
+    # Return the metrics cache or None if it's disabled
+    global _metrics_cache
+    if not config.preferences.use_font_metrics_cache:
+        return None
+    if _metrics_cache is None:
+        filename = os.path.join(config.user_config_dir,
+                                config.font_metrics_cache_file)
+        _metrics_cache = DiskCache(filename, metrics_cache_version)
+        atexit.register(_metrics_cache.Save)
+    return _metrics_cache
 
 
 _warned_about_afm = {}
@@ -219,7 +269,8 @@ def convert_outline(outline):
     trafo = Scale(0.001)
     for closed, sub in outline:
         if closed:
-            sub.append(sub[0])
+            # don't modify OUTLINE, it may be cached
+            sub = sub + [sub[0]]
         path = CreatePath()
         paths.append(path)
         for item in sub:
@@ -229,11 +280,57 @@ def convert_outline(outline):
                 apply(path.AppendBezier, item)
         if closed:
             path.load_close()
-    for path in paths:
-        path.Transform(trafo)
+    _sketch.transform_paths(paths, trafo)
     return tuple(paths)
 
 
+#
+#	Glyph outlines
+#
+# The outlines of the glyphs are computed from the Type1 charstrings by
+# the interpreter in Sketch.Lib.type1, which is written in Python and
+# slow. The converted outlines are therefore kept in glyph_cache, which
+# is shared by all Font instances. The raw outlines produced by the
+# interpreter are also kept in a DiskCache in the user's config
+# directory, so that they don't have to be computed again in the next
+# session. That cache is written when Sketch exits.
+#
+
+class GlyphCache(LRUCache):
+
+    # The converted outlines, keyed by (PS_NAME, GLYPH_NAME), at most
+    # preferences.glyph_cache_size of them.
+
+    def Statistics(self):
+        return {'glyphs': len(self), 'hits': self.hits,
+                'misses': self.misses}
+
+glyph_cache = None
+
+def get_glyph_cache():
+    global glyph_cache
+    if glyph_cache is None:
+        glyph_cache = GlyphCache(config.preferences.glyph_cache_size)
+    return glyph_cache
+
+# Increment this when the format of the interpreter's outlines changes.
+outline_cache_version = 1
+
+_outline_cache = None
+
+def outline_cache():
+    # Return the DiskCache for the raw outlines or None if it's disabled
+    global _outline_cache
+    if not config.preferences.use_glyph_outline_cache:
+        return None
+    if _outline_cache is None:
+        filename = os.path.join(config.user_config_dir,
+                                config.glyph_outline_cache_file)
+        _outline_cache = DiskCache(filename, outline_cache_version)
+        atexit.register(_outline_cache.Save)
+    return _outline_cache
+
+
 
 
 fontlist = []
@@ -246,12 +343,35 @@ def _add_ps_filename(ps_name, filename):
         filename = ps_to_filename[ps_name] + filename
     ps_to_filename[ps_name] = filename
 
+def parse_sfd_file(filename):
+    # Return the font entries of the sfd file FILENAME as a list of
+    # tuples with either 6 items (psname, family, font_attrs,
+    # xlfd_start, encoding_name, basename) or 2 items (psname,
+    # basename).
+    entries = []
+    file = open(filename, 'r')
+    line_nr = 0
+    for line in file.readlines():
+        line_nr = line_nr + 1
+        line = strip(line)
+        if not line or line[0] == '#':
+            continue
+        info = tuple(map(intern, split(line, ',')))
+        if len(info) == 6 or len(info) == 2:
+            entries.append(info)
+        else:
+            warn(INTERNAL,'%s:%d: line must have exactly 6 fields',
+                 filename, line_nr)
+    file.close()
+    return entries
+
 def read_font_dirs():
     #print 'read_font_dirs'
     if __debug__:
         import time
         start = time.clock()
 
+    cache = metrics_cache()
     rx_sfd = re.compile(r'^.*\.sfd$')
     for directory in config.font_path:
         #print directory
@@ -266,31 +386,30 @@ def read_font_dirs():
         for filename in dirfiles:
             filename = os.path.join(directory, filename)
             #print filename
-            try:
-                file = open(filename, 'r')
-                line_nr = 0
-                for line in file.readlines():
-                    line_nr = line_nr + 1
-                    line = strip(line)
-                    if not line or line[0] == '#':
-                        continue
-                    info = map(intern, split(line, ','))
-                    if len(info) == 6:
-                        psname = info[0]
-                        fontlist.append(tuple(info[:-1]))
-                        _add_ps_filename(psname, info[-1])
-                        fontmap[psname] = tuple(info[1:-1])
-                    elif len(info) == 2:
-                        psname, basename = info
-                        _add_ps_filename(psname, basename)
-                    else:
-                        warn(INTERNAL,'%s:%d: line must have exactly 6 fields',
-                             filename, line_nr)
-                file.close()
-            except IOError, value:
-                warn(USER, _("Cannot load sfd file %(filename)s:%(message)s;"
-                             "ignoring it"),
-                     filename = filename, message = value.strerror)
+            entries = None
+            if cache is not None:
+                entries = cache.Get(filename)
+            if entries is None:
+                try:
+                    entries = parse_sfd_file(filename)
+                except IOError, value:
+                    warn(USER, _("Cannot load sfd file %(filename)s:"
+                                 "%(message)s; ignoring it"),
+                         filename = filename, message = value.strerror)
+                    continue
+                if cache is not None:
+                    cache.Set(filename, entries)
+            for info in entries:
+                if len(info) == 6:
+                    psname = info[0]
+                    fontlist.append(info[:-1])
+                    _add_ps_filename(psname, info[-1])
+                    fontmap[psname] = info[1:-1]
+                else:
+                    psname, basename = info
+                    _add_ps_filename(psname, basename)
+    if cache is not None:
+        cache.Save()
     if __debug__:
         pdebug('timing', 'time to read font dirs: %g', time.clock() - start)
 
@@ -322,7 +441,8 @@ class Font:
         self.xlfd_start = lower(xlfd_start)
         self.encoding_name = encoding_name
         self.metric, self.encoding = read_metric(self.PostScriptName())
-        self.outlines = None
+        self.raw_outlines = None
+        self.char_strings = None
 
         self.ref_count = 0
         font_cache[self.name] = self
@@ -385,24 +505,69 @@ class Font:
     def IsPrintable(self, char):
         return self.encoding[ord(char)] != encoding.notdef
 
-    def GetOutline(self, char):
-        if self.outlines is None:
-            self.char_strings, self.cs_interp \
-                = read_outlines(self.PostScriptName())
-            self.outlines = {}
-        char_name = self.encoding[ord(char)]
-        outline = self.outlines.get(char_name)
+    def raw_outline(self, char_name):
+        # Return the outline of the glyph CHAR_NAME as produced by the
+        # charstring interpreter.
+        if self.raw_outlines is None:
+            self.font_file = self.FontFileName()
+            cache = outline_cache()
+            if cache is not None and self.font_file:
+                self.raw_outlines = cache.Get(self.font_file)
+            if self.raw_outlines is None:
+                self.raw_outlines = {}
+        outline = self.raw_outlines.get(char_name)
         if outline is None:
+            if self.char_strings is None:
+                self.char_strings, self.cs_interp \
+                    = read_outlines(self.PostScriptName())
             self.cs_interp.execute(self.char_strings[char_name])
-            outline = convert_outline(self.cs_interp.paths)
-            self.outlines[char_name] = outline
+            outline = self.cs_interp.paths
             self.cs_interp.reset()
+            self.raw_outlines[char_name] = outline
+            cache = outline_cache()
+            if cache is not None and self.font_file:
+                cache.Set(self.font_file, self.raw_outlines)
+        return outline
+
+    def glyph_outline(self, char):
+        # Return the cached outline of CHAR. The paths must not be
+        # modified.
+        char_name = self.encoding[ord(char)]
+        key = (self.name, char_name)
+        cache = get_glyph_cache()
+        outline = cache.Get(key)
+        if outline is None:
+            outline = convert_outline(self.raw_outline(char_name))
+            cache.Add(key, outline)
+        return outline
+
+    def GetOutline(self, char):
         copy = []
-        for path in outline:
+        for path in self.glyph_outline(char):
             path = path.Duplicate()
             copy.append(path)
         return tuple(copy)
 
+    def GetOutlines(self, text, trafos = None):
+        # Return the outlines of all characters of TEXT as a list with
+        # one tuple of paths for each character. If TRAFOS is given, it
+        # must be a sequence with a trafo for each character and the
+        # outlines are new paths transformed with the corresponding
+        # trafo. Otherwise the paths are shared with the cache and must
+        # not be modified.
+        outlines = map(self.glyph_outline, text)
+        if trafos is None:
+            return outlines
+        transform_paths = _sketch.transform_paths
+        result = []
+        for i in range(len(outlines)):
+            copy = []
+            for path in outlines[i]:
+                copy.append(path.Duplicate())
+            transform_paths(copy, trafos[i])
+            result.append(tuple(copy))
+        return result
+
     def FontFileName(self):
         return font_file_name(self.PostScriptName())
 
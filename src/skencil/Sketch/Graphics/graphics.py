@@ -27,16 +27,17 @@
 import sys
 from types import TupleType
 import operator, string
-from math import pi
-
-import PIL.Image
+from math import pi, hypot
 
+# pax and PIL are imported by the methods of the screen devices that
+# need them, so that non-interactive users of this module, like the
+# PostScriptDevice, load neither Tk nor PIL.
 import X
-from pax import PaxRegionType, IntersectMasks, CreateRegion
 
 from Sketch.warn import pdebug, warn, INTERNAL, USER
 from Sketch import _, SketchError, const, config
 from Sketch.Lib.util import Empty
+from Sketch.Lib.lrucache import LRUCache
 
 from Sketch.const import ArcPieSlice, ArcChord
 
@@ -44,7 +45,8 @@ from Sketch import _sketch
 
 
 from Sketch import Point, Polar, Rect, UnitRect, Identity, SingularMatrix, \
-     Trafo, Rotation, Scale, Translation, Undo, TransformRectangle
+     Trafo, Rotation, Scale, Translation, Undo, TransformRectangle, \
+     UnionRects, EmptyRect
 
 from color import StandardColors
 import color
@@ -159,6 +161,7 @@ class GCDevice:
         # Itersect the current clip region and REGION and make the
         # result the new clip region. REGION may be a region object or a
         # pixmap object of depth 1
+        from pax import IntersectMasks
         self.clip_region = IntersectMasks(self.clip_region, region)
         self.gc.SetClipMask(self.clip_region)
 
@@ -393,6 +396,12 @@ class CommonDevice:
 
     # some methods common to GraphicsDevice and PostScriptDevice
 
+    def DrawShared(self, object, rect = None):
+        # Draw OBJECT, which is drawn several times in the document,
+        # e.g. as the original of clones. Devices may override this to
+        # render OBJECT only once and reuse the result.
+        object.DrawShape(self, rect)
+
     def draw_arrow(self, arrow, width, pos, dir, rect = None):
         self.PushTrafo()
         self.Translate(pos.x, pos.y)
@@ -453,6 +462,26 @@ class CommonDevice:
 use_shm_images = 0
 shm_images_supported = 0
 
+
+#
+# Class FontCache
+#
+# The X fonts loaded by a GraphicsDevice, keyed by XLFD. The fonts are
+# kept across redraws and changes of the zoom factor. The number of
+# fonts is limited because text that is rotated or scaled by large
+# factors needs a font of its own for almost every string and every
+# zoom factor. When the limit is reached, the least recently used font
+# is discarded, which frees it on the server once it's not used
+# anymore.
+#
+
+class FontCache(LRUCache):
+
+    def Statistics(self):
+        return {'fonts': len(self), 'hits': self.hits,
+                'misses': self.misses, 'discarded': self.discarded}
+
+
 class GraphicsDevice(SimpleGC, CommonDevice):
 
     #
@@ -461,8 +490,6 @@ class GraphicsDevice(SimpleGC, CommonDevice):
     #
 
     ximage = None
-    font_cache = None
-    old_font_cache = None
 
     grid_style = default_grid_style
     guide_style = default_guide_style
@@ -473,6 +500,12 @@ class GraphicsDevice(SimpleGC, CommonDevice):
     draw_visible = 1
     draw_printable = 0
 
+    # If true, objects smaller than preferences.lod_threshold pixels
+    # are drawn as a single pixel and bezier paths are simplified (see
+    # the Level of Detail section below). Only the canvas turns this
+    # on, hit testing and the other devices need all the details.
+    use_lod = 0
+
     def __init__(self):
         SimpleGC.__init__(self)
         self.line = 0
@@ -482,6 +515,7 @@ class GraphicsDevice(SimpleGC, CommonDevice):
         self.images_drawn = 0
         self.unknown_fonts = {}
         self.failed_fonts = {}
+        self.font_cache = FontCache(config.preferences.font_cache_size)
 
     def InitClip(self):
         SimpleGC.InitClip(self)
@@ -528,6 +562,8 @@ class GraphicsDevice(SimpleGC, CommonDevice):
     #
 
     def get_pattern_image(self):
+        import PIL.Image
+        from pax import PaxRegionType
         width = self.widget.width
         height = self.widget.height
         winrect = self.doc_to_win(self.fill_rect)
@@ -686,6 +722,84 @@ class GraphicsDevice(SimpleGC, CommonDevice):
         return not not self.outline_mode
 
 
+    #
+    #	Level of Detail
+    #
+    #	When the drawing is zoomed out, many objects cover only a pixel
+    #	or less. If use_lod is true, the primitives below check the size
+    #	of the object in window coordinates first and draw such objects
+    #	with draw_lod_point instead. Additionally, draw_multipath
+    #	simplifies the polygons it creates for bezier paths with a
+    #	tolerance of preferences.lod_tolerance pixels.
+    #
+    #	The PostScript device and the export filters don't use
+    #	GraphicsDevice, so they are not affected.
+    #
+
+    def draw_lod_point(self, x, y, width, height):
+        # If the object whose bounding box in window coordinates has the
+        # center X, Y and the size WIDTH x HEIGHT is smaller than the
+        # LOD threshold, draw a single pixel in its center and return
+        # true. Otherwise, return false and leave the drawing to the
+        # caller.
+        threshold = config.preferences.lod_threshold
+        if self.line:
+            # thick lines make small objects larger
+            line_width = self.properties.line_width * self.scale
+            width = width + line_width
+            height = height + line_width
+        if width >= threshold or height >= threshold:
+            return 0
+        if self.line:
+            self.properties.ExecuteLine(self)
+        elif self.fill and not self.proc_fill:
+            self.properties.ExecuteFill(self, self.fill_rect)
+        else:
+            # pattern fills are not worth the effort for a single pixel
+            return 1
+        self.gc.DrawPoint(int(round(x)), int(round(y)))
+        return 1
+
+    def draw_lod_rect(self, rect):
+        # Like draw_lod_point, but with the bounding box given as a Rect
+        # in window coordinates.
+        if rect is EmptyRect:
+            return 0
+        return self.draw_lod_point((rect.left + rect.right) / 2,
+                                   (rect.bottom + rect.top) / 2,
+                                   rect.right - rect.left,
+                                   rect.top - rect.bottom)
+
+    def lod_tolerance(self):
+        # The tolerance for the simplification of bezier paths in
+        # draw_multipath
+        if self.use_lod:
+            return config.preferences.lod_tolerance
+        return 0
+
+    def draw_lod_text(self, text, trafo):
+        # If TEXT drawn with TRAFO would be less than lod_threshold
+        # pixels high, draw a line along its baseline and return true.
+        properties = self.properties
+        trafo = self.doc_to_win(trafo)(Scale(properties.font_size))
+        if abs(trafo.DTransform(0, 1)) >= config.preferences.lod_threshold:
+            return 0
+        if self.fill:
+            if self.proc_fill:
+                return 1
+            properties.ExecuteFill(self)
+        elif self.IsOutlineActive():
+            properties.ExecuteLine(self)
+        else:
+            return 1
+        # the line ends where the last character ends, so that even a
+        # single character gets a line of its width
+        width = properties.font.TextCoordBox(text, 1.0)[2]
+        x1, y1 = trafo.DocToWin(0, 0)
+        x2, y2 = trafo.DocToWin(width, 0)
+        self.gc.DrawLine(x1, y1, x2, y2)
+        return 1
+
     #
     #	Primitives
     #
@@ -695,6 +809,16 @@ class GraphicsDevice(SimpleGC, CommonDevice):
         self.Concat(trafo)
         pts = TransformRectangle(self.doc_to_win, UnitRect)
         self.PopTrafo()
+        if self.use_lod and not clip:
+            if type(pts) == TupleType:
+                x, y, w, h = pts
+            else:
+                xs = map(operator.getitem, pts, [0] * len(pts))
+                ys = map(operator.getitem, pts, [1] * len(pts))
+                x = min(xs); w = max(xs) - x
+                y = min(ys); h = max(ys) - y
+            if self.draw_lod_point(x + w / 2.0, y + h / 2.0, w, h):
+                return
         if type(pts) == TupleType:
             if self.proc_fill:
                 if not clip:
@@ -738,6 +862,12 @@ class GraphicsDevice(SimpleGC, CommonDevice):
     def SimpleEllipse(self, trafo, start_angle, end_angle, arc_type,
                       rect = None, clip = 0):
         trafo2 = self.doc_to_win(trafo)
+        if self.use_lod and not clip:
+            # the bounding box of the full ellipse
+            if self.draw_lod_point(trafo2.v1, trafo2.v2,
+                                   2 * hypot(trafo2.m11, trafo2.m12),
+                                   2 * hypot(trafo2.m21, trafo2.m22)):
+                return
         if trafo2.m12 == 0.0 and trafo2.m21 == 0.0 and not self.proc_fill \
            and start_angle == end_angle and not clip:
             x1, y1 = trafo2.DocToWin(1, 1)
@@ -770,15 +900,24 @@ class GraphicsDevice(SimpleGC, CommonDevice):
                 arc = circle_path
             # pass rect as None, because trafo2 is not really the
             # viewport transformation
+            from pax import CreateRegion
             _sketch.draw_multipath(self.gc, trafo2, line, fill,
                                    self.PushClip, self.PopClip,
                                    self.ClipRegion, None, (arc,),
-                                   CreateRegion(), self.proc_fill, clip)
+                                   CreateRegion(), self.proc_fill, clip,
+                                   self.lod_tolerance())
             self.draw_ellipse_arrows(trafo, start_angle, end_angle, arc_type,
                                      rect)
 
 
     def MultiBezier(self, paths, rect = None, clip = 0):
+        if self.use_lod and not clip:
+            trafo = self.doc_to_win
+            bbox = EmptyRect
+            for path in paths:
+                bbox = UnionRects(bbox, path.coord_rect(trafo))
+            if self.draw_lod_rect(bbox):
+                return
         if self.line:
             line = self.activate_line
         else:
@@ -788,10 +927,11 @@ class GraphicsDevice(SimpleGC, CommonDevice):
         else:
             fill = None
 
+        from pax import CreateRegion
         _sketch.draw_multipath(self.gc, self.doc_to_win, line, fill,
                                self.PushClip, self.PopClip, self.ClipRegion,
                                rect, paths, CreateRegion(), self.proc_fill,
-                               clip)
+                               clip, self.lod_tolerance())
 
         if self.line:
             self.draw_arrows(paths, rect)
@@ -853,6 +993,8 @@ class GraphicsDevice(SimpleGC, CommonDevice):
 
     def DrawText(self, text, trafo = None, clip = 0, cache = None):
         if text and self.properties.font:
+            if self.use_lod and not clip and self.draw_lod_text(text, trafo):
+                return
             if self.fill or clip:
                 if self.proc_fill or clip:
                     bitmap, bitmapgc = self.create_clip_bitmap()
@@ -887,7 +1029,9 @@ class GraphicsDevice(SimpleGC, CommonDevice):
                                      cache)
 
     def ResetFontCache(self):
-        self.font_cache = {}
+        # Discard all cached fonts. Normally not needed, since the cache
+        # limits the number of fonts itself.
+        self.font_cache.Clear()
 
     def load_font(self, xlfd, cache):
         font_cache = self.font_cache
@@ -902,7 +1046,6 @@ class GraphicsDevice(SimpleGC, CommonDevice):
         if cache and cache.has_key(id(self)):
             old_xlfd, old_font = cache[id(self)]
             if old_xlfd == xlfd:
-                font_cache[xlfd] = old_font
                 return old_font
 
         if complex_text is not None:
@@ -911,22 +1054,19 @@ class GraphicsDevice(SimpleGC, CommonDevice):
             if cache.has_key(key):
                 old_xlfd, old_font = cache[key]
                 if old_xlfd == xlfd:
-                    font_cache[xlfd] = old_font
                     return old_font
             cache = None
 
-        if font_cache is not None and font_cache.has_key(xlfd):
-            font = font_cache[xlfd]
-        else:
+        font = font_cache.Get(xlfd)
+        if font is None:
             #print 'load font', xlfd
             try:
                 font = self.widget.LoadQueryFont(xlfd)
             except RuntimeError:
                 self.failed_fonts[xlfd] = 1
                 raise
+            font_cache.Add(xlfd, font)
 
-        if font_cache is not None:
-            font_cache[xlfd] = font
         if cache is not None:
             cache[id(self)] = (xlfd, font)
         elif complex_text is not None:
@@ -1067,6 +1207,7 @@ class GraphicsDevice(SimpleGC, CommonDevice):
             sy = min(uly, lly, ury, lry)
             ey = max(uly, lly, ury, lry)
 
+            from pax import PaxRegionType
             if type(self.clip_region) == PaxRegionType:
                 cx, cy, cw, ch = self.clip_region.ClipBox()
                 cex = cx + cw; cey = cy + ch
@@ -1129,6 +1270,34 @@ class GraphicsDevice(SimpleGC, CommonDevice):
         self.ximage = None
         SimpleGC.WindowResized(self, width, height)
 
+    #
+    #	Offscreen Tiles
+    #
+    #	StartTile(PIXMAP, DOC_TO_WIN, WIN_TO_DOC) redirects all drawing
+    #	to PIXMAP, using DOC_TO_WIN and WIN_TO_DOC as the viewport
+    #	transformation. EndTile() restores drawing to the window. The
+    #	canvas uses this to render its tile cache. The pixmap must not be
+    #	larger than the window because some methods clip to the window
+    #	size.
+
+    tile_state = None
+
+    def StartTile(self, pixmap, doc_to_win, win_to_doc):
+        self.tile_state = (self.doc_to_win, self.win_to_doc)
+        self.SetViewportTransform(self.scale, doc_to_win, win_to_doc)
+        self.InitClip()
+        self.gc.SetDrawable(pixmap)
+
+    def EndTile(self):
+        if use_shm_images and self.images_drawn:
+            # the shared memory ximage is used again for the next tile
+            self.widget.Sync()
+        self.gc.SetDrawable(self.widget)
+        doc_to_win, win_to_doc = self.tile_state
+        self.tile_state = None
+        self.SetViewportTransform(self.scale, doc_to_win, win_to_doc)
+        self.InitClip()
+
 
     #
     #
@@ -1238,7 +1407,6 @@ class InvertingDevice(GraphicsDevice):
         self.fill = 0
         self.line = 1
         self.gc = None
-        self.font_cache = {}
 
     def init_gc(self, widget, **gcargs):
         self.visual = color.skvisual
@@ -24,6 +24,7 @@ from blend import Blend, MismatchError
 class Group(EditableCompound):
 
     is_Group = 1
+    has_bulk_transform = 1
 
     def Info(self):
         return _("Group with %d objects") % len(self.objects)
@@ -24,10 +24,8 @@
 import os
 from types import StringType
 
-import PIL.Image, PIL.ImageChops
-
 from Sketch import _, RegisterCommands
-from Sketch.UI.command import AddCmd
+from Sketch.command import AddCmd
 
 from external import ExternalData, get_cached, ExternalGraphics
 
@@ -75,11 +73,15 @@ class ImageData(ExternalData):
             return self
 
     def Invert(self):
+        import PIL.ImageChops
         return ImageData(PIL.ImageChops.invert(self.image))
 
 
 
 def load_image(filename, cache = 1):
+    # PIL is only imported when the first image is loaded, so that
+    # Sketch can be used without it for drawings without images
+    import PIL.Image
     if type(filename) == StringType:
         image = get_cached(filename)
         if image:
@@ -93,6 +95,7 @@ class Image(ExternalGraphics):
 
     is_Image = 1
     is_clip = 1
+    has_bulk_transform = 1
 
     commands = ExternalGraphics.commands[:]
 
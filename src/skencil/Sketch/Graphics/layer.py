@@ -65,6 +65,22 @@ class Layer(EditableCompound):
             if outlined:
                 device.EndOutlineMode()
 
+    def DrawSteps(self, device, rect = None):
+        # Like Draw, but as a generator that yields between the objects
+        # drawn. See Compound.DrawShapeSteps.
+        if device.draw_visible and self.visible \
+           or device.draw_printable and self.printable:
+            outlined = self.outlined or device.IsOutlineActive()
+            if outlined:
+                device.StartOutlineMode(self.outline_color)
+            try:
+                for step in EditableCompound.DrawShapeSteps(self, device,
+                                                            rect):
+                    yield step
+            finally:
+                if outlined:
+                    device.EndOutlineMode()
+
     def SelectSubobject(self, p, rect, device, path = (), *rest):
         if not self.CanSelect():
             return None
@@ -86,7 +102,7 @@ class Layer(EditableCompound):
         build_info = selinfo.build_info
         selected = []
         objects = self.objects
-        for idx in range(len(objects)):
+        for idx in self.overlapping_indices(rect):
             obj = objects[idx]
             if test(obj.bounding_rect):
                 selected.append(build_info(idx, obj))
@@ -218,6 +234,11 @@ class SpecialLayer(Layer):
     SelectSubobject = __none
     PickObject = __none
 
+    def DrawSteps(self, device, rect = None):
+        # special layers are cheap to draw. Draw them in one step.
+        self.Draw(device, rect)
+        yield None
+
     def SelectRect(self, *rect):
         return []
 
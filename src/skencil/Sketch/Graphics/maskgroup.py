@@ -24,9 +24,10 @@
 
 from Sketch.warn import warn_tb, INTERNAL
 
-from Sketch.UI.command import AddCmd
+from Sketch.command import AddCmd
 
 from Sketch import _, IntersectRects, RegisterCommands
+from base import define_lazy_attrs
 from compound import EditableCompound
 from properties import EmptyFillStyle, EmptyLineStyle
 
@@ -35,6 +36,12 @@ class MaskGroup(EditableCompound):
     is_Group = 1
     is_MaskGroup = 1
 
+    # the rects are those of the mask
+    incremental_rects = 0
+
+    # the children have to be drawn with the clip mask set by DrawShape
+    draw_steps = 0
+
     _lazy_attrs = EditableCompound._lazy_attrs.copy()
     _lazy_attrs['mask_fill'] = 'update_mask_attrs'
     _lazy_attrs['mask_line'] = 'update_mask_attrs'
@@ -70,6 +77,10 @@ class MaskGroup(EditableCompound):
                 self.document.AddClearRect(child.bounding_rect)
         EditableCompound.ChildChanged(self, child)
 
+    def ChildrenChanged(self, children):
+        for child in children:
+            self.ChildChanged(child)
+
     def Info(self):
         return _("MaskGroup with %d objects") % len(self.objects)
 
@@ -163,4 +174,5 @@ class MaskGroup(EditableCompound):
 
     context_commands = ('SelectMask',)
 
+define_lazy_attrs(MaskGroup)
 RegisterCommands(MaskGroup)
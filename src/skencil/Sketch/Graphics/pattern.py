@@ -104,6 +104,13 @@ class SolidPattern(Pattern):
     def __str__(self):
         return 'SolidPattern(%s)' % `self.color`
 
+    def Duplicate(self):
+        # solid patterns are never modified, so they can be shared
+        # instead of copied
+        return self
+
+    Copy = Duplicate
+
     def Execute(self, device, rect = None):
         device.SetFillColor(self.color)
 
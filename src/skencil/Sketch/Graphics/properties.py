@@ -15,10 +15,15 @@
 # License along with this library; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307	USA
 
+import weakref
+from types import ClassType, InstanceType, IntType, LongType, FloatType, \
+     StringType, TupleType, NoneType
+
 from Sketch import const
 CHANGED = const.CHANGED
 from Sketch.connector import Publisher
 from Sketch import CreateListUndo, UndoAfter, NullUndo, SketchInternalError, _
+from Sketch import RegisterUndoCoalescer, keep_older_undo
 from Sketch.warn import pdebug, INTERNAL
 
 from pattern import SolidPattern, EmptyPattern
@@ -55,6 +60,7 @@ class Style(Publisher):
         dict[prop] = value
         self.issue(CHANGED, self)
         return undo
+    RegisterUndoCoalescer(SetProperty, keep_older_undo)
 
     def DelProperty(self, prop):
         undo = (self.SetProperty, prop, getattr(self, prop))
@@ -112,9 +118,92 @@ def LineStyle(color = None, width = 0, cap  = const.CapButt,
 SolidLine = LineStyle
 EmptyLineStyle = Style(line_pattern = EmptyPattern)
 
-class PropertyStack:
+#
+# Property snapshots
+#
+# The properties of a PropertyStack are the properties of its layers
+# flattened into one dictionary. Many objects, often most objects of a
+# drawing, have the same flattened properties, so instead of storing a
+# copy of the dictionary in every PropertyStack, the flattened
+# properties are stored as class attributes of a snapshot class derived
+# from the class of the PropertyStack. A PropertyStack whose properties
+# are known has its snapshot class as __class__, so that a property
+# lookup is a lookup in the class dictionary, and the instance
+# dictionary only contains the stack.
+#
+# Snapshot classes are interned: PropertyStacks with the same
+# properties share one snapshot class. Numbers, strings, tuples and
+# solid patterns are compared by value, all other property values by
+# identity, because they may be modified in place (e.g. gradients by
+# Transform). The snapshots are only referenced weakly by the table
+# and disappear with the last PropertyStack using them.
+#
+# When the properties change, _clear_cache resets the __class__ to the
+# original class and the properties are flattened again on the next
+# property access, which may yield another snapshot. Changes of
+# dynamic styles are propagated by the document via ObjectChanged.
+#
+
+_snapshot_classes = weakref.WeakValueDictionary()
+
+_scalar_types = {}
+for _t in (IntType, LongType, FloatType, StringType, NoneType):
+    _scalar_types[_t] = 1
+del _t
+
+def snapshot_value_key(value):
+    # Return the key that identifies VALUE in the key of a snapshot.
+    # The type is part of the key, so that e.g. a line width of 1 and
+    # one of 1.0 are different.
+    value_type = type(value)
+    if _scalar_types.has_key(value_type):
+        return (0, value_type, value)
+    if value_type == TupleType:
+        # e.g. line dashes
+        for item in value:
+            if not _scalar_types.has_key(type(item)):
+                break
+        else:
+            return (0, value_type, repr(value))
+    elif value_type == InstanceType and value.__class__ is SolidPattern:
+        try:
+            hash(value.color)
+            return (1, value.color)
+        except TypeError:
+            pass
+    return (2, id(value))
+
+def stack_class(cls):
+    # Return the class CLS or, if CLS is a snapshot class, the
+    # PropertyStack class it was derived from.
+    return cls.__dict__.get('_snapshot_of', cls)
+
+def snapshot_class(cls, stack):
+    # Return the snapshot class derived from CLS for the properties
+    # defined by STACK, a list of styles.
+    properties = {}
+    for i in range(len(stack) - 1, -1, -1):
+        properties.update(stack[i].__dict__)
+    names = properties.keys()
+    names.sort()
+    key = [cls]
+    for name in names:
+        key.append((name, snapshot_value_key(properties[name])))
+    key = tuple(key)
+    snapshot = _snapshot_classes.get(key)
+    if snapshot is None:
+        properties['_snapshot_of'] = cls
+        properties['__module__'] = cls.__module__
+        snapshot = ClassType(cls.__name__, (cls,), properties)
+        _snapshot_classes[key] = snapshot
+    return snapshot
+
+def snapshot_statistics():
+    # Return the number of snapshot classes in use (for debugging)
+    return len(_snapshot_classes)
 
-    update_cache = 1
+
+class PropertyStack:
 
     def __init__(self, base = None, duplicate = None):
         if duplicate is not None:
@@ -127,21 +216,23 @@ class PropertyStack:
             self.stack = [base]
 
     def __getattr__(self, attr):
-        if self.update_cache:
-            cache = self.__dict__
-            stack = self.stack[:]
-            stack.reverse()
-            for layer in stack:
-                cache.update(layer.__dict__)
-            self.update_cache = 0
+        # Only called if the property is not defined in the snapshot
+        # class, i.e. if there is no snapshot yet or the property is
+        # unknown.
+        cls = self.__class__
+        if cls.__dict__.has_key('_snapshot_of') or attr[:2] == '__' \
+           or attr == 'stack':
+            raise AttributeError, attr
+        self.__class__ = cls = snapshot_class(cls, self.stack)
         try:
-            return self.__dict__[attr]
+            return cls.__dict__[attr]
         except KeyError:
             raise AttributeError, attr
 
     def _clear_cache(self):
-        self.__dict__ = {'stack' : self.stack}
+        self.__class__ = stack_class(self.__class__)
         return (self._clear_cache,)
+    RegisterUndoCoalescer(_clear_cache, keep_older_undo)
 
     def prop_layer(self, prop):
         # return property layer containing PROP
@@ -279,7 +370,7 @@ class PropertyStack:
         self._clear_cache()
 
     def Duplicate(self):
-        return self.__class__(duplicate = self)
+        return stack_class(self.__class__)(duplicate = self)
 
 
     grow_join = [5.240843064, 0.5, 0.5]
@@ -318,6 +409,11 @@ class PropertyStack:
             undo = (UndoAfter, undo, self._clear_cache())
         return undo
 
+    def NeedsTransform(self):
+        # Return true if Transform might change the properties. Must
+        # agree with the tests in Transform.
+        return self.fill_transform and self.fill_pattern.is_procedural
+
     def CreateStyle(self, which_properties):
         properties = {}
         for prop in which_properties:
@@ -344,6 +440,7 @@ class PropertyStack:
             last = style
         length = len(stack)
         self.delete_shadowed_layers()
+        self._clear_cache()
 
     def SaveToFile(self, file):
         file.Properties(self)
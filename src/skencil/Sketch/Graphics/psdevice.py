@@ -22,14 +22,16 @@
 # file can be an EPS file.
 #
 
-import os
-from types import StringType
+import os, zlib
+from types import StringType, FileType
 from math import pi, sqrt
 from string import join, strip, lstrip, split
+from cStringIO import StringIO
 
 from Sketch.Lib.util import Empty
 
 from Sketch import _, config, _sketch, Scale, SketchVersion
+import streamfilter
 from Sketch.warn import pdebug, warn_tb, warn, USER, INTERNAL
 from Sketch.Lib.psmisc import quote_ps_string, make_textline
 
@@ -52,6 +54,40 @@ defaultLineStyle = _DummyLineStyle()
 ps_join = (0, 1, 2)
 ps_cap = (None, 0, 1, 2)
 
+# the PostScript language level needed for each image encoding
+ps_language_level = {'hex': 1, 'ascii85': 2, 'flate': 3}
+
+# Procedures in PostScript are arrays, whose length is limited to 65535
+# elements in most interpreters. Shared objects whose code has more
+# tokens than this are drawn inline.
+max_form_tokens = 65000
+
+class NotShareable(Exception):
+    # raised while recording the code of a shared object that can't be
+    # put into a procedure
+    pass
+
+class CountingFile:
+
+    # Pass the data written to it on to FILE and count the bytes. The
+    # resource statistics use this instead of the file position,
+    # because the output may be a pipe to the print command, which
+    # can't tell().
+
+    def __init__(self, file):
+        self.file = file
+        self.count = 0
+
+    def write(self, data):
+        self.count = self.count + len(data)
+        self.file.write(data)
+
+def ascii85_length(length):
+    # The number of bytes LENGTH bytes take ASCII85 encoded, including
+    # the EOD marker but without line breaks (an estimate, since groups
+    # of zeros are encoded as a single z)
+    return (length * 5 + 3) / 4 + 2
+
 # header comments. Currently the type of all parameters is <textline>
 HeaderComments = [('For', '%%%%For: %s\n'),
                   ('CreationDate', '%%%%CreationDate: %s\n'),
@@ -66,7 +102,7 @@ class PostScriptDevice(CommonDevice):
 
     def __init__(self, file, as_eps = 1, bounding_box = None,
                  document = None, printable = 1, visible = 0, rotate = 0,
-                 embed_fonts = 0, **options):
+                 embed_fonts = 0, image_encoding = None, **options):
         if as_eps and not bounding_box:
             raise ValueError, 'bounding_box required for EPS'
 
@@ -80,14 +116,26 @@ class PostScriptDevice(CommonDevice):
         self.draw_visible = visible
         self.draw_printable = printable
         self.gradient_steps = config.preferences.gradient_steps_print
+        # Resources that occur more than once in the document, i.e.
+        # image data, EPS files, originals of clones and gradients, are
+        # written only once and referenced by name afterwards. Except
+        # for images this needs Level 2 output at least, because the
+        # names are defined in SketchDict whose size is fixed in Level
+        # 1. resource_count maps the ids of image and EPS data and the
+        # gradient samples to the number of times they're used in the
+        # document. resource_names maps these ids, the ids of clone
+        # originals and the gradient samples to the names of the
+        # resources already defined in the file.
+        self.resource_count = {}
+        self.resource_names = {}
+        # the size in bytes of each defined resource and for each kind
+        # of resource the number of references and the bytes saved by
+        # them (see ResourceStatistics)
+        self.resource_sizes = {}
+        self.resource_stats = {}
+        self.recording_form = 0
         self.init_props()
 
-        if document:
-            document.WalkHierarchy(self.add_obj_resources,
-                                   visible = self.draw_visible,
-                                   printable = self.draw_printable)
-            self.needed_resources.update(self.include_resources)
-
         # take care of the case where we're writing to an EPS that's
         # referenced by the document. This is a bit tricky. If the file
         # argument is an already opened file object, all hope is lost.
@@ -117,6 +165,21 @@ class PostScriptDevice(CommonDevice):
             self.close_file = 0
         self.file = file
 
+        if image_encoding is None:
+            image_encoding = config.preferences.ps_image_encoding
+        if image_encoding != 'hex' and type(file) != FileType:
+            # the ASCII85 encoder can only write to real files
+            image_encoding = 'hex'
+        self.image_encoding = image_encoding
+        self.language_level = ps_language_level[image_encoding]
+
+        # add_obj_resources needs the language level
+        if document:
+            document.WalkHierarchy(self.add_obj_resources,
+                                   visible = self.draw_visible,
+                                   printable = self.draw_printable)
+            self.needed_resources.update(self.include_resources)
+
         if rotate:
             width, height = document.PageSize()
             llx, lly, urx, ury = bounding_box
@@ -146,6 +209,8 @@ class PostScriptDevice(CommonDevice):
         # XXX The Extensions comment should take embedded EPS files into
         # account. (the colorimage operator should be optional)
         write("%%Extensions: CMYK\n")
+        if self.language_level > 1:
+            write("%%%%LanguageLevel: %d\n" % self.language_level)
 
         write("%%DocumentSuppliedResources: (atend)\n")
 
@@ -220,6 +285,37 @@ class PostScriptDevice(CommonDevice):
             self.include_resources[res] = 1
         if obj.is_Eps:
             self.needed_resources.update(obj.PSNeededResources())
+        if obj.is_Image or obj.is_Eps:
+            key = id(obj.Data())
+            self.resource_count[key] = self.resource_count.get(key, 0) + 1
+        if obj.has_properties and self.language_level >= 2:
+            properties = obj.Properties()
+            for pattern in (properties.fill_pattern, properties.line_pattern):
+                if pattern.is_Gradient:
+                    key = tuple(pattern.Gradient().Sample(self.gradient_steps))
+                    self.resource_count[key] = self.resource_count.get(key,
+                                                                       0) + 1
+
+    def define_resource(self, kind, name, size):
+        # Record that the resource NAME of type KIND has been written
+        # to the file. SIZE is the number of bytes saved whenever the
+        # resource is referenced.
+        self.resource_sizes[name] = size
+        defined, references, saved = self.resource_stats.get(kind, (0, 0, 0))
+        self.resource_stats[kind] = (defined + 1, references, saved)
+
+    def reference_resource(self, kind, name):
+        defined, references, saved = self.resource_stats[kind]
+        self.resource_stats[kind] = (defined, references + 1,
+                                     saved + self.resource_sizes[name])
+
+    def ResourceStatistics(self):
+        # Return a dictionary mapping the kinds of the resources written
+        # only once ('gradient', 'image', 'eps' and 'form') to tuples
+        # (DEFINED, REFERENCES, BYTES_SAVED). BYTES_SAVED is an estimate
+        # of the number of bytes it would have taken to write the
+        # referenced resources inline.
+        return self.resource_stats.copy()
 
     def handle_writes_to_embedded_eps(self, obj):
         if obj.is_Eps:
@@ -250,6 +346,11 @@ class PostScriptDevice(CommonDevice):
 
                 write('%%EOF\n')
                 self.trailer_written = 1
+                if __debug__:
+                    for kind, stats in self.ResourceStatistics().items():
+                        apply(pdebug, ('PS', '%s resources: %d defined, '
+                                       '%d references, %d bytes saved',
+                                       kind) + stats)
             if self.close_file:
                 self.file.close()
 
@@ -558,15 +659,43 @@ class PostScriptDevice(CommonDevice):
 
 
     def DrawImage(self, image, trafo, clip = 0):
+        write = self.file.write
+        w, h = image.size
+        if w <= 0 or h <= 0:
+            # an empty image. (it should never be < 0 ...)
+            return
+        if self.recording_form:
+            # the image data is read from currentfile
+            raise NotShareable
+        if self.image_encoding == 'hex':
+            self.write_hex_image(image, trafo)
+        else:
+            if len(image.mode) >= 3:
+                ncomp = 3
+            else:
+                ncomp = 1
+            name = self.image_resource(image)
+            write('%d %d [%g %g %g %g %g %g] true %d '
+                  % ((w, h) + trafo.coeff() + (ncomp,)))
+            if name:
+                write('/%s skimgref\n' % name)
+            else:
+                write('%s skimage\n'
+                      % (self.image_encoding == 'flate' and 'true' or 'false'))
+                self.write_image_data(image, self.image_encoding == 'flate')
+        if clip:
+            write('pusht [%g %g %g %g %g %g] concat\n' % trafo.coeff())
+            write('%d %d scale\n' % image.size)
+            write('0 0 m  1 0 l	 1 1 l	0 1 l closepath popt clip\n')
+
+    def write_hex_image(self, image, trafo):
+        # Write IMAGE as hex data for skcimg or skgimg (Level 1)
         write = self.file.write
         w, h = image.size
         if len(image.mode) >= 3:
             # compute number of hex lines. 80 hex digits per line. 3 bytes
             # per pixel
             digits = w * h * 6	# 3 bytes per pixel, 2 digits per byte
-            if digits <= 0:
-                # an empty image. (it should never be < 0 ...)
-                return
             lines = (digits - 1) / 80 + 1
             write('%d %d ' % image.size)
             write('[%g %g %g %g %g %g] true\n' % trafo.coeff())
@@ -574,9 +703,6 @@ class PostScriptDevice(CommonDevice):
             write('skcimg\n')
         else:
             digits = w * h * 2	# 2 digits per byte
-            if digits <= 0:
-                # an empty image. (it should never be < 0 ...)
-                return
             lines = (digits - 1) / 80 + 1
             write('%d %d ' % image.size)
             write('[%g %g %g %g %g %g] true\n' % trafo.coeff())
@@ -585,24 +711,167 @@ class PostScriptDevice(CommonDevice):
 
         _sketch.write_ps_hex(image.im, self.file)
         write('%%EndData\n')
-        if clip:
-            write('pusht [%g %g %g %g %g %g] concat\n' % trafo.coeff())
-            write('%d %d scale\n' % image.size)
-            write('0 0 m  1 0 l	 1 1 l	0 1 l closepath popt clip\n')
+
+    def image_resource(self, image, shared = 0):
+        # Return the name under which the data of IMAGE (an ImageData
+        # instance) is available in the PostScript file as a reusable
+        # file, writing the definition first if necessary. Return None
+        # if the data should be written inline instead, which is the
+        # case unless the images are flate encoded and either the data
+        # is used more than once in the document or SHARED is true.
+        if self.image_encoding != 'flate':
+            return None
+        if self.recording_form:
+            raise NotShareable
+        key = id(image)
+        name = self.resource_names.get(key)
+        if name is None:
+            if not shared and self.resource_count.get(key, 0) < 2:
+                return None
+            name = 'skimgdata%d' % len(self.resource_names)
+            self.file.write('/%s skimgdef\n' % name)
+            length = self.write_image_data(image, 1)
+            self.define_resource('image', name, ascii85_length(length))
+            self.resource_names[key] = name
+        else:
+            self.reference_resource('image', name)
+        return name
+
+    def write_image_data(self, image, flate):
+        # Write the pixels of IMAGE ASCII85 encoded and terminated by
+        # the EOD marker and a newline. If FLATE is true, compress them with zlib
+        # first. RGBA images are written as RGB. The image is converted
+        # and compressed in strips to keep the memory usage low for
+        # large images. Return the number of bytes before the ASCII85
+        # encoding.
+        im = image.Image()
+        if im.mode == 'L':
+            mode = 'L'
+        else:
+            mode = 'RGB'
+        width, height = im.size
+        rows = max(1, 65536 / (width * len(mode)))
+        if flate:
+            compressor = zlib.compressobj(9)
+        encoder = streamfilter.ASCII85Encode(self.file)
+        length = 0
+        for y in range(0, height, rows):
+            strip = im.crop((0, y, width, min(y + rows, height)))
+            if strip.mode != mode:
+                strip = strip.convert(mode)
+            try:
+                data = strip.tobytes()
+            except AttributeError:
+                # older PIL versions
+                data = strip.tostring()
+            if flate:
+                data = compressor.compress(data)
+            encoder.write(data)
+            length = length + len(data)
+        if flate:
+            data = compressor.flush()
+            encoder.write(data)
+            length = length + len(data)
+        encoder.close()
+        return length
 
 
     def DrawEps(self, data, trafo):
+        if self.recording_form:
+            raise NotShareable
         write = self.file.write
+        name = self.eps_resource(data)
         write('%g %g %g %g ' % (data.Start() + data.Size()))
         write('[%g %g %g %g %g %g]\n' % trafo.coeff())
         write('skeps\n')
+        if name:
+            write('/%s skepsexec\n' % name)
+        else:
+            self.write_eps_file(data)
+        write('skepsend\n')
+
+    def write_eps_file(self, data):
+        # Write the EPS file DATA with its DSC comments. Return the
+        # number of bytes written.
+        file = CountingFile(self.file)
+        write = file.write
         write('%%%%BeginDocument: %s\n' % data.Filename())
         if self.loaded_eps_files.has_key(id(data)):
             write(self.loaded_eps_contents)
         else:
-            data.WriteLines(self.file)
+            data.WriteLines(file)
         write('\n%%EndDocument\n')
-        write('skepsend\n')
+        return file.count
+
+    def eps_resource(self, data):
+        # Like image_resource but for the EPS file DATA (an EpsData
+        # instance). EPS files used more than once are put into a
+        # reusable file if Level 3 output is allowed.
+        key = id(data)
+        if self.language_level < 3 or self.resource_count.get(key, 0) < 2:
+            return None
+        name = self.resource_names.get(key)
+        if name is None:
+            name = 'skepsdata%d' % len(self.resource_names)
+            self.file.write('/%s skepsdef\n' % name)
+            length = self.write_eps_file(data)
+            self.define_resource('eps', name, length)
+            self.file.write('%%EndSketchEPS\n')
+            self.resource_names[key] = name
+        else:
+            self.reference_resource('eps', name)
+        return name
+
+    def DrawShared(self, object, rect = None):
+        # Draw OBJECT, the original of clones. With Level 2 output its
+        # code is written as a procedure the first time it's drawn and
+        # the procedure is called afterwards.
+        if self.language_level < 2:
+            object.DrawShape(self, rect)
+            return
+        key = id(object)
+        name = self.resource_names.get(key)
+        if name is None and not self.recording_form:
+            name = self.define_form(object, rect)
+            self.resource_names[key] = name
+        elif name:
+            self.reference_resource('form', name)
+        if name:
+            self.file.write('%s\n' % name)
+            # the procedure changes the graphics state
+            self.init_props()
+        else:
+            object.DrawShape(self, rect)
+
+    def define_form(self, object, rect):
+        # Write the code that draws OBJECT as a procedure and return its
+        # name. Return 0 if the code can't be put into a procedure, i.e.
+        # if it contains images or EPS files or is too long.
+        file = self.file
+        names = self.resource_names.copy()
+        stats = self.resource_stats.copy()
+        self.file = StringIO()
+        self.recording_form = 1
+        self.init_props()
+        try:
+            try:
+                object.DrawShape(self, rect)
+                code = self.file.getvalue()
+            except NotShareable:
+                code = None
+        finally:
+            self.file = file
+            self.recording_form = 0
+            self.init_props()
+        if code is None or len(split(code)) > max_form_tokens:
+            # forget the gradients defined by the discarded code
+            self.resource_names = names
+            self.resource_stats = stats
+            return 0
+        name = 'skform%d' % len(self.resource_names)
+        file.write('/%s {\n%s} def\n' % (name, code))
+        self.define_resource('form', name, len(code))
+        return name
 
     def DrawGrid(self, orig_x, orig_y, xwidth, ywidth, rect):
         pass
@@ -622,16 +891,34 @@ class PostScriptDevice(CommonDevice):
     def write_gradient(self, gradient):
         # self.current_color is implicitly reset because gradients are
         # nested in a PushClip/PopClip, so we don't have to update that
-        write = self.file.write
+        #
+        # A gradient used by more than one object is defined under a
+        # name when it's used for the first time, so that the other
+        # objects can simply refer to it. All others are written inline.
         samples = gradient.Sample(self.gradient_steps)
-        write('%d gradient\n' % len(samples))
-        last = None
-        for color in samples:
-            if color != last:
-                r, g, b = last = color
-                write('%g %g %g $\n' % (round(r, 3), round(g, 3), round(b, 3)))
-            else:
-                write('!\n')
+        key = tuple(samples)
+        name = self.resource_names.get(key)
+        if name:
+            self.reference_resource('gradient', name)
+        else:
+            code = ['%d gradient\n' % len(samples)]
+            last = None
+            for color in samples:
+                if color != last:
+                    r, g, b = last = color
+                    code.append('%g %g %g $\n'
+                                % (round(r, 3), round(g, 3), round(b, 3)))
+                else:
+                    code.append('!\n')
+            code = join(code, '')
+            if self.resource_count.get(key, 0) < 2:
+                self.file.write(code)
+                return
+            name = 'skgrad%d' % len(self.resource_names)
+            self.file.write('/%s %sdef\n' % (name, code))
+            self.define_resource('gradient', name, len(code))
+            self.resource_names[key] = name
+        self.file.write('%s\n' % name)
 
     has_axial_gradient = 1
     def AxialGradient(self, gradient, p0, p1):
@@ -659,6 +946,17 @@ class PostScriptDevice(CommonDevice):
             mode = 'RGB'
         else:
             mode = image.mode
+        if self.recording_form:
+            raise NotShareable
+        if self.image_encoding == 'flate':
+            # With Level 3 the tile is read from a reusable file, so
+            # there's no size limit and the data is written only once
+            # no matter how often the tile is used.
+            name = self.image_resource(image, shared = 1)
+            self.file.write('%d %d %d [%g %g %g %g %g %g] /%s tileimage3\n'
+                            % ((width, height, len(mode)) + trafo.coeff()
+                               + (name,)))
+            return
         length = width * height * len(mode)
         if length > 65536:
             # the tile image is too large to fit into a PostScript
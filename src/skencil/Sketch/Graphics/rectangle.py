@@ -31,10 +31,8 @@ from Sketch import _, SingularMatrix, PointsToRect, Trafo, Polar,\
      RoundedRectanglePath, RectanglePath, NullUndo
 from Sketch.warn import warn, INTERNAL
 
-import Sketch.UI.skpixmaps
-pixmaps = Sketch.UI.skpixmaps.PixmapTk
-
-from base import Primitive, RectangularPrimitive, RectangularCreator, Editor
+from base import Primitive, RectangularPrimitive, RectangularCreator, Editor, \
+     define_lazy_attrs
 from bezier import PolyBezier
 import handle
 from properties import DefaultGraphicsProperties
@@ -45,18 +43,23 @@ class Rectangle(RectangularPrimitive):
     is_curve = 1
     is_clip = 1
     has_edit_mode = 1
+    has_bulk_transform = 1
 
     _lazy_attrs = RectangularPrimitive._lazy_attrs.copy()
     _lazy_attrs['rect_path'] = 'update_path'
 
+    # Most rectangles are not rounded. The radii are only stored in the
+    # instance if they're not 0 to keep the instance dictionary small.
+    radius1 = radius2 = 0
+
     def __init__(self, trafo = None, radius1 = 0, radius2 = 0,
                  properties = None, duplicate = None):
         RectangularPrimitive.__init__(self, trafo, properties = properties,
                                       duplicate = duplicate)
         if duplicate is not None:
-            self.radius1 = duplicate.radius1
-            self.radius2 = duplicate.radius2
-        else:
+            radius1 = duplicate.radius1
+            radius2 = duplicate.radius2
+        if radius1 or radius2:
             self.radius1 = radius1
             self.radius2 = radius2
 
@@ -197,6 +200,8 @@ class Rectangle(RectangularPrimitive):
     def Editor(self):
         return RectangleEditor(self)
 
+define_lazy_attrs(Rectangle)
+
 
 
 class RectangleCreator(RectangularCreator):
@@ -29,19 +29,137 @@ import time
 
 from Sketch.Lib.util import flatten
 
-from Sketch.UI.skpixmaps import pixmaps
 from Sketch.warn import pdebug, warn, INTERNAL
 from Sketch import const
 from Sketch.const import SelectSet
 
 from Sketch import _, Point, Polar, Rect, UnionRects, RectType, Identity, \
-     Trafo, TrafoType, Rotation, CreateListUndo, NullUndo
+     Trafo, TrafoType, Rotation, Translation, \
+     CreateListUndo, NullUndo, Undo, RegisterUndoCoalescer, _sketch
 
 import handle
-from base import SelectAndDrag, Bounded
+from base import SelectAndDrag, Bounded, define_lazy_attrs
 import selinfo
 
 
+#
+# Bulk transformations
+#
+# Transforming a large selection object by object creates undo
+# information for every object, for bezier objects even a copy of all
+# their paths. Objects with has_bulk_transform set (bezier objects,
+# rectangles, ellipses and images) whose properties are not affected by
+# the transformation are therefore transformed together by
+# transform_objects: the paths of all bezier objects in one call of
+# _sketch.transform_paths and the trafos of the other objects directly.
+# The undo information is one list with the old state of each object:
+# the coordinates of its paths as returned by coords() for bezier
+# objects and the trafo for the others. Groups are descended into.
+#
+
+def object_state(object):
+    if object.is_Bezier:
+        return tuple(map(lambda path: path.coords(), object.paths))
+    return object.trafo
+
+def objects_changed(objects):
+    # Like calling _changed for each of OBJECTS, but every parent is
+    # brought up to date only once.
+    parents = {}
+    for object in objects:
+        object.del_lazy_attrs()
+        object.Issue(const.CHANGED, object)
+        parent = object.parent
+        if parent is not None:
+            children = parents.get(id(parent))
+            if children is None:
+                parents[id(parent)] = children = (parent, [])
+            children[1].append(object)
+    for parent, children in parents.values():
+        parent.ChildrenChanged(children)
+
+def set_objects_state(objects, states):
+    undo = (set_objects_state, objects, map(object_state, objects))
+    for object, state in map(None, objects, states):
+        if object.is_Bezier:
+            for path, coords in map(None, object.paths, state):
+                path.SetCoords(coords)
+        else:
+            object.trafo = state
+    objects_changed(objects)
+    return undo
+
+def _coalesce_set_objects_state(older, newer):
+    # undoing both restores the state saved by the older edit
+    if older[1] == newer[1]:
+        return older
+    return None
+
+RegisterUndoCoalescer(set_objects_state, _coalesce_set_objects_state)
+
+def transform_objects(objects, trafo):
+    # Apply TRAFO to OBJECTS, a list of non-compound objects with
+    # has_bulk_transform set. Return undo info.
+    undo = (set_objects_state, objects, map(object_state, objects))
+    paths = []
+    rectangular = []
+    for object in objects:
+        if object.is_Bezier:
+            paths.append(object.paths)
+        else:
+            rectangular.append(object)
+    _sketch.transform_paths(paths, trafo)
+    for object in rectangular:
+        object.trafo = trafo(object.trafo)
+    objects_changed(objects)
+    return undo
+
+def bulk_transform(objects, trafo, offset = None):
+    # Transform OBJECTS with TRAFO and return undo info. If OFFSET is
+    # given, TRAFO must be the corresponding translation, and objects
+    # that can't be transformed in bulk are translated with their
+    # Translate method. Translations never affect the properties.
+    groups = []
+    bulk = []
+    single = []
+    objects = list(objects)
+    while objects:
+        object = objects.pop()
+        if not object.has_bulk_transform:
+            single.append(object)
+        elif object.is_Compound:
+            groups.append(object)
+            objects.extend(object.GetObjects())
+        elif (offset is not None or not object.has_properties
+              or not object.properties.NeedsTransform()):
+            bulk.append(object)
+        else:
+            single.append(object)
+    undo = []
+    try:
+        # as in Compound.Transform, the groups issue their changed
+        # message only once, after all their children have changed.
+        for group in groups:
+            undo.append(group.begin_change_children())
+        if bulk:
+            undo.append(transform_objects(bulk, trafo))
+        for object in single:
+            if offset is not None:
+                undo.append(object.Translate(offset))
+            else:
+                undo.append(object.Transform(trafo))
+        # the groups were collected parents first
+        groups.reverse()
+        for group in groups:
+            undo.append(group.end_change_children())
+    except:
+        Undo(CreateListUndo(undo))
+        raise
+    if len(undo) == 1:
+        return undo[0]
+    return CreateListUndo(undo)
+
+
 class SelRectBase(SelectAndDrag, Bounded):
 
     #
@@ -393,6 +511,18 @@ class Selection(Bounded):
             return CreateListUndo(undoinfo)
         return undoinfo
 
+    def TransformObjects(self, trafo):
+        # Like ForAllUndo2('Transform', trafo) but with compact undo
+        # info for large selections.
+        undo = bulk_transform(self.GetObjects(), trafo)
+        self.del_lazy_attrs()
+        return undo
+
+    def TranslateObjects(self, offset):
+        undo = bulk_transform(self.GetObjects(), Translation(offset), offset)
+        self.del_lazy_attrs()
+        return undo
+
     def __len__(self):
         return len(self.objects)
 
@@ -514,6 +644,8 @@ class Selection(Bounded):
 
     drag_mask = SelectAndDrag.drag_mask
 
+define_lazy_attrs(Selection)
+
 
 
 class SizeRectangle(SelectionRectangle):
@@ -659,11 +791,10 @@ class SizeSelection(Selection):
             return None, None
         t = time.clock()
         if type(trafo) == TrafoType:
-            #undo = self.ForAllUndo(lambda o, t = trafo: o.Transform(t))
-            undo = self.ForAllUndo2('Transform', trafo)
+            undo = self.TransformObjects(trafo)
         else:
             # trafo is point representing a translation
-            undo = self.ForAllUndo2('Translate', trafo)
+            undo = self.TranslateObjects(trafo)
         #print 'transform/translate', time.clock() - t
         self.del_lazy_attrs()
         return undo_text, undo
@@ -742,6 +873,7 @@ class TrafoRectangle(SelRectBase):
     def DrawDragged(self, device, partially):
         sel = self.selection
         if sel == self.selCenter:
+            from Sketch.UI.skpixmaps import pixmaps
             device.DrawPixmapHandle(self.drag_cur, pixmaps.Center)
         else:
             trafo = self.trafo
@@ -867,6 +999,7 @@ class TrafoRectangle(SelRectBase):
             self.selection = self.handle_idx_to_sel[handle]
 
     def GetHandles(self):
+        from Sketch.UI.skpixmaps import pixmaps
         sx = self.start.x
         sy = self.start.y
         ex = self.end.x
@@ -915,9 +1048,7 @@ class TrafoSelection(Selection):
             return None, None
         if trafo is not None:
             t = time.clock()
-            #undo = self.ForAllUndo(lambda o, t = trafo: o.Transform(t))
-            undo = self.ForAllUndo2('Transform', trafo)
-            self.del_lazy_attrs()
+            undo = self.TransformObjects(trafo)
             #print 'transform/translate', time.clock() - t
             return undo_text, undo
         return '', None
@@ -0,0 +1,161 @@
+# Sketch - A Python-based interactive drawing program
+# Copyright (C) 2010 by sK1 Team (http://sk1project.org)
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Library General Public
+# License as published by the Free Software Foundation; either
+# version 2 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.	See the GNU
+# Library General Public License for more details.
+#
+# You should have received a copy of the GNU Library General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307	USA
+
+#
+# Class RectIndex
+#
+# A uniform grid over document coordinates that maps grid cells to the
+# objects whose bounding rects intersect them. Compound objects with
+# many children (see EditableCompound in compound.py) use it to find
+# the children that may overlap a given rectangle without testing
+# every child's bounding_rect.
+#
+# The index only answers the question which objects *may* overlap a
+# rectangle. Callers still have to test the actual bounding_rect of the
+# candidates and they have to restore the stacking order themselves.
+#
+# Objects with an empty or infinite bounding rect and objects that
+# would cover too many cells are kept in a separate `large' dictionary
+# which is included in the result of every query.
+#
+
+from math import floor, sqrt
+
+from Sketch import EmptyRect, InfinityRect
+
+
+def is_unbounded(rect):
+    # Return true if RECT can't be put into the grid in a meaningful
+    # way.
+    return rect is EmptyRect or rect is InfinityRect \
+           or rect == EmptyRect or rect == InfinityRect
+
+
+class RectIndex:
+
+    # objects covering more cells than this are stored in self.large
+    max_object_cells = 64
+
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size)
+        self.cells = {}		# (x, y) -> {id(obj): obj}
+        self.large = {}		# id(obj) -> obj
+        self.keys = {}		# id(obj) -> list of cells or None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def cell_range(self, rect):
+        size = self.cell_size
+        return (int(floor(rect.left / size)), int(floor(rect.bottom / size)),
+                int(floor(rect.right / size)), int(floor(rect.top / size)))
+
+    def Insert(self, obj):
+        key = id(obj)
+        if self.keys.has_key(key):
+            self.Remove(obj)
+        rect = obj.bounding_rect
+        if is_unbounded(rect):
+            self.large[key] = obj
+            self.keys[key] = None
+            return
+        x0, y0, x1, y1 = self.cell_range(rect)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > self.max_object_cells:
+            self.large[key] = obj
+            self.keys[key] = None
+            return
+        cells = self.cells
+        keys = []
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                cell = cells.get((x, y))
+                if cell is None:
+                    cell = cells[(x, y)] = {}
+                cell[key] = obj
+                keys.append((x, y))
+        self.keys[key] = keys
+
+    def Remove(self, obj):
+        key = id(obj)
+        try:
+            keys = self.keys[key]
+        except KeyError:
+            return
+        del self.keys[key]
+        if keys is None:
+            del self.large[key]
+        else:
+            cells = self.cells
+            for cell_key in keys:
+                cell = cells[cell_key]
+                del cell[key]
+                if not cell:
+                    del cells[cell_key]
+
+    Update = Insert
+
+    def Query(self, rect):
+        # Return a dictionary mapping id(obj) to obj for all objects
+        # whose bounding rect may overlap RECT. Return None if RECT
+        # covers so many cells that testing all objects directly is
+        # cheaper.
+        if is_unbounded(rect):
+            return None
+        x0, y0, x1, y1 = self.cell_range(rect)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.keys):
+            return None
+        result = self.large.copy()
+        cells = self.cells
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                cell = cells.get((x, y))
+                if cell:
+                    result.update(cell)
+        return result
+
+
+def estimate_cell_size(objects):
+    # Choose a cell size for a RectIndex for OBJECTS. The median extent
+    # of the objects is used so that typical objects occupy only a few
+    # cells, but the cells are never smaller than the average spacing
+    # of the objects to keep the number of cells reasonable for sparse
+    # drawings of tiny objects.
+    extents = []
+    left = bottom = 1e100
+    right = top = -1e100
+    for obj in objects:
+        rect = obj.bounding_rect
+        if is_unbounded(rect):
+            continue
+        extents.append(max(rect.right - rect.left, rect.top - rect.bottom))
+        left = min(left, rect.left)
+        bottom = min(bottom, rect.bottom)
+        right = max(right, rect.right)
+        top = max(top, rect.top)
+    if not extents:
+        return 1.0
+    extents.sort()
+    median = extents[len(extents) / 2]
+    spacing = sqrt((right - left) * (top - bottom) / len(extents))
+    return max(median, spacing, 1e-3)
+
+
+def CreateRectIndex(objects):
+    index = RectIndex(estimate_cell_size(objects))
+    for obj in objects:
+        index.Insert(obj)
+    return index
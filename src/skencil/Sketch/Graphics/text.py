@@ -81,12 +81,13 @@ from math import sin, cos, atan2, hypot, pi, fmod, floor
 from Sketch import _, Rect, UnionRects, EmptyRect, NullPoint, Polar, \
      IdentityMatrix, SingularMatrix, Identity, Trafo, Scale, Translation, \
      Rotation, NullUndo, CreateMultiUndo, RegisterCommands
-from Sketch.UI.command import AddCmd
+from Sketch.command import AddCmd
 from Sketch import const, config
 
 import handle
 import selinfo
-from base import Primitive, RectangularPrimitive, Creator, Editor
+from base import Primitive, RectangularPrimitive, Creator, Editor, \
+     define_lazy_attrs
 from compound import Compound
 from group import Group
 from bezier import PolyBezier, CombineBeziers
@@ -270,20 +271,26 @@ class SimpleText(CommonText, RectangularPrimitive):
     _lazy_attrs = RectangularPrimitive._lazy_attrs.copy()
     _lazy_attrs['atrafo'] = 'update_atrafo'
 
+    # the alignment is only stored in the instance if it differs from
+    # the default
+    halign = ALIGN_LEFT
+    valign = ALIGN_BASE
+
     def __init__(self, trafo = None, text = '', halign = ALIGN_LEFT,
                  valign = ALIGN_BASE, properties = None, duplicate = None):
         CommonText.__init__(self, text, duplicate)
         RectangularPrimitive.__init__(self, trafo, properties = properties,
                                       duplicate = duplicate)
         if duplicate != None:
-            self.halign = duplicate.halign
-            self.valign = duplicate.valign
+            halign = duplicate.halign
+            valign = duplicate.valign
             self.atrafo = duplicate.atrafo
-        else:
+        elif properties is None:
+            self.properties = PropertyStack(base=FactoryTextStyle())
+        if halign != ALIGN_LEFT:
             self.halign = halign
+        if valign != ALIGN_BASE:
             self.valign = valign
-            if properties is None:
-                self.properties = PropertyStack(base=FactoryTextStyle())
         self.cache = {}
 
     def Disconnect(self):
@@ -427,12 +434,10 @@ class SimpleText(CommonText, RectangularPrimitive):
             base_trafo = self.trafo(self.atrafo)
             base_trafo = base_trafo(Scale(self.properties.font_size))
             pos = self.properties.font.TypesetText(self.text)
-            for i in range(len(self.text)):
-                outline = self.properties.font.GetOutline(self.text[i])
-                trafo = base_trafo(Translation(pos[i]))
-                for path in outline:
-                    path.Transform(trafo)
-                    paths.append(path)
+            trafos = map(base_trafo, map(Translation, pos))
+            for outline in self.properties.font.GetOutlines(self.text,
+                                                            trafos):
+                paths.extend(outline)
         return tuple(paths)            
 
     def Editor(self):
@@ -442,6 +447,7 @@ class SimpleText(CommonText, RectangularPrimitive):
                         'AlignTop', 'AlignVCenter', 'AlignBase', 'AlignBottom')
 
 RegisterCommands(SimpleText)
+define_lazy_attrs(SimpleText)
 
 
 class SimpleTextCreator(Creator):
@@ -736,6 +742,8 @@ class InternalPathText(CommonText, Primitive):
     def Editor(self):
         return InternalPathTextEditor(self)
 
+define_lazy_attrs(InternalPathText)
+
 class InternalPathTextEditor(CommonTextEditor):
 
     EditedClass = InternalPathText
@@ -811,7 +819,6 @@ class InternalPathTextEditor(CommonTextEditor):
             if char not in '\n\r':
                 device.DrawComplexText(char, trafos[idx], font, font_size)
         device.EndComplexText()
-        device.ResetFontCache()
 
     def ButtonUp(self, p, button, state):
         CommonTextEditor.ButtonUp(self, p, button, state)
@@ -859,6 +866,10 @@ class PathText(Compound):
         if self.document is not None:
             self.document.AddClearRect(self.bounding_rect)
 
+    def ChildrenChanged(self, children):
+        for child in children:
+            self.ChildChanged(child)
+
     def load_AppendObject(self, object):
         Compound.load_AppendObject(self, object)
         if len(self.objects) == 2:
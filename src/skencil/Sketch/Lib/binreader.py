@@ -0,0 +1,146 @@
+# Sketch - A Python-based interactive drawing program
+# Copyright (C) 2010 by sK1 Team (http://sk1project.org)
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Library General Public
+# License as published by the Free Software Foundation; either
+# version 2 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.	See the GNU
+# Library General Public License for more details.
+#
+# You should have received a copy of the GNU Library General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307	USA
+
+#
+# Class BinaryReader
+#
+# A reader for the binary import filters (CGM, WMF, CMX). The whole
+# file is accessed through a memory map if it's a real file, or read
+# into a string otherwise (e.g. for decompressed files). Values are
+# unpacked directly from the map with unpack_from, so no temporary
+# strings are created, and the struct.Struct objects for the formats
+# are compiled only once.
+#
+# A BinaryReader also has the read, seek and tell methods of a file, so
+# that code which still treats it as a file keeps working.
+#
+# For the point lists of polylines and polygons, points() decodes all
+# coordinates with one unpack call and transforms them with map
+# instead of reading and transforming them one by one.
+#
+
+import mmap, struct
+
+from Sketch import CreatePath
+
+# compiled formats, shared by all readers
+structs = {}
+
+def get_struct(format):
+    # Return the struct.Struct object for FORMAT
+    compiled = structs.get(format)
+    if compiled is None:
+        compiled = structs[format] = struct.Struct(format)
+    return compiled
+
+def transform_coords(trafo, coords):
+    # Return a list of the points made from the flat sequence of x and y
+    # values COORDS transformed with TRAFO
+    return map(trafo, coords[0::2], coords[1::2])
+
+
+class BinaryReader:
+
+    def __init__(self, file, byte_order = '<'):
+        # BYTE_ORDER is the struct byte order character used by array()
+        # and points(). Formats passed to unpack have to specify the
+        # byte order themselves.
+        self.byte_order = byte_order
+        self.map = None
+        pos = file.tell()
+        try:
+            fileno = file.fileno()
+        except AttributeError:
+            fileno = None
+        if fileno is not None:
+            try:
+                self.map = mmap.mmap(fileno, 0, access = mmap.ACCESS_READ)
+            except (mmap.error, EnvironmentError, ValueError):
+                # e.g. an empty file or a pipe
+                pass
+        if self.map is not None:
+            self.data = self.map
+        else:
+            file.seek(0)
+            self.data = file.read()
+        self.size = len(self.data)
+        self.pos = pos
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.data = ''
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, pos, whence = 0):
+        if whence == 1:
+            pos = self.pos + pos
+        elif whence == 2:
+            pos = self.size + pos
+        self.pos = max(0, pos)
+
+    def read(self, size = -1):
+        if size < 0:
+            end = self.size
+        else:
+            end = min(self.pos + size, self.size)
+        data = self.data[self.pos:end]
+        self.pos = max(self.pos, end)
+        return data
+
+    def skip(self, count):
+        self.pos = self.pos + count
+
+    def unpack(self, format):
+        # Unpack FORMAT at the current position and advance past it
+        compiled = structs.get(format)
+        if compiled is None:
+            compiled = get_struct(format)
+        result = compiled.unpack_from(self.data, self.pos)
+        self.pos = self.pos + compiled.size
+        return result
+
+    def array(self, code, count):
+        # Unpack COUNT records of the struct format CODE (e.g. 'h' or
+        # 'hhh') into one flat tuple. The formats are not cached as the
+        # counts vary.
+        if len(code) == 1:
+            format = '%s%d%s' % (self.byte_order, count, code)
+        else:
+            format = self.byte_order + code * count
+        result = struct.unpack_from(format, self.data, self.pos)
+        self.pos = self.pos + struct.calcsize(format)
+        return result
+
+    def points(self, code, count, trafo):
+        # Read COUNT points whose coordinates are of the struct type CODE
+        # as x, y pairs and return them transformed with TRAFO
+        return transform_coords(trafo, self.array(code, 2 * count))
+
+    def path(self, code, count, trafo):
+        # Read COUNT points like points() and return them as a path of
+        # lines. The untransformed coordinates are appended directly and
+        # the whole path is transformed at once, which avoids creating
+        # a point object for every node.
+        coords = self.array(code, 2 * count)
+        path = CreatePath()
+        map(path.AppendLine, coords[0::2], coords[1::2])
+        path.Transform(trafo)
+        return path
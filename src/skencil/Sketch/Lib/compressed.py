@@ -0,0 +1,247 @@
+# Sketch - A Python-based interactive drawing program
+# Copyright (C) 2010 by sK1 Team (http://sk1project.org)
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Library General Public
+# License as published by the Free Software Foundation; either
+# version 2 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.	See the GNU
+# Library General Public License for more details.
+#
+# You should have received a copy of the GNU Library General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307	USA
+
+#
+# Reading and writing gzip and bzip2 compressed files in-process.
+#
+# The compression methods are named like in document.meta.compressed,
+# i.e. 'gzip' and 'bzip2'.
+#
+# DecompressedFile decompresses a file while it's read, so text based
+# import filters see the data as a stream without an external gzip or
+# bzip2 process. Filters that need random access, like the CMX loader,
+# may seek nevertheless: moving forward just skips data, but the first
+# seek backwards or relative to the end decompresses the whole file
+# into a spooled temporary file (kept in memory if it's small enough)
+# and all further operations use that.
+#
+# DecompressedFile is not a real file object, though, and some import
+# filters pass their file to the C stream filters of streamfilter, which
+# only accept real files (e.g. the AI loader). open_for_loading
+# therefore only streams the formats that can read from it and
+# decompresses all others into a temporary file.
+#
+
+import os, string, zlib, bz2, gzip, tempfile
+
+# The number of compressed bytes read at a time
+buffer_size = 256 * 1024
+
+# Decompressed files up to this size are spooled in memory, larger
+# ones on disk
+spool_size = 4 * 1024 * 1024
+
+# The magic numbers at the start of a compressed stream
+magic = {'gzip': '\037\213',
+         'bzip2': 'BZh'}
+
+extensions = {'.gz': 'gzip',
+              '.bz2': 'bzip2'}
+
+
+def guess_compression(filename):
+    # Return the compression method suggested by the extension of
+    # FILENAME or '' if it's not a compressed file
+    return extensions.get(os.path.splitext(filename)[1], '')
+
+def strip_extension(filename):
+    # Return FILENAME without the extension of a compressed file, e.g.
+    # 'drawing.sk' for 'drawing.sk.gz'
+    basename, ext = os.path.splitext(filename)
+    if extensions.has_key(ext):
+        return basename
+    return filename
+
+def new_decompressor(method):
+    if method == 'gzip':
+        # 16 + MAX_WBITS tells zlib to expect the gzip header and trailer
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif method == 'bzip2':
+        return bz2.BZ2Decompressor()
+    raise ValueError('unknown compression method %s' % `method`)
+
+
+class DecompressedFile:
+
+    spooled = None
+
+    def __init__(self, file, method, close_file = 1):
+        # FILE is a binary file object for the compressed data. It must
+        # support seek(0) if the data is to be read randomly. If
+        # CLOSE_FILE is false, close() leaves FILE open.
+        self.file = file
+        self.close_file = close_file
+        self.method = method
+        self.decompressor = new_decompressor(method)
+        self.buffer = ''	# decompressed data
+        self.offset = 0		# the first unread byte of buffer
+        self.start = 0		# the position of buffer[0] in the file
+        self.eof = 0
+
+    def decompress(self, data):
+        # Return the decompressed data of DATA. A file may consist of
+        # several compressed streams (e.g. made with cat a.gz b.gz),
+        # which are decompressed one after the other. Trailing garbage
+        # is ignored, like gzip does.
+        result = []
+        while data:
+            try:
+                result.append(self.decompressor.decompress(data))
+            except EOFError:
+                # a finished bz2 decompressor doesn't keep the data
+                # after the end of its stream
+                unused = data
+            except zlib.error, value:
+                raise IOError(value)
+            else:
+                unused = self.decompressor.unused_data
+            if unused[:len(magic[self.method])] != magic[self.method]:
+                break
+            self.decompressor = new_decompressor(self.method)
+            data = unused
+        return string.join(result, '')
+
+    def fill(self):
+        # Append decompressed data to the unread part of the buffer.
+        # Return false at the end of the file.
+        while not self.eof:
+            data = self.file.read(buffer_size)
+            if not data:
+                self.eof = 1
+                break
+            data = self.decompress(data)
+            if data:
+                self.start = self.start + self.offset
+                self.buffer = self.buffer[self.offset:] + data
+                self.offset = 0
+                return 1
+        return 0
+
+    def read(self, size = -1):
+        if size < 0:
+            while self.fill():
+                pass
+            size = len(self.buffer) - self.offset
+        else:
+            while len(self.buffer) - self.offset < size and self.fill():
+                pass
+        data = self.buffer[self.offset:self.offset + size]
+        self.offset = self.offset + len(data)
+        return data
+
+    def readline(self, find = string.find):
+        # This is called for every line of text based formats, so the
+        # common case of a complete line in the buffer comes first.
+        end = find(self.buffer, '\n', self.offset) + 1
+        if not end:
+            start = len(self.buffer) - self.offset
+            while self.fill():
+                end = find(self.buffer, '\n', start) + 1
+                if end:
+                    break
+                start = len(self.buffer)
+            else:
+                end = len(self.buffer)
+        line = self.buffer[self.offset:end]
+        self.offset = end
+        return line
+
+    def readlines(self):
+        return list(iter(self.readline, ''))
+
+    def __iter__(self):
+        return iter(self.readline, '')
+
+    def tell(self):
+        return self.start + self.offset
+
+    def seek(self, pos, whence = 0):
+        if whence == 1:
+            pos = self.tell() + pos
+        if whence == 0 and self.start <= pos < self.tell():
+            # still in the buffer, e.g. after peeking at the first line
+            self.offset = pos - self.start
+            return
+        if whence == 2 or pos < self.tell():
+            self.spool()
+            self.seek(pos, whence)
+            return
+        while self.tell() < pos:
+            if not self.read(min(pos - self.tell(), buffer_size)):
+                break
+
+    def spool(self):
+        # Decompress the whole file into a seekable temporary file and
+        # use its methods from now on
+        pos = self.tell()
+        spool = tempfile.SpooledTemporaryFile(spool_size)
+        self.file.seek(0)
+        self.decompressor = new_decompressor(self.method)
+        self.buffer = ''
+        self.offset = 0
+        self.eof = 0
+        while self.fill():
+            spool.write(self.buffer)
+            self.buffer = ''
+        spool.seek(pos)
+        self.read = spool.read
+        self.readline = spool.readline
+        self.readlines = spool.readlines
+        self.tell = spool.tell
+        self.seek = spool.seek
+        self.spooled = spool
+
+    def close(self):
+        if self.close_file:
+            self.file.close()
+        if self.spooled is not None:
+            self.spooled.close()
+
+
+def open_for_loading(file, method, streamable):
+    # Return a file object with the decompressed data of the compressed
+    # file FILE for load_drawing_from_file. STREAMABLE is called with
+    # the first line of the data and should return true if the import
+    # filter for it can read from a DecompressedFile. Otherwise the data
+    # is decompressed into a real temporary file. Closing the returned
+    # object doesn't close FILE.
+    stream = DecompressedFile(file, method, close_file = 0)
+    line = stream.readline()
+    stream.seek(0)
+    if streamable(line):
+        return stream
+    temp = tempfile.TemporaryFile()
+    while 1:
+        data = stream.read(buffer_size)
+        if not data:
+            break
+        temp.write(data)
+    temp.seek(0)
+    return temp
+
+
+def open_compressed(filename, method, mode = 'r'):
+    # Open the compressed file FILENAME for reading (MODE 'r') or
+    # writing (MODE 'w')
+    if mode[:1] == 'r':
+        new_decompressor(method)
+        return DecompressedFile(open(filename, 'rb'), method)
+    elif method == 'gzip':
+        return gzip.GzipFile(filename, 'wb', 9)
+    elif method == 'bzip2':
+        return bz2.BZ2File(filename, 'w', buffer_size, 9)
+    raise ValueError('unknown compression method %s' % `method`)
@@ -0,0 +1,136 @@
+# Sketch - A Python-based interactive drawing program
+# Copyright (C) 2010 by sK1 Team (http://sk1project.org)
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Library General Public
+# License as published by the Free Software Foundation; either
+# version 2 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.	See the GNU
+# Library General Public License for more details.
+#
+# You should have received a copy of the GNU Library General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307	USA
+
+#
+# Class DiskCache
+#
+# A persistent cache for data derived from files, e.g. the parsed
+# contents of font metric files. The entries are keyed by the name of
+# the file they were derived from and are only valid as long as the
+# modification time and the size of that file don't change.
+#
+# The cache is stored with marshal in a single file, so the values may
+# only consist of the builtin types marshal supports (None, numbers,
+# strings, tuples, lists and dictionaries). Strings that were interned
+# when the cache was saved are interned again when it's loaded.
+#
+# The cache file is only an optimization: if it can't be read, is
+# corrupt or was written by an incompatible version, the cache is
+# empty. Errors while writing it are ignored as well.
+#
+
+import os, marshal
+
+from Sketch.warn import pdebug
+from Sketch.Lib.util import create_directory
+
+# Change this when the format of the file itself changes. Users of the
+# cache pass a version of their own for the format of the values.
+cache_format = 1
+
+
+def file_stamp(filename):
+    # Return a value that changes when the file FILENAME changes, or
+    # None if the file doesn't exist.
+    try:
+        st = os.stat(filename)
+    except os.error:
+        return None
+    return (int(st.st_mtime), st.st_size)
+
+
+class DiskCache:
+
+    def __init__(self, filename, version):
+        self.filename = filename
+        self.version = version
+        self.entries = None	# filename -> (stamp, value)
+        self.changed = 0
+
+    def load(self):
+        self.entries = {}
+        try:
+            file = open(self.filename, 'rb')
+            try:
+                format, version, entries = marshal.load(file)
+            finally:
+                file.close()
+        except (IOError, EOFError, ValueError, TypeError):
+            return
+        if (format == cache_format and version == self.version
+            and type(entries) == type({})):
+            self.entries = entries
+        else:
+            pdebug('cache', '%s: ignoring incompatible cache', self.filename)
+
+    def Get(self, filename):
+        # Return the value stored for FILENAME or None if there is none
+        # or if the file has changed since.
+        if self.entries is None:
+            self.load()
+        entry = self.entries.get(filename)
+        if entry is not None and entry[0] == file_stamp(filename):
+            return entry[1]
+        return None
+
+    def Set(self, filename, value):
+        # Store VALUE for FILENAME. The cache is not saved until Save is
+        # called.
+        if self.entries is None:
+            self.load()
+        stamp = file_stamp(filename)
+        if stamp is not None:
+            self.entries[filename] = (stamp, value)
+            self.changed = 1
+
+    def Clear(self):
+        # Remove all entries
+        self.entries = {}
+        self.changed = 1
+
+    def Prune(self, keep):
+        # Remove the entries whose filenames are not keys of the
+        # dictionary KEEP
+        if self.entries is None:
+            self.load()
+        for filename in self.entries.keys():
+            if not keep.has_key(filename):
+                del self.entries[filename]
+                self.changed = 1
+
+    def Save(self):
+        # Write the cache to its file if it was changed. The file is
+        # replaced atomically, so that other processes never read an
+        # incomplete cache.
+        if not self.changed:
+            return
+        temp = '%s.%d' % (self.filename, os.getpid())
+        try:
+            create_directory(os.path.dirname(self.filename))
+            file = open(temp, 'wb')
+            try:
+                marshal.dump((cache_format, self.version, self.entries), file)
+            finally:
+                file.close()
+            os.rename(temp, self.filename)
+            self.changed = 0
+        except (IOError, os.error), value:
+            pdebug('cache', 'cannot write %s: %s', self.filename, value)
+            try:
+                os.unlink(temp)
+            except os.error:
+                pass
@@ -0,0 +1,127 @@
+# Sketch - A Python-based interactive drawing program
+# Copyright (C) 2010 by sK1 Team (http://sk1project.org)
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Library General Public
+# License as published by the Free Software Foundation; either
+# version 2 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.	See the GNU
+# Library General Public License for more details.
+#
+# You should have received a copy of the GNU Library General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307	USA
+
+#
+# Class LRUCache
+#
+# A dictionary with a limited number of items. When an item is added to
+# a full cache, the least recently used item is discarded. Used for the
+# tiles of the canvas, the X fonts of a GraphicsDevice and the glyph
+# outlines.
+#
+# The order of use is kept in a deque of keys. Every time an item is
+# used its key is appended, and uses counts how often each key occurs
+# in the deque. The older occurrences aren't searched for and removed,
+# they're simply skipped when they reach the left end. So the least
+# recently used item is the first one found at the left end whose key
+# doesn't occur again. This makes all operations take constant time on
+# average. The deque is compacted when it grows too long because some
+# items are used over and over again without anything being discarded.
+#
+
+from collections import deque
+
+
+class LRUCache:
+
+    def __init__(self, max_items, discard = None):
+        # If DISCARD is given, it's called with the key and the value
+        # of each item discarded to make room for a new one.
+        self.max_items = max(1, max_items)
+        self.discard = discard
+        self.items = {}
+        self.order = deque()	# the keys in the order of use
+        self.uses = {}		# key -> number of occurrences in order
+        self.hits = self.misses = self.discarded = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def has_key(self, key):
+        return self.items.has_key(key)
+
+    def Keys(self):
+        return self.items.keys()
+
+    def Items(self):
+        return self.items.items()
+
+    def used(self, key):
+        self.order.append(key)
+        self.uses[key] = self.uses.get(key, 0) + 1
+        if len(self.order) > 4 * self.max_items + 16:
+            self.compact()
+
+    def compact(self):
+        # Remove all but the last occurrence of each key from the deque
+        order = deque()
+        uses = {}
+        for key in reversed(self.order):
+            if not uses.has_key(key) and self.items.has_key(key):
+                uses[key] = 1
+                order.appendleft(key)
+        self.order = order
+        self.uses = uses
+
+    def Get(self, key):
+        # Return the value for KEY or None if it's not cached
+        value = self.items.get(key)
+        if value is None:
+            self.misses = self.misses + 1
+            return None
+        self.hits = self.hits + 1
+        self.used(key)
+        return value
+
+    def Add(self, key, value):
+        if not self.items.has_key(key) and len(self.items) >= self.max_items:
+            self.discard_lru()
+        self.items[key] = value
+        self.used(key)
+
+    def Remove(self, key):
+        # Remove the item KEY and return its value. Its occurrences in
+        # the deque are dropped later.
+        value = self.items[key]
+        del self.items[key]
+        return value
+
+    def discard_lru(self):
+        order = self.order
+        uses = self.uses
+        while order:
+            key = order.popleft()
+            count = uses[key] - 1
+            if count:
+                uses[key] = count
+                continue
+            del uses[key]
+            if self.items.has_key(key):
+                value = self.Remove(key)
+                self.discarded = self.discarded + 1
+                if self.discard is not None:
+                    self.discard(key, value)
+                return
+
+    def Clear(self):
+        self.items.clear()
+        self.order.clear()
+        self.uses.clear()
+
+    def Statistics(self):
+        return {'items': len(self.items), 'hits': self.hits,
+                'misses': self.misses, 'discarded': self.discarded}
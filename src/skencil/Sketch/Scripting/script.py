@@ -45,7 +45,7 @@ class Script:
 
     def execute(self, context, *args, **kw):
         document = context.main_window.document
-        apply(document.BeginTransaction, args, kw)
+        apply(document.BeginUndoBatch, args, kw)
         try:
             try:
                 kw = self.kwargs
@@ -56,7 +56,7 @@ class Script:
                 warn_tb(USER, 'Error in user script "%s"', self.name)
                 document.AbortTransaction()
         finally:
-            document.EndTransaction()
+            document.EndUndoBatch()
 
 
 class SafeScript(Script):
@@ -40,7 +40,7 @@ from Sketch.const import STATE, MODE, SELECTION, VIEW, POSITION, EDITED, \
      SelectSubobjects, SelectDrag, SelectGuide
 import Sketch
 
-import command
+from Sketch import command
 import skpixmaps
 pixmaps = skpixmaps.PixmapTk
 from tkext import MakeCommand, UpdatedMenu
@@ -448,24 +448,31 @@ class SketchCanvas(SketchView, CursorStack, WidgetWithModes):
         else:
             region = SketchView.RedrawMethod(self, region)
 
+        self.redraw_overlay(region)
+        #self.show_handles()
+
+        # The sync helps to avoid the scroll bug. Clicking once into the
+        # scroll bar to scroll by a page could scroll twice for a
+        # complex drawing.
+        self.tkwin.Sync()
+
+    def redraw_overlay(self, region, recttuple = None):
         # draw the handles
         self.invgc.InitClip()
-        if region:
+        clip = region or recttuple
+        if clip:
             self.invgc.PushClip()
-            self.invgc.ClipRegion(region)
+            if region:
+                self.invgc.ClipRegion(region)
+            if recttuple:
+                self.invgc.ClipRect(recttuple)
         if self.current is not None:
             self.current.DrawDragged(self.invgc, 0)
         else:
             self.show_handles(1)
         self.show_crosshairs(1)
-        if region:
+        if clip:
             self.invgc.PopClip()
-        #self.show_handles()
-
-        # The sync helps to avoid the scroll bug. Clicking once into the
-        # scroll bar to scroll by a page could scroll twice for a
-        # complex drawing.
-        self.tkwin.Sync()
 
     #
     #	Event handler
@@ -19,6 +19,7 @@ import os, sys, string
 from types import TupleType, ListType
 
 from Sketch.Lib import util
+from Sketch.Lib.compressed import guess_compression, strip_extension
 from Sketch.warn import warn, warn_tb, INTERNAL, USER
 from Sketch import _, config, load, plugins, SketchVersion
 from Sketch import Publisher, Point, EmptyFillStyle, EmptyLineStyle, \
@@ -38,7 +39,7 @@ from tkext import AppendMenu, UpdatedLabel, UpdatedButton, CommandButton, \
      CommandCheckbutton, MakeCommand, MultiButton
 import tkext
 
-from command import CommandClass, Keymap, Commands
+from Sketch.command import CommandClass, Keymap, Commands
 
 from canvas import SketchCanvas
 import ruler
@@ -234,12 +235,17 @@ class SketchMainWindow(Publisher):
                                            initialfile = name)
             if not filename:
                 return
+            # guess compression from filename
+            compressed = guess_compression(filename)
+            if compressed:
+                compressed_file = filename
+                filename = strip_extension(filename)
+            else:
+                compressed_file = ''
             extension = os.path.splitext(filename)[1]
             fileformat = plugins.guess_export_plugin(extension)
             if not fileformat:
                 fileformat = plugins.NativeFormat
-            compressed_file = '' # guess compression from filename
-            compressed = ''
         else:
             fileformat = plugins.NativeFormat
         self.SaveToFile(filename, fileformat, compressed, compressed_file)
@@ -274,17 +280,8 @@ class SketchMainWindow(Publisher):
                 fileformat = plugins.NativeFormat
             try:
                 saver = plugins.find_export_plugin(fileformat)
-                if compressed:
-                    # XXX there should be a plugin interface for this kind
-                    # of post-processing
-                    if compressed == "gzip":
-                        cmd = 'gzip -c -9 > ' + util.sh_quote(compressed_file)
-                    elif compressed == "bzip2":
-                        cmd = 'bzip2 > ' + util.sh_quote(compressed_file)
-                    file = os.popen(cmd, 'w')
-                    saver(self.document, filename, file = file)
-                else:
-                    saver(self.document, filename)
+                saver(self.document, filename, compressed = compressed,
+                      compressed_file = compressed_file)
             finally:
                 saver.UnloadPlugin()
         except IOError, value:
@@ -307,9 +304,11 @@ class SketchMainWindow(Publisher):
             self.document.meta.fullpathname = filename
             self.document.meta.file_type = plugins.NativeFormat
             self.document.meta.native_format = 1
-        if not compressed_file:
-            self.document.meta.compressed_file = ''
-            self.document.meta.compressed = ''
+            # remember the compression, so that the next save writes to
+            # the compressed file again. An export to another format
+            # doesn't change the file the document is saved to.
+            self.document.meta.compressed = compressed
+            self.document.meta.compressed_file = compressed_file
         if compressed_file:
             self.add_mru_file(compressed_file)
         else:
@@ -24,7 +24,8 @@ import operator
 import pax
 
 from Sketch import StandardColors, GraphicsDevice, Identity, gtkutils
-from Sketch import config, const, GuideLine, Point, ui_colors
+from Sketch import config, const, GuideLine, Point
+import Sketch
 from Sketch.warn import warn, USER
 from Sketch.const import CHANGED
 from Sketch.Graphics.color import XRGBColor
@@ -94,6 +95,7 @@ class Ruler(PyWidget):
         self['height'] = 19
         self['width'] = 19
         
+        ui_colors = Sketch.ui_colors
         self.border_color = XRGBColor(ui_colors.light_border)
         self.bg_color = XRGBColor(ui_colors.menubackground)
         self.fg_color = XRGBColor(ui_colors.fg)
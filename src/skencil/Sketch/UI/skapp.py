@@ -20,7 +20,7 @@ import sys
 from Sketch.warn import pdebug
 from Sketch import _, config, plugins, Publisher, gtkutils
 import Sketch
-from Sketch.Graphics import document
+from Sketch.Graphics import document, eps
 
 from Sketch.const import CLIPBOARD
 
@@ -225,6 +225,7 @@ class SketchApplication(TkApplication, Publisher):
                               geometry=geometry)
         root = self.root
         Sketch.init_modules_from_widget(root)
+        eps.SetPreviewScheduler(root.after)
         root.iconbitmap(pixmaps.Icon)
         root.iconmask(pixmaps.Icon_mask)
         root.iconname('Skencil')
@@ -90,6 +90,11 @@ class PixmapTk:
 
     def load_image(self, name):
         import Tkinter
+        # NAME may also be the name of one of the pixmaps, e.g.
+        # 'BezierAngle', so that modules outside of the UI (like the
+        # commands of the graphics objects) can refer to pixmaps without
+        # importing this module.
+        name = self.__dict__.get(name, name)
         if name[0] == '*':
             if config.preferences.color_icons:
                 image = self._cache.get(name)
@@ -0,0 +1,113 @@
+# Sketch - A Python-based interactive drawing program
+# Copyright (C) 2010 by sK1 Team (http://sk1project.org)
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Library General Public
+# License as published by the Free Software Foundation; either
+# version 2 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.	See the GNU
+# Library General Public License for more details.
+#
+# You should have received a copy of the GNU Library General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307	USA
+
+#
+# Class TileCache
+#
+# Bookkeeping for the offscreen tiles of SketchView. A tile is a square
+# pixmap with the rendered drawing for one cell of a grid in virtual
+# window coordinates. Tiles are identified by a key (VIEW, X, Y) where
+# VIEW describes the zoom factor and the position of the page in the
+# virtual window (see SketchView.tile_view_key) and X and Y are the
+# indices of the grid cell. Since the virtual coordinates don't change
+# when the view is scrolled, the tiles remain valid while panning.
+#
+# For each tile the cache also stores the area of the document it
+# covers, so that the tiles can be invalidated with the rectangles
+# that the document reports as changed, regardless of the zoom factor
+# they were rendered for.
+#
+# The number of tiles is limited. When the limit is reached, the least
+# recently used tile is discarded. The pixmaps of discarded tiles are
+# kept for reuse.
+#
+
+from Sketch import EmptyRect, InfinityRect, RectType
+from Sketch.Lib.lrucache import LRUCache
+
+
+class TileCache:
+
+    def __init__(self, tile_size, max_tiles):
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        # key -> (pixmap, rect)
+        self.tiles = LRUCache(max_tiles, self.keep_pixmap)
+        self.spare = []		# pixmaps that may be reused
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def Get(self, key):
+        # Return the pixmap of the tile KEY or None if it's not cached
+        tile = self.tiles.Get(key)
+        if tile is None:
+            return None
+        return tile[0]
+
+    def Add(self, key, pixmap, rect):
+        # Add the tile KEY. RECT is the area of the document covered
+        # by the tile.
+        self.tiles.Add(key, (pixmap, rect))
+
+    def SparePixmap(self):
+        # Return a pixmap of a discarded tile or None
+        if self.spare:
+            return self.spare.pop()
+        return None
+
+    def keep_pixmap(self, key, tile):
+        if len(self.spare) < self.max_tiles:
+            self.spare.append(tile[0])
+
+    def remove(self, key):
+        self.keep_pixmap(key, self.tiles.Remove(key))
+
+    def Invalidate(self, rect):
+        # Discard all tiles that overlap RECT. RECT is in document
+        # coordinates and may also be a tuple (POINT, HORIZONTAL)
+        # describing a guide line, like the argument of
+        # Viewport.clear_area_doc.
+        if rect is EmptyRect:
+            return
+        if rect is InfinityRect:
+            self.Clear()
+            return
+        remove = []
+        if type(rect) == RectType:
+            for key, (pixmap, tile_rect) in self.tiles.Items():
+                if tile_rect.overlaps(rect):
+                    remove.append(key)
+        else:
+            p, horizontal = rect
+            for key, (pixmap, tile_rect) in self.tiles.Items():
+                if horizontal:
+                    if tile_rect.bottom <= p.y <= tile_rect.top:
+                        remove.append(key)
+                elif tile_rect.left <= p.x <= tile_rect.right:
+                    remove.append(key)
+        for key in remove:
+            self.remove(key)
+
+    def Clear(self):
+        # Discard all tiles
+        for key in self.tiles.Keys():
+            self.remove(key)
+
+    def Statistics(self):
+        return {'tiles': len(self.tiles), 'hits': self.tiles.hits,
+                'misses': self.tiles.misses}
@@ -30,7 +30,7 @@ from Tkinter import LEFT, DISABLED, NORMAL, END, RAISED, Y, X, TOP
 import Tkinter
 import tkFileDialog
 
-import command
+from Sketch import command
 from skpixmaps import PixmapTk
 
 class SketchDropTarget:
@@ -15,21 +15,43 @@
 # License along with this library; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307	USA
 
+import time
+
 from Sketch.warn import pdebug
 
 from Sketch import Rect, EmptyRect, IntersectRects, Document, GraphicsDevice,\
-     SketchInternalError, QueueingPublisher, StandardColors
+     SketchInternalError, QueueingPublisher, StandardColors, Translation
+from Sketch.config import preferences
 
 from Sketch.const import STATE, VIEW, DOCUMENT, LAYOUT, REDRAW
 from Sketch.const import LAYER, LAYER_STATE, LAYER_ORDER, LAYER_COLOR
 
 from tkext import PyWidget
 from viewport import Viewport
+from tilecache import TileCache
+
+
+class RenderJob:
+
+    # The state of a progressive redraw of a SketchView. TASKS is a list
+    # of tuples (KEY, PIXMAP, X, Y, W, H) for the areas of the window
+    # still to be rendered: X, Y, W, H is the area in window
+    # coordinates, PIXMAP the pixmap it is rendered into and KEY the
+    # key of the tile in the tile cache or None. STEPS is the generator
+    # rendering the first task once it was started, RECT the area of
+    # the document covered by it.
+
+    def __init__(self, region, tasks):
+        self.region = region
+        self.tasks = tasks
+        self.steps = None
+        self.rect = None
 
 
 class SketchView(PyWidget, Viewport, QueueingPublisher):
 
     document = None
+    tile_cache = None
 
     def __init__(self, master=None, toplevel = None, document = None,
                  show_visible = 0, show_printable = 1,
@@ -72,6 +94,7 @@ class SketchView(PyWidget, Viewport, QueueingPublisher):
         # make sure that gc is deleted. gc may have a shared memory ximage
         # which is not freed if the gc is not destroyed leaving unused shared
         # memory segments in the system even after the process has finished.
+        self.cancel_render()
         self.gc = None
         PyWidget.DestroyMethod(self)
 
@@ -80,6 +103,10 @@ class SketchView(PyWidget, Viewport, QueueingPublisher):
         self.gc.draw_visible = self.show_visible
         self.gc.draw_printable = self.show_printable
         self.gc.allow_outline = 0
+        self.gc.use_lod = 1
+        if preferences.tile_cache_size:
+            self.tile_cache = TileCache(preferences.tile_size,
+                                        preferences.tile_cache_size)
         self.gcs_initialized = 1
         self.default_view()
         self.set_gc_transforms()
@@ -88,6 +115,9 @@ class SketchView(PyWidget, Viewport, QueueingPublisher):
         self.FitPageToWindow()
 
     def set_gc_transforms(self):
+        if self.render_job is not None:
+            # the viewport changed. Start again.
+            self.clear_window()
         self.gc.SetViewportTransform(self.scale, self.doc_to_win,
                                      self.win_to_doc)
 
@@ -135,6 +165,7 @@ class SketchView(PyWidget, Viewport, QueueingPublisher):
 
     def redraw_doc(self, all, rects = None):
         if all:
+            self.clear_tiles()
             self.clear_window()
         else:
             map(self.clear_area_doc, rects)
@@ -145,6 +176,7 @@ class SketchView(PyWidget, Viewport, QueueingPublisher):
         self.update_scrollbars()
         self.update_rulers()
         if self.show_page_outline:
+            self.clear_tiles()
             self.clear_window()
 
     def layer_changed(self, *args):
@@ -191,8 +223,8 @@ class SketchView(PyWidget, Viewport, QueueingPublisher):
         # draw the document
         if __debug__:
             if self.time_redraw:
-                import time
                 start = time.clock()
+        self.cancel_render()
         if self.move_window_count >= 2:
             self.clear_window(update = 0)
         self.move_window_count = 0
@@ -201,10 +233,6 @@ class SketchView(PyWidget, Viewport, QueueingPublisher):
 
         # draw document
         self.gc.InitClip()
-        self.gc.ResetFontCache()
-        if region:
-            self.gc.PushClip()
-            self.gc.ClipRegion(region)
 
         tkwin = self.tkwin
         if region:
@@ -221,10 +249,72 @@ class SketchView(PyWidget, Viewport, QueueingPublisher):
             x = y = 0
             w = tkwin.width
             h = tkwin.height
+
+        # Areas not in the tile cache are either drawn immediately or,
+        # with progressive rendering, become tasks of a render job.
+        progressive = preferences.render_time_slice > 0
+        tiles = []
+        tasks = []
+        direct = 0
+        if self.use_tiles():
+            tiles, missing = self.get_tiles(x, y, w, h)
+            size = self.tile_cache.tile_size
+            for key, tile_x, tile_y in missing:
+                pixmap = self.tile_pixmap()
+                if progressive:
+                    tasks.append((key, pixmap, tile_x, tile_y, size, size))
+                else:
+                    rect = self.render_tile(pixmap, tile_x, tile_y,
+                                            size, size)
+                    self.tile_cache.Add(key, pixmap, rect)
+                    tiles.append((pixmap, tile_x, tile_y))
+        elif progressive:
+            if w > 0 and h > 0:
+                pixmap = tkwin.CreatePixmap(w, h, tkwin.depth)
+                tasks.append((None, pixmap, x, y, w, h))
+        else:
+            direct = 1
+
+        if region:
+            self.gc.PushClip()
+            self.gc.ClipRegion(region)
+
+        if tiles:
+            size = self.tile_cache.tile_size
+            for pixmap, tile_x, tile_y in tiles:
+                pixmap.CopyArea(tkwin, self.gc.gc, 0, 0, size, size,
+                                tile_x, tile_y)
+        if direct:
+            self.draw_document(self.doc_rect(x, y, w, h), x, y, w, h)
+
+        if region:
+            self.gc.PopClip()
+
+        if tasks:
+            self.render_job = RenderJob(region, tasks)
+            self.render_slice()
+
+        if __debug__:
+            if self.time_redraw:
+                pdebug('timing', 'redraw', time.clock() - start)
+                if self.tile_cache is not None:
+                    pdebug('timing', 'tiles', self.tile_cache.Statistics())
+                pdebug('timing', 'fonts', self.gc.font_cache.Statistics())
+
+        return region
+
+    def doc_rect(self, x, y, w, h):
+        # Return the area of the document visible in the rectangle given
+        # by X, Y, W, H in window coordinates, plus a small margin.
         p1 = self.WinToDoc(x - 1, y - 1)
         p2 = self.WinToDoc(x + w + 1, y + h + 1)
-        rect = Rect(p1, p2)
+        return Rect(p1, p2)
 
+    def draw_document(self, rect, x, y, w, h):
+        # Draw the objects overlapping RECT (in document coordinates)
+        # into the rectangle given by X, Y, W, H in the coordinates of
+        # the current drawable, including the background and the page
+        # outline.
         self.gc.SetFillColor(StandardColors.white)
         self.gc.gc.FillRectangle(x, y, w, h) # XXX ugly to access gc.gc
 
@@ -233,16 +323,198 @@ class SketchView(PyWidget, Viewport, QueueingPublisher):
             w, h = self.document.PageSize()
             self.gc.DrawPageOutline(w, h)
 
-
         self.document.Draw(self.gc, rect)
-        if region:
-            self.gc.PopClip()
 
-        if __debug__:
-            if self.time_redraw:
-                pdebug('timing', 'redraw', time.clock() - start)
+    #
+    #	Tile cache
+    #
+    #	If enabled, the drawing is rendered into the offscreen tiles of
+    #	self.tile_cache (see tilecache.py) and RedrawMethod copies the
+    #	tiles to the window. Changes of the document invalidate the
+    #	affected tiles via clear_area_doc. Changes that affect the
+    #	entire drawing have to call clear_tiles.
+    #
 
-        return region
+    def use_tiles(self):
+        if self.tile_cache is None:
+            return 0
+        # Some drawing methods of the GraphicsDevice clip to the window
+        # size. Tiles can only be used if they fit into the window.
+        size = self.tile_cache.tile_size
+        return self.tkwin.width >= size and self.tkwin.height >= size
+
+    def tile_view_key(self):
+        # Return a key describing the transformation from document to
+        # virtual window coordinates. It doesn't change when the view
+        # is scrolled.
+        m11, m21, m12, m22, v1, v2 = self.doc_to_win.coeff()
+        return (m11, m22, round(v1 + self.virtual_x, 3),
+                round(v2 + self.virtual_y, 3))
+
+    def get_tiles(self, x, y, w, h):
+        # Return the tiles covering the rectangle given by X, Y, W, H in
+        # window coordinates as a tuple (TILES, MISSING). TILES is a
+        # list of tuples (PIXMAP, X, Y) with the cached tiles and the
+        # window coordinates of their upper left corners. MISSING is a
+        # list of tuples (KEY, X, Y) for the tiles that have to be
+        # rendered.
+        cache = self.tile_cache
+        size = cache.tile_size
+        view = self.tile_view_key()
+        vx = int(round(self.virtual_x))
+        vy = int(round(self.virtual_y))
+        tiles = []
+        missing = []
+        for ty in range((y + vy) / size, (y + h + vy - 1) / size + 1):
+            for tx in range((x + vx) / size, (x + w + vx - 1) / size + 1):
+                tile_x = tx * size - vx
+                tile_y = ty * size - vy
+                key = (view, tx, ty)
+                pixmap = cache.Get(key)
+                if pixmap is None:
+                    missing.append((key, tile_x, tile_y))
+                else:
+                    tiles.append((pixmap, tile_x, tile_y))
+        return tiles, missing
+
+    def tile_pixmap(self):
+        pixmap = self.tile_cache.SparePixmap()
+        if pixmap is None:
+            size = self.tile_cache.tile_size
+            pixmap = self.tkwin.CreatePixmap(size, size, self.tkwin.depth)
+        return pixmap
+
+    def start_tile(self, pixmap, x, y):
+        # Redirect the drawing of self.gc to PIXMAP whose upper left
+        # corner is at X, Y in window coordinates.
+        trafo = Translation(-x, -y)
+        self.gc.StartTile(pixmap, trafo(self.doc_to_win),
+                          self.win_to_doc(trafo.inverse()))
+
+    def render_tile(self, pixmap, x, y, w, h):
+        # Render the area of the window given by X, Y, W, H into
+        # PIXMAP. Return the area of the document covered by it.
+        rect = self.doc_rect(x, y, w, h)
+        self.start_tile(pixmap, x, y)
+        try:
+            self.draw_document(rect, 0, 0, w, h)
+        finally:
+            self.gc.EndTile()
+        return rect
+
+    def clear_tiles(self):
+        if self.tile_cache is not None:
+            self.tile_cache.Clear()
+
+    def clear_area_doc(self, rect):
+        if rect is not EmptyRect and self.cancel_render():
+            self.UpdateWhenIdle()
+        if self.tile_cache is not None:
+            self.tile_cache.Invalidate(rect)
+        Viewport.clear_area_doc(self, rect)
+
+    def clear_window(self, update = 1):
+        self.cancel_render()
+        Viewport.clear_window(self, update)
+
+    #
+    #	Progressive rendering
+    #
+    #	If preferences.render_time_slice is not 0, the areas that
+    #	RedrawMethod has to render are rendered into pixmaps by a
+    #	RenderJob. RedrawMethod only renders as much as it can in the
+    #	time slice and the rest is done in Tk idle callbacks, one slice
+    #	at a time, so that events are handled in between. Each area is
+    #	copied to the window when it's complete.
+    #
+    #	Changing the document, the viewport or the way the drawing is
+    #	displayed cancels the job. The areas not yet copied to the
+    #	window are then marked as invalid.
+    #
+
+    render_job = None
+    render_idle = None
+
+    def render_slice(self, idle = 0):
+        # Continue self.render_job for one time slice. IDLE is true if
+        # called from the idle callback, i.e. not from RedrawMethod.
+        job = self.render_job
+        deadline = time.time() + preferences.render_time_slice / 1000.0
+        tkwin = self.tkwin
+        while job.tasks:
+            key, pixmap, x, y, w, h = job.tasks[0]
+            self.start_tile(pixmap, x, y)
+            try:
+                if job.steps is None:
+                    job.rect = self.doc_rect(x, y, w, h)
+                    job.steps = self.render_steps(job.rect, w, h)
+                finished = 1
+                for step in job.steps:
+                    if time.time() > deadline:
+                        finished = 0
+                        break
+            finally:
+                self.gc.EndTile()
+            if not finished:
+                break
+            del job.tasks[0]
+            job.steps = None
+            if key is not None:
+                self.tile_cache.Add(key, pixmap, job.rect)
+            if job.region:
+                self.gc.PushClip()
+                self.gc.ClipRegion(job.region)
+            pixmap.CopyArea(tkwin, self.gc.gc, 0, 0, w, h, x, y)
+            if job.region:
+                self.gc.PopClip()
+            if idle:
+                # RedrawMethod's caller has drawn the overlays over the
+                # background. Restore them in the new area.
+                self.redraw_overlay(job.region, (x, y, w, h))
+        if job.tasks:
+            self.render_idle = self.after_idle(self.render_idle_slice)
+        else:
+            self.render_job = None
+
+    def render_idle_slice(self):
+        self.render_idle = None
+        if self.render_job is not None:
+            self.render_slice(idle = 1)
+
+    def render_steps(self, rect, w, h):
+        # Generator drawing the area RECT of the document into the
+        # current drawable of self.gc, a pixmap of W x H pixels.
+        self.gc.SetFillColor(StandardColors.white)
+        self.gc.gc.FillRectangle(0, 0, w, h)
+        if self.show_page_outline:
+            width, height = self.document.PageSize()
+            self.gc.DrawPageOutline(width, height)
+        for step in self.document.DrawSteps(self.gc, rect):
+            yield step
+
+    def cancel_render(self):
+        # Stop the current render job, if any, and mark the areas it
+        # hasn't drawn yet as invalid. The caller is responsible for
+        # scheduling a redraw. Return true if a job was stopped.
+        job = self.render_job
+        if job is None:
+            return 0
+        self.render_job = None
+        if self.render_idle is not None:
+            self.after_cancel(self.render_idle)
+            self.render_idle = None
+        if job.steps is not None:
+            job.steps.close()
+        for key, pixmap, x, y, w, h in job.tasks:
+            self.clear_rects.append((x, y, w, h))
+        return 1
+
+    def redraw_overlay(self, region, recttuple):
+        # Redraw whatever derived classes draw on top of the document
+        # in the part of the window given by REGION (may be None) and
+        # RECTTUPLE. Called when progressive rendering has overwritten
+        # that part of the window.
+        pass
 
     def ResizedMethod(self, width, height):
         Viewport.ResizedMethod(self, width, height)
@@ -258,6 +530,7 @@ class SketchView(PyWidget, Viewport, QueueingPublisher):
 
     def ForceRedraw(self):
         # Force a redraw of the whole window
+        self.clear_tiles()
         self.clear_window()
         if __debug__:
             #self.time_redraw = 1
@@ -339,6 +612,8 @@ class SketchView(PyWidget, Viewport, QueueingPublisher):
     def SetOutlineMode(self, on = 1):
         self.begin_transaction()
         try:
+            # a render job may be in the middle of an outlined layer
+            self.cancel_render()
             if on:
                 if self.gc.IsOutlineActive():
                     return
@@ -352,6 +627,7 @@ class SketchView(PyWidget, Viewport, QueueingPublisher):
                 else:
                     return
             self.issue_view()
+            self.clear_tiles()
             self.clear_window()
         finally:
             self.end_transaction()
@@ -371,6 +647,7 @@ class SketchView(PyWidget, Viewport, QueueingPublisher):
         try:
             self.show_page_outline = on
             self.issue_view()
+            self.clear_tiles()
             self.clear_window()
         finally:
             self.end_transaction()
@@ -402,6 +679,7 @@ class SketchView(PyWidget, Viewport, QueueingPublisher):
             self.unsubscribe_doc()
             self.document = doc
             self.subscribe_doc()
+            self.clear_tiles()
             self.clear_window()
             self.SetPageSize(self.document.Layout().Size())
             self.FitPageToWindow(save_viewport = 0)
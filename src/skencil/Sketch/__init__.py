@@ -15,7 +15,7 @@
 # License along with this library; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307	USA
 
-import os, sys, string
+import os, sys, string, imp
 
 _pkgdir = __path__[0]
 _parentdir = os.path.join(_pkgdir, '..')
@@ -53,9 +53,11 @@ except ImportError:
         pass
 _ = gettext
 
-import gtkutils
-ui_fonts = gtkutils.get_gtk_fonts()
-ui_colors = gtkutils.ColorScheme()
+# The fonts and colors of the user interface. They are read from the
+# GTK theme by init_ui, because that takes a while and only the UI
+# needs them.
+ui_fonts = None
+ui_colors = None
 
 import _sketch
 from _sketch import Point, Polar, PointType
@@ -84,7 +86,8 @@ config.init_directories(_parentdir)
 from skexceptions import *
 
 from undo import Undo, UndoList, CreateListUndo, CreateMultiUndo, UndoAfter, \
-     UndoRedo, NullUndo
+     UndoRedo, NullUndo, CoalesceUndo, RegisterUndoCoalescer, keep_older_undo, \
+     add_undo_offsets
 
 from connector import Connect, Disconnect, Issue, RemovePublisher, Subscribe, \
      Publisher, QueueingPublisher
@@ -92,21 +95,26 @@ from connector import Connect, Disconnect, Issue, RemovePublisher, Subscribe, \
 #
 
 def _import_PIL():
-    # Import PIL and work around some bugs...
-    # First, try to import PIL as a package
+    # Make sure that PIL can be imported as a package and work around
+    # some bugs... PIL itself is only imported by the modules that need
+    # it when they need it, so that it isn't loaded for drawings without
+    # raster images.
+    # First, try to find PIL as a package
     try:
-        import PIL
-        import PIL.Image
+        file, pathname, description = imp.find_module('PIL')
+        if file is not None:
+            file.close()
         # Work around a bug in PIL 1.0 when used as a package
-        if PIL.__path__[0] not in sys.path:
-            sys.path.append(PIL.__path__[0])
+        if pathname not in sys.path:
+            sys.path.append(pathname)
     except ImportError:
         # Must be an older PIL.
         try:
             import Image, ImageChops
-        except:
-            warn.warn(warn.USER, "Can't import the Python Imaging Library")
-            sys.exit(1)
+        except ImportError:
+            # no PIL at all. init_ui complains about that, other users
+            # of Sketch get an ImportError when they use images.
+            return
         import plugins
         plugins.create_packages('PIL')
         import PIL
@@ -182,11 +190,26 @@ def init_lib():
     Issue(None, const.INITIALIZE)
 
 def init_ui():
+    global ui_fonts, ui_colors
+
     # workaround for a threaded _tkinter in Python 1.5.2
     if sys.version[:5] >= '1.5.2':
         import paxtkinter
         sys.modules['_tkinter'] = paxtkinter
 
+    try:
+        import PIL.Image
+    except ImportError:
+        warn.warn(warn.USER, "Can't import the Python Imaging Library")
+        sys.exit(1)
+
+    import gtkutils
+    ui_fonts = gtkutils.get_gtk_fonts()
+    ui_colors = gtkutils.ColorScheme()
+
+    # define the names of the pixmap files and the cursors in const
+    import UI.skpixmaps
+
     init_lib()
 
     # import the standard scripts
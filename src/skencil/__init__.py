@@ -13,4 +13,16 @@ def skencil_run():
     
     Sketch.config.sketch_command = sys.argv[0]
     
-    Sketch.main.main()
\ No newline at end of file
+    Sketch.main.main()
+
+def skencil_export_run():
+    import sys, warnings
+
+    warnings.filterwarnings("ignore")
+
+    _pkgdir = __path__[0]
+    sys.path.insert(1, _pkgdir)
+
+    import Sketch.batchexport
+
+    sys.exit(Sketch.batchexport.main())
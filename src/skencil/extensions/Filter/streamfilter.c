@@ -30,10 +30,10 @@
 #include "stringfilter.h"
 #include "nullfilter.h"
 #include "hexfilter.h"
+#include "ascii85filter.h"
 /* hack to deselect the filters not needed by Sketch */
 #ifdef ALL_FILTERS
 #include "zlibfilter.h"
-#include "ascii85filter.h"
 #endif
 #include "binfile.h"
 
@@ -48,10 +48,10 @@ static PyMethodDef filter_functions[] = {
 	{"NullDecode",		Filter_NullDecode,	METH_VARARGS},
 	{"HexEncode",		Filter_HexEncode,	METH_VARARGS},
 	{"HexDecode",		Filter_HexDecode,	METH_VARARGS},
-#ifdef ALL_FILTERS
-	{"FlateDecode",		Filter_FlateDecode,	METH_VARARGS},
 	{"ASCII85Encode",	Filter_ASCII85Encode,	METH_VARARGS},
 	{"ASCII85Decode",	Filter_ASCII85Decode,	METH_VARARGS},
+#ifdef ALL_FILTERS
+	{"FlateDecode",		Filter_FlateDecode,	METH_VARARGS},
 #endif
 	{"BinaryInput",		BinFile_New,		METH_VARARGS},
 	{NULL, NULL} 
@@ -69,6 +69,7 @@ static PyMethodDef curve_functions[] = {
     {"approx_arc",		SKCurve_PyApproxArc,		1},
     {"RectanglePath",		SKCurve_PyRectanglePath,	1},
     {"RoundedRectanglePath",	SKCurve_PyRoundedRectanglePath,	1},
+    {"transform_paths",		SKCurve_PyTransformPaths,	1},
     {"num_allocated",		_SKCurve_NumAllocated,		1},
 
     /* image functions */
@@ -109,6 +110,46 @@ PyObject * Pax_GCType = NULL;
 PyObject * Pax_ImageType = NULL;
 Pax_Functions * pax_functions = NULL;
 
+/* pax is linked with Tk and X, so it's only imported when the first
+   function that needs one of its objects is called. That way _sketch
+   can be used in non-interactive programs without loading Tk. */
+int
+SK_ImportPax(void)
+{
+    PyObject * pax, * r;
+    PyObject * gc_type = NULL, * image_type = NULL;
+
+    if (pax_functions)
+	return 1;
+
+    pax = PyImport_ImportModule("pax");
+    if (!pax)
+	return 0;
+    gc_type = PyObject_GetAttrString(pax, "PaxGCType");
+    if (!gc_type)
+	goto fail;
+    image_type = PyObject_GetAttrString(pax, "PaxImageType");
+    if (!image_type)
+	goto fail;
+    r = PyObject_GetAttrString(pax, "Pax_Functions");
+    if (!r)
+	goto fail;
+    pax_functions = (Pax_Functions*)PyCObject_AsVoidPtr(r);
+    Py_DECREF(r);
+    if (!pax_functions)
+	goto fail;
+    Pax_GCType = gc_type;
+    Pax_ImageType = image_type;
+    Py_DECREF(pax);
+    return 1;
+
+ fail:
+    Py_XDECREF(gc_type);
+    Py_XDECREF(image_type);
+    Py_DECREF(pax);
+    return 0;
+}
+
 /*
  *	Init module
  */
@@ -128,7 +169,7 @@ add_int(PyObject * dict, int i, char * name)
 void
 init_sketch(void)
 {
-    PyObject * d, *m, *r, *pax;
+    PyObject * d, *m, *r;
 
     m = Py_InitModule("_sketch", curve_functions);
     d = PyModule_GetDict(m);
@@ -181,21 +222,4 @@ init_sketch(void)
     ADD_INT(SelSegmentLast);
 
     _SKCurve_InitCurveObject();
-
-    /* import some objects from pax */
-    pax = PyImport_ImportModule("pax");
-    if (pax)
-    {
-	Pax_GCType = PyObject_GetAttrString(pax, "PaxGCType");
-	if (!Pax_GCType)
-	    return;
-	Pax_ImageType = PyObject_GetAttrString(pax, "PaxImageType");
-	if (!Pax_ImageType)
-	    return;
-	r = PyObject_GetAttrString(pax, "Pax_Functions");
-	if (!r)
-	    return;
-	pax_functions = (Pax_Functions*)PyCObject_AsVoidPtr(r);
-	Py_DECREF(r);
-    }
 }
@@ -25,5 +25,9 @@ extern PyObject * Pax_GCType;
 extern PyObject * Pax_ImageType;
 extern Pax_Functions * pax_functions;
 
+/* Import pax and initialize the variables above if that hasn't been
+   done yet. Return 0 and set an exception on failure. */
+int SK_ImportPax(void);
+
 
 #endif /* _SKETCH_H */
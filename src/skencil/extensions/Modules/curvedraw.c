@@ -98,6 +98,8 @@ SKCurve_PyDrawTransformed(SKCurveObject * self, PyObject * args)
     SKRectObject * clip_rect = NULL;
     int optimize_clip = 0;
 
+    if (!SK_ImportPax())
+	return NULL;
     if (!PyArg_ParseTuple(args, "O!O!OOO", Pax_GCType, &gc_object,
 			  &SKTrafoType, &trafo, &line, &fill, &rect_or_none))
 	return NULL;
@@ -227,10 +229,64 @@ SKCurve_PyDrawTransformed(SKCurveObject * self, PyObject * args)
 
 
 
+/* Level of detail.
+ *
+ * If the tolerance passed to curve_add_transformed_points is > 0, the
+ * polygon is simplified: bezier segments whose control points all lie
+ * closer than TOLERANCE pixels to the start point are treated like
+ * lines and points closer than TOLERANCE pixels to the previous point
+ * are dropped. The tolerance is a distance in pixels and may be
+ * fractional. The control points are compared before they're rounded
+ * to pixels, the polygon points afterwards, so for the latter a
+ * tolerance of 1 or less only removes duplicates. Since the points are
+ * window coordinates this depends on the current scale: the further
+ * the view is zoomed out the fewer points remain.
+ */
+
+#define CLOSER_THAN(dx, dy, tolerance) \
+	((double)(dx) * (dx) + (double)(dy) * (dy) < (tolerance) * (tolerance))
+
+/* Return true if the control points and the end point of the segment,
+ * given as unrounded window coordinates, lie closer than TOLERANCE
+ * pixels to its start point (x0, y0) */
+static int
+segment_is_tiny(SKCoord x0, SKCoord y0, SKCoord x1, SKCoord y1,
+		SKCoord x2, SKCoord y2, SKCoord x3, SKCoord y3,
+		double tolerance)
+{
+    return (CLOSER_THAN(x1 - x0, y1 - y0, tolerance)
+	    && CLOSER_THAN(x2 - x0, y2 - y0, tolerance)
+	    && CLOSER_THAN(x3 - x0, y3 - y0, tolerance));
+}
+
+/* Remove the points closer than TOLERANCE pixels to their predecessor,
+ * keeping the first and the last point. Return the new length. */
+static int
+simplify_points(XPoint * points, int length, double tolerance)
+{
+    int i, last = 0;
+
+    if (length <= 2)
+	return length;
+
+    for (i = 1; i < length - 1; i++)
+    {
+	if (!CLOSER_THAN(points[i].x - points[last].x,
+			 points[i].y - points[last].y, tolerance))
+	{
+	    last++;
+	    points[last] = points[i];
+	}
+    }
+    last++;
+    points[last] = points[length - 1];
+    return last + 1;
+}
+
 static int
 curve_add_transformed_points(SKCurveObject * self, XPoint * points,
 			     PyObject * trafo, SKRectObject * clip_rect,
-			     int optimize_clip)
+			     int optimize_clip, double tolerance)
 {
     int length, i, added;
     CurveSegment *segment;
@@ -272,12 +328,23 @@ curve_add_transformed_points(SKCurveObject * self, XPoint * points,
 	    SKTrafo_TransformXY(trafo, segment->x1, segment->y1, &x1, &y1);
 	    SKTrafo_TransformXY(trafo, segment->x2, segment->y2, &x2, &y2);
 	    SKTrafo_TransformXY(trafo, segment->x, segment->y, &nx, &ny);
-	    x[0] = rint(lastx);	y[0] = rint(lasty);
-	    x[1] = rint(x1);	y[1] = rint(y1);
-	    x[2] = rint(x2);	y[2] = rint(y2);
-	    x[3] = rint(nx);	y[3] = rint(ny);
-	    added = bezier_fill_points(points + length - 1, x, y);
-	    length += added - 1;
+	    if (tolerance > 0
+		&& segment_is_tiny(lastx, lasty, x1, y1, x2, y2, nx, ny,
+				   tolerance))
+	    {
+		points[length].x = rint(nx);
+		points[length].y = rint(ny);
+		length++;
+	    }
+	    else
+	    {
+		x[0] = rint(lastx);	y[0] = rint(lasty);
+		x[1] = rint(x1);	y[1] = rint(y1);
+		x[2] = rint(x2);	y[2] = rint(y2);
+		x[3] = rint(nx);	y[3] = rint(ny);
+		added = bezier_fill_points(points + length - 1, x, y);
+		length += added - 1;
+	    }
 	}
 	else
 	{
@@ -294,6 +361,9 @@ curve_add_transformed_points(SKCurveObject * self, XPoint * points,
 	lasty = ny;
     }
 
+    if (tolerance > 0)
+	length = simplify_points(points, length, tolerance);
+
     return length;
 }
 
@@ -304,6 +374,9 @@ curve_add_transformed_points(SKCurveObject * self, XPoint * points,
  * The callback functions fill_func and line_func allow arbitrary fill
  * patterns.
  *
+ * The optional last argument is the tolerance in pixels for the
+ * simplification of the paths (see curve_add_transformed_points). The
+ * default, 0, draws the paths with full detail.
  */
 
 PyObject *
@@ -321,13 +394,16 @@ SKCurve_PyDrawMultipath(PyObject* self, PyObject * args)
     XPoint start;
     PaxRegionObject * oregion = NULL;
     int is_proc_fill = 0, do_clip = 0;
+    double tolerance = 0;
 
-    if (!PyArg_ParseTuple(args, "O!O!OOOOOOO!Oii", Pax_GCType, &gc_object,
+    if (!SK_ImportPax())
+	return NULL;
+    if (!PyArg_ParseTuple(args, "O!O!OOOOOOO!Oii|d", Pax_GCType, &gc_object,
 			  &SKTrafoType, &trafo,
 			  &line_func, &fill_func, &push_clip, &pop_clip,
 			  &set_clip, &rect_or_none,
 			  &PyTuple_Type, &paths, &oregion, &is_proc_fill,
-			  &do_clip))
+			  &do_clip, &tolerance))
 	return NULL;
 
     if (rect_or_none == Py_None)
@@ -387,7 +463,8 @@ SKCurve_PyDrawMultipath(PyObject* self, PyObject * args)
 	path = (SKCurveObject*)PyTuple_GetItem(paths, i);
 	added = curve_add_transformed_points(path, points + length, trafo,
 					     clip_rect,
-					     !PyObject_IsTrue(line_func));
+					     !PyObject_IsTrue(line_func),
+					     tolerance);
 	if (!added)
 	    goto fail;
 	lengths[i] = added;
@@ -570,7 +647,7 @@ SKCurve_PyMultipathRegion(PyObject* self, PyObject * args)
     {
 	path = (SKCurveObject*)PyTuple_GetItem(paths, i);
 	added = curve_add_transformed_points(path, points + length, trafo,
-					    clip_rect, 1);
+					    clip_rect, 1, 0);
 	if (!added)
 	    goto fail;
 
@@ -490,3 +490,69 @@ SKCurve_PyRoundedRectanglePath(PyObject * self, PyObject * args)
 
     return (PyObject*)path;
 }
+
+/*
+ * transform_paths(PATHS, TRAFO)
+ *
+ * Apply TRAFO to all paths in PATHS in place. PATHS is a sequence whose
+ * items are either bezier objects or sequences of bezier objects (e.g.
+ * the paths of a PolyBezier). Unlike the Transform method of the
+ * bezier objects, no undo information is created.
+ */
+PyObject *
+SKCurve_PyTransformPaths(PyObject * self, PyObject * args)
+{
+    PyObject * paths, * trafo, * item, * path;
+    int i, j, length, item_length;
+
+    if (!PyArg_ParseTuple(args, "OO!", &paths, &SKTrafoType, &trafo))
+	return NULL;
+
+    length = PySequence_Length(paths);
+    if (length < 0)
+	return NULL;
+
+    for (i = 0; i < length; i++)
+    {
+	item = PySequence_GetItem(paths, i);
+	if (!item)
+	    return NULL;
+
+	if (SKCurve_Check(item))
+	{
+	    SKCurve_Transform((SKCurveObject*)item, trafo);
+	    Py_DECREF(item);
+	    continue;
+	}
+
+	item_length = PySequence_Length(item);
+	if (item_length < 0)
+	{
+	    Py_DECREF(item);
+	    return NULL;
+	}
+	for (j = 0; j < item_length; j++)
+	{
+	    path = PySequence_GetItem(item, j);
+	    if (!path)
+	    {
+		Py_DECREF(item);
+		return NULL;
+	    }
+	    if (!SKCurve_Check(path))
+	    {
+		Py_DECREF(path);
+		Py_DECREF(item);
+		PyErr_SetString(PyExc_TypeError,
+				"paths must contain bezier objects");
+		return NULL;
+	    }
+	    SKCurve_Transform((SKCurveObject*)path, trafo);
+	    Py_DECREF(path);
+	}
+	Py_DECREF(item);
+    }
+
+    Py_INCREF(Py_None);
+    return Py_None;
+}
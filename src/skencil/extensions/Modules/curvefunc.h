@@ -28,6 +28,7 @@ PyObject * SKCurve_PyBlendPaths(PyObject * self, PyObject * args);
 PyObject * SKCurve_PyApproxArc(PyObject * self, PyObject * args);
 PyObject * SKCurve_PyRectanglePath(PyObject * self, PyObject * args);
 PyObject * SKCurve_PyRoundedRectanglePath(PyObject * self, PyObject * args);
+PyObject * SKCurve_PyTransformPaths(PyObject * self, PyObject * args);
 
 
 #endif /* CURVEFUNC_H */
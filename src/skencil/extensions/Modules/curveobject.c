@@ -550,20 +550,14 @@ curve_create_full_undo(SKCurveObject * self)
 {
     PyObject * undo_segments;
     PyObject * result;
-    CurveSegment * segments;
 
-    segments = malloc(self->allocated * sizeof(CurveSegment));
-    if (!segments)
-	return PyErr_NoMemory();
-
-    memcpy(segments, self->segments, self->allocated * sizeof(CurveSegment));
-
-    undo_segments = PyCObject_FromVoidPtr(segments, free);
+    /* the segments are kept in a string, so that the undo information
+     * can be pickled by the undo manager and its size is known */
+    undo_segments = PyString_FromStringAndSize((char*)self->segments,
+					       self->allocated
+					       * sizeof(CurveSegment));
     if (!undo_segments)
-    {
-	free(segments);
 	return NULL;
-    }
 
     result = Py_BuildValue("OOiii", set_nodes_and_segments_string,
 			   undo_segments, self->len, self->allocated,
@@ -581,11 +575,17 @@ curve__set_nodes_and_segments(SKCurveObject * self, PyObject * args)
     PyObject * undo_segments = NULL;
     PyObject * result;
     
-    if (!PyArg_ParseTuple(args, "O!iii",
-			  &PyCObject_Type, &undo_segments,
+    if (!PyArg_ParseTuple(args, "Siii", &undo_segments,
 			  &length, &allocated, &closed))
 	return NULL;
 
+    if (PyString_Size(undo_segments) != allocated * sizeof(CurveSegment)
+	|| length > allocated)
+    {
+	PyErr_SetString(PyExc_ValueError, "invalid undo segments");
+	return NULL;
+    }
+
     result = curve_create_full_undo(self);
     if (!result)
 	return NULL;
@@ -596,7 +596,7 @@ curve__set_nodes_and_segments(SKCurveObject * self, PyObject * args)
 	return NULL;
     }
 
-    memcpy(self->segments, PyCObject_AsVoidPtr(undo_segments),
+    memcpy(self->segments, PyString_AsString(undo_segments),
 	   allocated * sizeof(CurveSegment));
     self->allocated = allocated;
     self->len = length;
@@ -903,6 +903,154 @@ curve_apply_trafo(SKCurveObject * self, PyObject * args)
     return undo;
 }
 
+/*
+ *	Bulk access to the coordinates
+ *
+ * curve.coords() returns the coordinates of all segments as a string
+ * of C doubles, six per segment in the order x1, y1, x2, y2, x, y. Line
+ * segments have no control points. For them, the previous node and the
+ * node itself are used instead, so that every row describes its segment
+ * as a bezier curve. The string can be passed to array.array('d', ...)
+ * or numpy.frombuffer.
+ *
+ * curve.segment_types() returns a string with one byte per segment,
+ * the type of the segment (1 for bezier, 2 for line segments).
+ *
+ * curve.SetCoords(data) replaces all coordinates with those in DATA,
+ * any object with a read buffer of the same layout as the result of
+ * coords(). The number of segments, their types and the continuity
+ * are unchanged. The control points given for line segments are
+ * ignored. The path stays closed if it was: the last node is copied to
+ * the first like SetSegment does. Like Transform it returns undo
+ * information.
+ */
+
+#define COORDS_PER_SEGMENT 6
+
+static PyObject *
+curve_coords(SKCurveObject * self, PyObject * args)
+{
+    PyObject * result;
+    CurveSegment * segment;
+    double coords[COORDS_PER_SEGMENT];
+    char * buf;
+    double lastx, lasty;
+    int i;
+
+    result = PyString_FromStringAndSize(NULL, self->len * sizeof(coords));
+    if (!result)
+	return NULL;
+    buf = PyString_AsString(result);
+
+    segment = self->segments;
+    if (self->len)
+    {
+	lastx = segment->x;
+	lasty = segment->y;
+    }
+    for (i = 0; i < self->len; i++, segment++)
+    {
+	if (segment->type == CurveBezier)
+	{
+	    coords[0] = segment->x1;	coords[1] = segment->y1;
+	    coords[2] = segment->x2;	coords[3] = segment->y2;
+	}
+	else
+	{
+	    coords[0] = lastx;		coords[1] = lasty;
+	    coords[2] = segment->x;	coords[3] = segment->y;
+	}
+	coords[4] = lastx = segment->x;
+	coords[5] = lasty = segment->y;
+	/* the string data need not be aligned for doubles */
+	memcpy(buf, coords, sizeof(coords));
+	buf += sizeof(coords);
+    }
+
+    return result;
+}
+
+/* Return the number of bytes of memory used by the curve */
+static PyObject *
+curve_memory_size(SKCurveObject * self, PyObject * args)
+{
+    return PyInt_FromLong(sizeof(SKCurveObject)
+			  + self->allocated * sizeof(CurveSegment));
+}
+
+static PyObject *
+curve_segment_types(SKCurveObject * self, PyObject * args)
+{
+    PyObject * result;
+    char * buf;
+    int i;
+
+    result = PyString_FromStringAndSize(NULL, self->len);
+    if (!result)
+	return NULL;
+    buf = PyString_AsString(result);
+
+    for (i = 0; i < self->len; i++)
+	buf[i] = self->segments[i].type;
+
+    return result;
+}
+
+static PyObject *
+curve_set_coords(SKCurveObject * self, PyObject * args)
+{
+    PyObject * data;
+    PyObject * undo;
+    CurveSegment * segment;
+    double coords[COORDS_PER_SEGMENT];
+    const char * buf;
+    Py_ssize_t length;
+    int i;
+
+    if (!PyArg_ParseTuple(args, "O", &data))
+	return NULL;
+
+    if (PyObject_AsReadBuffer(data, (const void**)&buf, &length) < 0)
+	return NULL;
+
+    if (length != self->len * sizeof(coords))
+    {
+	PyErr_Format(PyExc_ValueError,
+		     "expected %d coordinates, got %d bytes",
+		     self->len * COORDS_PER_SEGMENT, (int)length);
+	return NULL;
+    }
+
+    undo = curve_create_full_undo(self);
+    if (!undo)
+	return NULL;
+
+    segment = self->segments;
+    for (i = 0; i < self->len; i++, segment++)
+    {
+	memcpy(coords, buf, sizeof(coords));
+	buf += sizeof(coords);
+	if (segment->type == CurveBezier)
+	{
+	    segment->x1 = coords[0];	segment->y1 = coords[1];
+	    segment->x2 = coords[2];	segment->y2 = coords[3];
+	}
+	segment->x = coords[4];
+	segment->y = coords[5];
+    }
+
+    if (self->closed && self->len > 1)
+    {
+	self->segments[0].x = self->segments[self->len - 1].x;
+	self->segments[0].y = self->segments[self->len - 1].y;
+    }
+
+    curve_check_state(self, 1, FUNCTION_NAME);
+
+    return undo;
+}
+
+
 static PyObject *
 curve_apply_translation(SKCurveObject * self, PyObject * args)
 {
@@ -1109,24 +1257,144 @@ curve_get_save(SKCurveObject * self, PyObject * args)
 }
 
 
+/* Write the number v to buf in the same format as sprintf(buf, "%g", v)
+ * and return the number of characters written. Numbers whose decimal
+ * exponent is in the range where %g uses fixed point notation are
+ * formatted with integer arithmetic, which is about twice as fast as
+ * sprintf. Numbers that are very close to the middle between two
+ * numbers with 6 significant digits, where the result of the rounding
+ * might differ from printf's, and all other numbers are formatted
+ * with sprintf, so like sprintf the result depends on LC_NUMERIC.
+ */
 static int
-write_segment(FILE * file, CurveSegment * segment)
+format_g(char * buf, double v)
 {
-    int result = 0;
+    static const double powers[] = {1e0, 1e1, 1e2, 1e3, 1e4, 1e5, 1e6,
+				    1e7, 1e8, 1e9, 1e10};
+    /* bounds[i] == 10 ** (i - 4) */
+    static const double bounds[] = {1e-4, 1e-3, 1e-2, 1e-1, 1e0, 1e1, 1e2,
+				    1e3, 1e4, 1e5};
+    static const long ipowers[] = {1, 10, 100, 1000, 10000, 100000,
+				   1000000, 10000000, 100000000,
+				   1000000000};
+    double a, scaled, frac;
+    long digits, intpart, fracpart;
+    int exp, decimals, i, n;
+    char tmp[24], * p = buf;
+
+    a = fabs(v);
+    if (a == 0.0 || !(a >= 1e-4 && a < 999999.0))
+	return sprintf(buf, "%g", v);
+
+    exp = 5;
+    while (exp > -4 && a < bounds[exp + 4])
+	exp -= 1;
+    scaled = a * powers[5 - exp];
+    if (scaled < 1e5 && exp > -4)
+    {
+	exp -= 1;
+	scaled = a * powers[5 - exp];
+    }
+    else if (scaled >= 1e6 && exp < 5)
+    {
+	exp += 1;
+	scaled = a * powers[5 - exp];
+    }
+    if (scaled < 1e5 || scaled >= 1e6)
+	return sprintf(buf, "%g", v);
+
+    frac = scaled - floor(scaled);
+    if (fabs(frac - 0.5) < 1e-6)
+	/* too close to a tie. let printf decide */
+	return sprintf(buf, "%g", v);
+    digits = (long)floor(scaled + 0.5);
+    if (digits >= 1000000)
+    {
+	if (exp >= 5)
+	    return sprintf(buf, "%g", v);
+	digits /= 10;
+	exp += 1;
+    }
+
+    decimals = 5 - exp;
+    while (decimals > 0 && digits % 10 == 0)
+    {
+	digits /= 10;
+	decimals -= 1;
+    }
+    intpart = digits / ipowers[decimals];
+    fracpart = digits % ipowers[decimals];
+
+    if (v < 0)
+	*p++ = '-';
+    n = 0;
+    do
+    {
+	tmp[n++] = '0' + intpart % 10;
+	intpart /= 10;
+    }
+    while (intpart);
+    while (n)
+	*p++ = tmp[--n];
+    if (decimals)
+    {
+	*p++ = '.';
+	for (i = decimals - 1; i >= 0; i--)
+	{
+	    p[i] = '0' + fracpart % 10;
+	    fracpart /= 10;
+	}
+	p += decimals;
+    }
+    *p = '\0';
+    return p - buf;
+}
+
+/* Write segment to buf in the format of the bs and bc lines of SK
+ * files and return the number of characters written. buf must have
+ * room for at least MAX_SEGMENT_STRING characters. */
+
+/* more than enough for one bc line with 6 %g numbers and an int */
+#define MAX_SEGMENT_STRING 200
+
+static int
+format_segment(char * buf, CurveSegment * segment)
+{
+    char * start = buf;
 
     if (segment->type == CurveBezier)
     {
-	result = fprintf(file, "bc(%g,%g,%g,%g,%g,%g,%d)\n",
-			 segment->x1, segment->y1, segment->x2, segment->y2,
-			 segment->x, segment->y, segment->cont);
+	memcpy(buf, "bc(", 3);	buf += 3;
+	buf += format_g(buf, segment->x1);	*buf++ = ',';
+	buf += format_g(buf, segment->y1);	*buf++ = ',';
+	buf += format_g(buf, segment->x2);	*buf++ = ',';
+	buf += format_g(buf, segment->y2);	*buf++ = ',';
     }
     else
     {
-	result = fprintf(file, "bs(%g,%g,%d)\n",
-			 segment->x, segment->y, segment->cont);
+	memcpy(buf, "bs(", 3);	buf += 3;
+    }
+    buf += format_g(buf, segment->x);	*buf++ = ',';
+    buf += format_g(buf, segment->y);
+    if (segment->cont >= 0 && segment->cont <= 9)
+    {
+	buf[0] = ',';	buf[1] = '0' + segment->cont;
+	buf[2] = ')';	buf[3] = '\n';
+	buf += 4;
     }
+    else
+	buf += sprintf(buf, ",%d)\n", segment->cont);
+    return buf - start;
+}
 
-    if (result < 0)
+static int
+write_segment(FILE * file, CurveSegment * segment)
+{
+    char buf[MAX_SEGMENT_STRING];
+    int length;
+
+    length = format_segment(buf, segment);
+    if (fwrite(buf, 1, length, file) != length)
     {
 	PyErr_SetFromErrno(PyExc_IOError);
 	return 0;
@@ -1158,6 +1426,46 @@ curve_write_to_file(SKCurveObject * self, PyObject * args)
 }
 
 
+/* curve.get_save_string()
+ *
+ * Return the segments of self as a string in the same format that
+ * write_to_file writes to a file, i.e. one `bs' or `bc' line per
+ * segment. Unlike write_to_file this works with any file-like object.
+ */
+
+static PyObject *
+curve_get_save_string(SKCurveObject * self, PyObject * args)
+{
+    CurveSegment * segment;
+    PyObject * result;
+    char * buf, * start;
+    char * old_locale;
+    int i;
+
+    result = PyString_FromStringAndSize(NULL,
+					self->len * MAX_SEGMENT_STRING + 1);
+    if (!result)
+	return NULL;
+    start = buf = PyString_AsString(result);
+
+    old_locale = strdup(setlocale(LC_NUMERIC, NULL));
+    setlocale(LC_NUMERIC, "C");
+
+    segment = self->segments;
+    for (i = 0; i < self->len; i++, segment++)
+    {
+	buf += format_segment(buf, segment);
+    }
+
+    setlocale(LC_NUMERIC, old_locale);
+    free(old_locale);
+
+    if (_PyString_Resize(&result, buf - start) < 0)
+	return NULL;
+    return result;
+}
+
+
 /* append a straight line to self. */
 static PyObject *
 curve_append_straight(SKCurveObject * self, PyObject * args)
@@ -1447,67 +1755,107 @@ curve_set_segment(SKCurveObject * self, PyObject * args)
     return Py_None;
 }
 
+/* Parse the COUNT coordinates and the continuity flag of a `bs' or
+ * `bc' line. This is equivalent to the sscanf formats "bs%*[ (]%lf,..."
+ * used before but a lot faster. Return true if successful. */
 static int
-curve_parse_string_append(SKCurveObject * self, const char * string)
+curve_parse_segment_args(const char * string, double * values, int count,
+			 int * cont)
+{
+    char * end;
+    int i;
+
+    string += 2;
+    while (*string == ' ' || *string == '(')
+	string++;
+    for (i = 0; i < count; i++)
+    {
+	values[i] = strtod(string, &end);
+	if (end == string || *end != ',')
+	    return 0;
+	string = end + 1;
+    }
+    *cont = strtol(string, &end, 10);
+    return end != string;
+}
+
+/* Parse one `bs' or `bc' line and append the segment to self. The
+ * caller has to make sure that LC_NUMERIC is "C". */
+static int
+curve_parse_segment(SKCurveObject * self, const char * string)
 {
     CurveSegment segment;
-    char * old_locale;
+    double values[6];
+    int cont;
 
-    old_locale = strdup(setlocale(LC_NUMERIC, NULL));
-    setlocale(LC_NUMERIC, "C");
-    
+    segment.selected = 0;
     if (string[1] == 'c')
     {
-	double x, y, x1, y1, x2, y2;
-	int cont;
-	
 	segment.type = CurveBezier;
-	if (sscanf(string, "bc%*[ (]%lf,%lf,%lf,%lf,%lf,%lf,%d",
-		   &x1, &y1, &x2, &y2, &x, &y, &cont) != 7)
+	if (!curve_parse_segment_args(string, values, 6, &cont))
 	{
 	    PyErr_SetString(PyExc_ValueError, "cannot parse string");
-	    goto fail;
+	    return 0;
 	}
 
 	segment.cont = cont;
-	segment.x = x;		segment.y = y;
-	segment.x1 = x1;	segment.y1 = y1;
-	segment.x2 = x2;	segment.y2 = y2;
-	
-	if (!SKCurve_AppendSegment(self, &segment))
-	    goto fail;
+	segment.x1 = values[0];	segment.y1 = values[1];
+	segment.x2 = values[2];	segment.y2 = values[3];
+	segment.x = values[4];	segment.y = values[5];
     }
     else if (string[1] == 's')
     {
-	double x, y;
-	int cont;
-	
 	segment.type = CurveLine;
-	if (sscanf(string, "bs%*[ (]%lf,%lf,%d", &x, &y, &cont) != 3)
+	if (!curve_parse_segment_args(string, values, 2, &cont))
 	{
 	    PyErr_SetString(PyExc_ValueError, "cannot parse string");
-	    goto fail;
+	    return 0;
 	}
 
 	segment.cont = cont;
-	segment.x = x;		segment.y = y;
-
-	if (!SKCurve_AppendSegment(self, &segment))
-	    goto fail;
+	segment.x = values[0];	segment.y = values[1];
     }
     else
     {
 	PyErr_SetString(PyExc_ValueError,
 			"string must begin with 'bc' or 'bs'");
-	goto fail;
+	return 0;
     }
 
-    return 1;
+    return SKCurve_AppendSegment(self, &segment);
+}
+
+/* Parse the lines in string and append the segments to self. string
+ * may contain any number of `bs' and `bc' lines separated by newlines.
+ * LC_NUMERIC is set to "C" only once for all lines. */
+static int
+curve_parse_string_append(SKCurveObject * self, const char * string,
+			  int length)
+{
+    const char * end = string + length;
+    const char * eol;
+    char * old_locale;
+    int result = 1;
+
+    old_locale = strdup(setlocale(LC_NUMERIC, NULL));
+    setlocale(LC_NUMERIC, "C");
+
+    while (string < end)
+    {
+	eol = memchr(string, '\n', end - string);
+	if (!eol)
+	    eol = end;
+	if (eol - string >= 4 && !curve_parse_segment(self, string))
+	{
+	    result = 0;
+	    break;
+	}
+	string = eol + 1;
+    }
 
-fail:
     setlocale(LC_NUMERIC, old_locale);
     free(old_locale);
-    return 0;
+    return result;
 }
 
 static PyObject *
@@ -1525,7 +1873,7 @@ curve_append_from_string(SKCurveObject * self, PyObject * args)
 	return NULL;
     }
 
-    if (!curve_parse_string_append(self, string))
+    if (!curve_parse_string_append(self, string, len))
 	return NULL;
 
     Py_INCREF(Py_None);
@@ -1547,7 +1895,7 @@ curve_append_from_file(SKCurveObject * self, PyObject * args)
 	buf = PyString_AsString(line);
 	if (buf[0] != 'b' || (buf[1] != 'c' && buf[1] != 's'))
 	    break;
-	if (!curve_parse_string_append(self, buf))
+	if (!curve_parse_string_append(self, buf, PyString_Size(line)))
 	{
 	    Py_DECREF(line);
 	    return NULL;
@@ -2060,6 +2408,7 @@ static struct PyMethodDef curve_methods[] = {
     /* new method names */
     {"Translate",	(PyCFunction)curve_apply_translation,	1},
     {"Transform",	(PyCFunction)curve_apply_trafo,		1},
+    {"SetCoords",	(PyCFunction)curve_set_coords,		1},
     {"Duplicate",	(PyCFunction)curve_duplicate,		1},
     {"AppendLine",	(PyCFunction)curve_append_straight,	1},
     {"AppendBezier",	(PyCFunction)curve_append_curve,	1},
@@ -2082,6 +2431,10 @@ static struct PyMethodDef curve_methods[] = {
     {"append_from_file",(PyCFunction)curve_append_from_file,	1},
     {"get_save",	(PyCFunction)curve_get_save,		1},
     {"write_to_file",	(PyCFunction)curve_write_to_file,	1},
+    {"get_save_string",	(PyCFunction)curve_get_save_string,	1},
+    {"coords",		(PyCFunction)curve_coords,		1},
+    {"segment_types",	(PyCFunction)curve_segment_types,	1},
+    {"memory_size",	(PyCFunction)curve_memory_size,		1},
     {"guess_continuity",(PyCFunction)curve_guess_continuity,	1},
     {"load_close",	(PyCFunction)curve_load_close,		1},
     {"append_from_string",(PyCFunction)curve_append_from_string,1},
@@ -39,6 +39,8 @@ SKAux_DrawGrid(PyObject * self, PyObject * arg)
     int		ix, iy;
     XPoint	* points, *current;
 
+    if (!SK_ImportPax())
+	return NULL;
     if (!PyArg_ParseTuple(arg, "O!ddddii", Pax_GCType, &gc_object, &orig_x,
 			  &orig_y, &xwidth, &ywidth, &nx, &ny))
 	return NULL;
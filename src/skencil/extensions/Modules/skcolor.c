@@ -793,6 +793,9 @@ skcolor_xvisual(PyObject * self, PyObject * args)
     XVisualInfo *vinfo;
     int nreturn;
 
+    /* pseudocolor visuals create pixmaps with pax_functions */
+    if (!SK_ImportPax())
+	return NULL;
     if (!PyArg_ParseTuple(args, "O!O!|O!", &PyCObject_Type, &ODisplay,
 			  &PyCObject_Type, &OVisual,
 			  &PyTuple_Type, &additional_args))
@@ -419,6 +419,8 @@ copy_image_to_ximage(PyObject * self, PyObject * args)
     SKVisualObject * visual;
     int dest_x, dest_y, dest_width, dest_height;
 
+    if (!SK_ImportPax())
+	return NULL;
     if (!PyArg_ParseTuple(args, "O!OO!iiii", &SKVisualType, &visual,
 			  &src, Pax_ImageType, &dest,
 			  &dest_x, &dest_y, &dest_width, &dest_height))
@@ -894,6 +896,8 @@ transform_to_ximage(PyObject * self, PyObject * args)
     PaxRegionObject * region;
     int dest_x, dest_y, dest_width, dest_height;
 
+    if (!SK_ImportPax())
+	return NULL;
     if (!PyArg_ParseTuple(args, "O!O!OO!iiiiO",	 &SKVisualType, &visual,
 			  &SKTrafoType, &trafo, &src, Pax_ImageType, &dest,
 			  &dest_x, &dest_y, &dest_width, &dest_height,
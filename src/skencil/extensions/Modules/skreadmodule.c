@@ -42,6 +42,9 @@ typedef struct {
     PyObject * value;
 
     char * error;
+
+    /* true if the caller has already set LC_NUMERIC to "C" */
+    int c_locale;
 } SKLineInfo;
 
 #define	NAME	258
@@ -210,18 +213,24 @@ sklex(PyObject ** lval, SKLineInfo * buffer)
 		p += 1;
 	    if (*p == '.' || *p == 'e' || *p == 'E')
 	    {
-		char * old_locale;
+		char * old_locale = NULL;
 		double result;
 
 		/* Change LC_NUMERIC locale to "C" around the strtod
 		 * call so that it parses the number correctly. */
-		old_locale = strdup(setlocale(LC_NUMERIC, NULL));
-		setlocale(LC_NUMERIC, "C");
+		if (!buffer->c_locale)
+		{
+		    old_locale = strdup(setlocale(LC_NUMERIC, NULL));
+		    setlocale(LC_NUMERIC, "C");
+		}
 
 		result = strtod(buffer->buffer - 1, &(buffer->buffer));
 
-		setlocale(LC_NUMERIC, old_locale);
-		free(old_locale);
+		if (old_locale)
+		{
+		    setlocale(LC_NUMERIC, old_locale);
+		    free(old_locale);
+		}
 
 		*lval = PyFloat_FromDouble(result);
 		return FLOAT;
@@ -237,10 +246,14 @@ sklex(PyObject ** lval, SKLineInfo * buffer)
 	    if (isalpha(c) || c == '_')
 	    {
 		/* arbitrary limit for identifiers: */
-		char ident[101];
-		sscanf(buffer->buffer - 1, "%100[a-zA-Z0-9_]", ident);
-		buffer->buffer = buffer->buffer + strlen(ident) - 1;
-		*lval = PyString_FromString(ident);
+		char * start = buffer->buffer - 1;
+		while ((isalnum(*buffer->buffer) || *buffer->buffer == '_')
+		       && buffer->buffer - start < 100)
+		    buffer->buffer++;
+		*lval = PyString_FromStringAndSize(start,
+						   buffer->buffer - start);
+		if (*lval)
+		    PyString_InternInPlace(lval);
 		return NAME;
 	    }
 	    if (!isspace(c))
@@ -478,6 +491,7 @@ PyObject * parse_sk_line(PyObject * self, PyObject * args)
     info.buffer = string;
     info.length = length;
     info.error = NULL;
+    info.c_locale = 0;
 
     info.funcname = NULL;
     info.args = PyList_New(0);
@@ -543,6 +557,7 @@ PyObject * parse_sk_line2(PyObject * self, PyObject * args)
     info.buffer = string;
     info.length = length;
     info.error = NULL;
+    info.c_locale = 0;
 
     info.funcname = NULL;
     info.args = PyList_New(0);
@@ -574,6 +589,160 @@ PyObject * parse_sk_line2(PyObject * self, PyObject * args)
     return result;
 }
 
+/* parse_sk_lines(string[, stop])
+ *
+ * Parse all complete lines in string, that is all lines terminated by a
+ * newline. Return a tuple (records, consumed, lines) where consumed is
+ * the number of bytes and lines the number of lines that were
+ * processed. Incomplete trailing lines are left to the caller, who
+ * usually prepends them to the next chunk read from the file.
+ *
+ * Each item of records is either a tuple (funcname, args, kwargs) like
+ * the return value of parse_sk_line2, or a string containing a run of
+ * consecutive `bs' and `bc' lines, which can be passed unchanged to
+ * the append_from_string method of a curve object. Empty lines and
+ * comments are skipped.
+ *
+ * If stop is given, it must be a dictionary. Parsing stops after the
+ * first line whose function name is a key in stop. This is used for
+ * functions that read data directly from the file, like bm.
+ *
+ * Parsing also stops before a line that cannot be parsed. The caller
+ * will notice that not the entire buffer was consumed and can use
+ * parse_sk_line2 on that line to raise the appropriate SyntaxError.
+ */
+
+#define IS_BEZIER_LINE(p, end) \
+    ((end) - (p) >= 3 && (p)[0] == 'b' && ((p)[1] == 's' || (p)[1] == 'c') \
+     && ((p)[2] == '(' || (p)[2] == ' '))
+
+static
+PyObject * parse_sk_lines(PyObject * self, PyObject * args)
+{
+    char * string, * start, * end, * eol;
+    char * bezier_start = NULL;
+    char * old_locale;
+    int length, lines = 0;
+    PyObject * stop = NULL;
+    PyObject * records, * record, * result = NULL;
+    SKLineInfo info;
+
+    if (!PyArg_ParseTuple(args, "s#|O!", &string, &length,
+			  &PyDict_Type, &stop))
+	return NULL;
+
+    records = PyList_New(0);
+    if (!records)
+	return NULL;
+
+    old_locale = strdup(setlocale(LC_NUMERIC, NULL));
+    setlocale(LC_NUMERIC, "C");
+
+    start = string;
+    end = string + length;
+    while (start < end)
+    {
+	eol = memchr(start, '\n', end - start);
+	if (!eol)
+	    /* incomplete line */
+	    break;
+
+	if (IS_BEZIER_LINE(start, eol))
+	{
+	    if (!bezier_start)
+		bezier_start = start;
+	    start = eol + 1;
+	    lines += 1;
+	    continue;
+	}
+
+	if (bezier_start)
+	{
+	    record = PyString_FromStringAndSize(bezier_start,
+						start - bezier_start);
+	    bezier_start = NULL;
+	    if (!record || PyList_Append(records, record) == -1)
+	    {
+		Py_XDECREF(record);
+		goto fail;
+	    }
+	    Py_DECREF(record);
+	}
+
+	info.buffer = start;
+	info.length = eol - start;
+	info.error = NULL;
+	info.c_locale = 1;
+	info.funcname = NULL;
+	info.args = PyList_New(0);
+	info.kwargs = PyDict_New();
+	if (!info.args || !info.kwargs)
+	{
+	    Py_XDECREF(info.args);
+	    Py_XDECREF(info.kwargs);
+	    goto fail;
+	}
+
+	if (parse_line(&info))
+	{
+	    /* leave the line to the caller */
+	    Py_XDECREF(info.funcname);
+	    Py_DECREF(info.args);
+	    Py_DECREF(info.kwargs);
+	    break;
+	}
+
+	start = eol + 1;
+	lines += 1;
+
+	if (!info.funcname)
+	{
+	    /* an empty or comment line */
+	    Py_DECREF(info.args);
+	    Py_DECREF(info.kwargs);
+	    continue;
+	}
+
+	record = Py_BuildValue("OOO", info.funcname, info.args, info.kwargs);
+	Py_DECREF(info.args);
+	Py_DECREF(info.kwargs);
+	if (!record || PyList_Append(records, record) == -1)
+	{
+	    Py_XDECREF(record);
+	    Py_DECREF(info.funcname);
+	    goto fail;
+	}
+	Py_DECREF(record);
+
+	if (stop && PyDict_GetItem(stop, info.funcname))
+	{
+	    Py_DECREF(info.funcname);
+	    break;
+	}
+	Py_DECREF(info.funcname);
+    }
+
+    if (bezier_start)
+    {
+	record = PyString_FromStringAndSize(bezier_start,
+					    start - bezier_start);
+	if (!record || PyList_Append(records, record) == -1)
+	{
+	    Py_XDECREF(record);
+	    goto fail;
+	}
+	Py_DECREF(record);
+    }
+
+    result = Py_BuildValue("Oii", records, (int)(start - string), lines);
+
+ fail:
+    setlocale(LC_NUMERIC, old_locale);
+    free(old_locale);
+    Py_DECREF(records);
+    return result;
+}
+
 static
 PyObject * tokenize_line(PyObject * self, PyObject * args)
 {
@@ -588,6 +757,7 @@ PyObject * tokenize_line(PyObject * self, PyObject * args)
     info.buffer = string;
     info.length = length;
     info.error = NULL;
+    info.c_locale = 0;
 
     info.funcname = NULL;
     info.args = NULL;
@@ -650,6 +820,7 @@ PyObject * tokenize_line(PyObject * self, PyObject * args)
 static PyMethodDef sk_methods[] = {
 	{"parse_sk_line",	parse_sk_line,		METH_VARARGS},
 	{"parse_sk_line2",	parse_sk_line2,		METH_VARARGS},
+	{"parse_sk_lines",	parse_sk_lines,		METH_VARARGS},
 	{"tokenize_line",	tokenize_line,		METH_VARARGS},
 	{NULL,		NULL}
 };